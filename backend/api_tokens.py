@@ -0,0 +1,141 @@
+"""
+Stateless signed API access tokens and a per-process user cache
+Tokens carry user_id and the BMI eligibility claim, so verification needs no
+database hit; endpoints that need more read a TTL'd snapshot of the User row
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import event
+
+from models import db, User
+
+TOKEN_SALT = 'api-access-token'
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'height', 'weight', 'BMI', 'allergies', 'preferences')
+
+
+def _serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT,
+                                  signer_kwargs={'digest_method': hashlib.sha256})
+
+
+def issue_access_token(user) -> Dict:
+    """Sign a short-lived access token for a verified user"""
+    token = _serializer().dumps({'uid': user.id, 'elg': 1 if user.is_eligible_for_service() else 0})
+    return {
+        'access_token': token,
+        'token_type': 'Bearer',
+        'expires_in': current_app.config['API_TOKEN_TTL']
+    }
+
+
+def verify_access_token(token: str) -> Optional[Dict]:
+    """Return {'user_id', 'eligible'} for a valid, unexpired token, else None"""
+    try:
+        claims = _serializer().loads(token, max_age=current_app.config['API_TOKEN_TTL'])
+    except (SignatureExpired, BadSignature):
+        return None
+    return {'user_id': claims['uid'], 'eligible': bool(claims['elg'])}
+
+
+def token_required(eligible: bool = False):
+    """Require a Bearer access token; sets g.api_claims
+
+    With eligible=True the token's BMI eligibility claim must be set, which is
+    checked from the token alone without loading the user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            header = request.headers.get('Authorization', '')
+            scheme, _, token = header.partition(' ')
+            claims = verify_access_token(token.strip()) if scheme.lower() == 'bearer' else None
+            if claims is None:
+                return jsonify({'error': 'Invalid or expired access token'}), 401
+            if eligible and not claims['eligible']:
+                return jsonify({'error': 'Service requires BMI ≥ 30'}), 403
+            g.api_claims = claims
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+class UserCache:
+    """Thread-safe LRU of User snapshots with a time-to-live
+
+    Snapshots are plain dicts rather than ORM instances, so they are safe to
+    share across requests and sessions. Local writes invalidate immediately;
+    other processes see changes once the TTL lapses.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def put(self, user_id: int, snapshot: Dict):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# One cache per process; invalidated by the User mapper events below
+user_cache = UserCache()
+
+
+def user_snapshot(user) -> Dict:
+    return {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+
+
+def get_user_snapshot(user_id: int) -> Optional[Dict]:
+    """Cached read of a user's profile fields; one primary-key query on a miss"""
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = user_snapshot(user)
+        user_cache.put(user_id, snapshot)
+    return snapshot
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+
+def init_api_tokens(app):
+    """Size the per-process user cache from API_USER_CACHE_* config"""
+    user_cache.ttl = app.config.get('API_USER_CACHE_TTL', 60)
+    user_cache.max_size = app.config.get('API_USER_CACHE_SIZE', 10000)
@@ -3,13 +3,18 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 import os
-import logging
 from datetime import datetime
 
 # Import models and routes following copilot blueprint organization
 from models import db
 from routes import register_blueprints
 from session_fix import apply_session_fix
+from password_hashing import init_password_hasher
+from commands import register_commands
+from api_tokens import init_api_tokens
+from meal_planner import init_meal_planner
+from dashboard import init_dashboard
+from logging_setup import configure_logging
 
 def create_app(config_name=None):
     """Application factory pattern following copilot instructions"""
@@ -31,9 +36,75 @@ def create_app(config_name=None):
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # Structured JSON logs written by a background listener thread
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+    configure_logging(app)
+    
+    # Password hashing cost factor and worker pool (PASSWORD_HASH_WORKERS=0 hashes inline)
+    hash_workers = os.environ.get('PASSWORD_HASH_WORKERS')
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config['PASSWORD_HASH_WORKERS'] = int(hash_workers) if hash_workers else None
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or None
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Re-sign unchanged session cookies only after this fraction of their lifetime
+    app.config['SESSION_REFRESH_FRACTION'] = float(os.environ.get('SESSION_REFRESH_FRACTION', 0.5))
+    
+    # Signed API access tokens and the per-process user snapshot cache
+    app.config['API_TOKEN_TTL'] = int(os.environ.get('API_TOKEN_TTL', 900))
+    app.config['API_USER_CACHE_TTL'] = float(os.environ.get('API_USER_CACHE_TTL', 60))
+    app.config['API_USER_CACHE_SIZE'] = int(os.environ.get('API_USER_CACHE_SIZE', 10000))
+    
+    # Partner clinic bulk onboarding (endpoint disabled unless a token is configured). The endpoint hashes
+    # inside the request, so it only takes small batches; larger files go through `flask import-users`
+    app.config['BULK_IMPORT_TOKEN'] = os.environ.get('BULK_IMPORT_TOKEN')
+    app.config['BULK_IMPORT_BATCH_SIZE'] = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 1000))
+    app.config['BULK_IMPORT_MAX_ROWS'] = int(os.environ.get('BULK_IMPORT_MAX_ROWS', 100))
+    
+    # Bulk BMI screening: rows scored per vectorized chunk
+    app.config['BMI_BATCH_CHUNK_SIZE'] = int(os.environ.get('BMI_BATCH_CHUNK_SIZE', 10000))
+    
+    # Largest batch accepted by the meal logging sync endpoint
+    app.config['MEAL_LOG_MAX_BATCH'] = int(os.environ.get('MEAL_LOG_MAX_BATCH', 500))
+    
+    # Upper bound on points returned by the intake history endpoint
+    app.config['HISTORY_MAX_BUCKETS'] = int(os.environ.get('HISTORY_MAX_BUCKETS', 400))
+    
+    # Meal history retention: months kept in the database before moving to the archive directory
+    app.config['HISTORY_HOT_MONTHS'] = int(os.environ.get('HISTORY_HOT_MONTHS', 12))
+    app.config['HISTORY_ARCHIVE_DIR'] = os.environ.get('HISTORY_ARCHIVE_DIR',
+                                                       os.path.join(app.instance_path, 'meal_history_archive'))
+    
+    # Meal plan generator: hard time budget per request, longest horizon, catalog cache lifetime
+    app.config['MEAL_PLAN_TIME_BUDGET'] = float(os.environ.get('MEAL_PLAN_TIME_BUDGET', 0.8))
+    app.config['MEAL_PLAN_MAX_DAYS'] = int(os.environ.get('MEAL_PLAN_MAX_DAYS', 14))
+    app.config['MEAL_PLAN_CATALOG_TTL'] = float(os.environ.get('MEAL_PLAN_CATALOG_TTL', 300))
+    
+    # Nightly recommendation precompute: meals stored per user and scoring processes (unset = all cores)
+    recommendation_workers = os.environ.get('RECOMMENDATION_WORKERS')
+    app.config['RECOMMENDATION_COUNT'] = int(os.environ.get('RECOMMENDATION_COUNT', 20))
+    app.config['RECOMMENDATION_WORKERS'] = int(recommendation_workers) if recommendation_workers else None
+    app.config['RECOMMENDATION_CHUNK_SIZE'] = int(os.environ.get('RECOMMENDATION_CHUNK_SIZE', 2000))
+    
+    # Weekly report emails: outbox directory a mail relay sends from, render processes (unset = all cores)
+    report_workers = os.environ.get('WEEKLY_REPORT_WORKERS')
+    app.config['WEEKLY_REPORT_OUTBOX'] = os.environ.get('WEEKLY_REPORT_OUTBOX', os.path.join(app.instance_path, 'outbox'))
+    app.config['WEEKLY_REPORT_WORKERS'] = int(report_workers) if report_workers else None
+    app.config['WEEKLY_REPORT_BATCH_SIZE'] = int(os.environ.get('WEEKLY_REPORT_BATCH_SIZE', 2000))
+    app.config['WEEKLY_REPORT_SENDER'] = os.environ.get('WEEKLY_REPORT_SENDER', 'reports@nutrition-assistant.local')
+    
+    # Dashboard API: per-user, per-process cache (dropped on the user's writes here, elsewhere after the TTL) and threads querying its sections on server databases (1 = serial)
+    app.config['DASHBOARD_CACHE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    app.config['DASHBOARD_CACHE_SIZE'] = int(os.environ.get('DASHBOARD_CACHE_SIZE', 10000))
+    app.config['DASHBOARD_WORKERS'] = int(os.environ.get('DASHBOARD_WORKERS', 4))
+    
     # Initialize extensions following copilot blueprint organization
     db.init_app(app)
     migrate = Migrate(app, db)
+    init_password_hasher(app)
+    init_api_tokens(app)
+    init_meal_planner(app)
+    init_dashboard(app)
     
     # CORS configuration for frontend integration
     CORS(app, origins=['http://localhost:3000', 'http://127.0.0.1:3000'])
@@ -41,21 +112,12 @@ def create_app(config_name=None):
     # Apply session fix to prevent 'partitioned' cookie TypeError
     apply_session_fix(app)
     
-    # Setup logging following copilot QA integration patterns
     if not app.debug:
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
-        file_handler = logging.FileHandler('logs/nutrition_assistant.log')
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        app.logger.setLevel(logging.INFO)
         app.logger.info('Personal Nutrition Assistant startup')
     
     # Register blueprints using centralized registration following copilot patterns
     register_blueprints(app)
+    register_commands(app)
     
     return app
 
@@ -70,7 +132,7 @@ if __name__ == '__main__':
             db.create_all()
             app.logger.info('Database tables created successfully')
         except Exception as e:
-            app.logger.error(f'Database creation error: {e}')
+            app.logger.error("Database creation error: %s", e)
         
         # Log startup info following copilot health-centric patterns
         app.logger.info('🏥 Personal Nutrition Assistant - Flask MVP')
@@ -0,0 +1,45 @@
+"""
+Single source of truth for BMI calculation, category and service eligibility
+Scalar lookups bisect a sorted threshold table; the array form does the same
+with numpy.searchsorted for batch screening and imports
+"""
+
+from bisect import bisect_right
+from typing import Optional
+
+import numpy as np
+
+# Lower bound of every category after the first (WHO adult classification)
+BMI_THRESHOLDS = (18.5, 25.0, 30.0, 35.0, 40.0)
+BMI_CATEGORIES = ('Underweight', 'Normal weight', 'Overweight',
+                  'Class I Obesity', 'Class II Obesity', 'Class III Obesity')
+UNKNOWN_CATEGORY = 'Unknown'
+
+# Service eligibility (BMI ≥ 30) is exactly the three obesity classes
+ELIGIBLE_BMI = 30.0
+ELIGIBLE_CATEGORIES = BMI_CATEGORIES[bisect_right(BMI_THRESHOLDS, ELIGIBLE_BMI):]
+
+_THRESHOLD_ARRAY = np.array(BMI_THRESHOLDS)
+
+
+def calculate_bmi(height_cm, weight_kg) -> Optional[float]:
+    """BMI rounded to 2 decimals from height in cm and weight in kg"""
+    if not height_cm or not weight_kg:
+        return None
+    return round(weight_kg / ((height_cm / 100) ** 2), 2)
+
+
+def classify_bmi(bmi) -> str:
+    """Category label for a BMI value; 'Unknown' when missing"""
+    if not bmi:
+        return UNKNOWN_CATEGORY
+    return BMI_CATEGORIES[bisect_right(BMI_THRESHOLDS, bmi)]
+
+
+def is_eligible(bmi) -> bool:
+    return bmi is not None and bmi >= ELIGIBLE_BMI
+
+
+def classify_bmi_array(bmi: np.ndarray) -> np.ndarray:
+    """Category indexes into BMI_CATEGORIES for an array of BMIs; NaN gives -1"""
+    return np.where(np.isnan(bmi), -1, np.searchsorted(_THRESHOLD_ARRAY, bmi, side='right'))
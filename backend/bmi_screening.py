@@ -0,0 +1,188 @@
+"""
+Vectorized bulk BMI screening for partner measurement files
+Rows are parsed and scored in fixed-size chunks with numpy, and results are
+rendered chunk by chunk so memory stays bounded however large the upload is
+"""
+
+import csv
+import io
+import json
+import math
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from bmi_classification import BMI_CATEGORIES as CATEGORY_LABELS, ELIGIBLE_BMI, classify_bmi_array
+
+INVALID_LABEL = 'Invalid'
+DEFAULT_CHUNK_SIZE = 10000
+
+OUTPUT_FIELDS = ('id', 'height', 'weight', 'BMI', 'category', 'eligible')
+
+
+class ScreeningInputError(ValueError):
+    """Raised when a batch payload is structurally unusable"""
+
+
+def _to_floats(values: List) -> np.ndarray:
+    """Float array from strings/numbers; unparseable entries become NaN"""
+    try:
+        result = np.asarray(values, dtype=float)
+        if result.ndim == 1:
+            return result
+    except (TypeError, ValueError):
+        pass
+    result = np.empty(len(values), dtype=float)
+    for index, value in enumerate(values):
+        try:
+            result[index] = float(value)
+        except (TypeError, ValueError):
+            result[index] = np.nan
+    return result
+
+
+def screen_chunk(heights: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """BMI, category index and eligibility for arrays of height (cm) and weight (kg)
+
+    Rows outside 100-250 cm / 30-300 kg get NaN BMI and category index -1.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid = ((heights >= 100) & (heights <= 250) & (weights >= 30) & (weights <= 300))
+        bmi = np.where(valid, np.round(weights / (heights / 100) ** 2, 2), np.nan)
+    category = classify_bmi_array(bmi)
+    return {'bmi': bmi, 'category': category, 'eligible': valid & (bmi >= ELIGIBLE_BMI)}
+
+
+def iter_csv_chunks(stream, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, List]]:
+    """Read a binary CSV stream (header: height, weight and optional id) in column chunks
+
+    The header is checked immediately so a bad upload fails before any response is streamed.
+    """
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = [name.strip().lower() for name in next(reader, [])]
+    if 'height' not in header or 'weight' not in header:
+        raise ScreeningInputError('CSV header must include height and weight columns')
+    height_at, weight_at = header.index('height'), header.index('weight')
+    id_at = header.index('id') if 'id' in header else None
+    width = len(header)
+
+    def chunks():
+        ids, heights, weights = [], [], []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [''] * (width - len(row))
+            ids.append(row[id_at] if id_at is not None else None)
+            heights.append(row[height_at])
+            weights.append(row[weight_at])
+            if len(heights) == chunk_size:
+                yield {'ids': ids, 'heights': heights, 'weights': weights}
+                ids, heights, weights = [], [], []
+        if heights:
+            yield {'ids': ids, 'heights': heights, 'weights': weights}
+
+    return chunks()
+
+
+def iter_json_chunks(data, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, List]]:
+    """Chunk a parsed JSON payload: a list of {height, weight[, id]} or {"measurements": [...]}
+
+    The shape is checked immediately so a bad payload fails before any response is streamed.
+    """
+    if isinstance(data, dict):
+        data = data.get('measurements')
+    if not isinstance(data, list):
+        raise ScreeningInputError('JSON payload must be a list of measurements or {"measurements": [...]}')
+
+    def chunks():
+        for start in range(0, len(data), chunk_size):
+            chunk = [row if isinstance(row, dict) else {} for row in data[start:start + chunk_size]]
+            yield {
+                'ids': [row.get('id') for row in chunk],
+                'heights': [row.get('height') for row in chunk],
+                'weights': [row.get('weight') for row in chunk]
+            }
+
+    return chunks()
+
+
+class ScreeningSummary:
+    """Running per-category counts across all chunks"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0
+        self.eligible = 0
+
+    def add_chunk(self, result: Dict[str, np.ndarray]):
+        indexes, counts = np.unique(result['category'], return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.counts[CATEGORY_LABELS[index] if index >= 0 else INVALID_LABEL] += count
+        self.total += len(result['category'])
+        self.eligible += int(result['eligible'].sum())
+
+    def to_dict(self) -> Dict:
+        return {
+            'total_rows': self.total,
+            'eligible': self.eligible,
+            'categories': {label: self.counts.get(label, 0) for label in CATEGORY_LABELS + (INVALID_LABEL,)}
+        }
+
+
+def _scored_rows(chunk: Dict[str, List], offset: int, summary: ScreeningSummary) -> Iterator[tuple]:
+    """Score a chunk, count it, and return (id, height, weight, bmi, category label, eligible) rows"""
+    heights = _to_floats(chunk['heights'])
+    weights = _to_floats(chunk['weights'])
+    result = screen_chunk(heights, weights)
+    summary.add_chunk(result)
+    labels = [CATEGORY_LABELS[index] if index >= 0 else INVALID_LABEL for index in result['category'].tolist()]
+    ids = (offset + position if row_id is None else row_id for position, row_id in enumerate(chunk['ids']))
+    return zip(ids, heights.tolist(), weights.tolist(), result['bmi'].tolist(), labels,
+               result['eligible'].tolist())
+
+
+def _json_number(value: float) -> str:
+    return repr(value) if math.isfinite(value) else 'null'
+
+
+def render_ndjson(chunks: Iterable[Dict[str, List]], summary: ScreeningSummary) -> Iterator[str]:
+    """One JSON object per measurement, then a final {"summary": ...} line"""
+    offset = 0
+    encode_id = json.JSONEncoder(default=str).encode
+    for chunk in chunks:
+        # Only the id needs a JSON encoder; numbers, labels and booleans are formatted directly
+        lines = [f'{{"id": {encode_id(row_id)}, "height": {_json_number(height)}, '
+                 f'"weight": {_json_number(weight)}, "BMI": {_json_number(bmi)}, '
+                 f'"category": "{label}", "eligible": {"true" if eligible else "false"}}}'
+                 for row_id, height, weight, bmi, label, eligible in _scored_rows(chunk, offset, summary)]
+        offset += len(chunk['heights'])
+        yield '\n'.join(lines) + '\n'
+    yield json.dumps({'summary': summary.to_dict()}) + '\n'
+
+
+def render_csv(chunks: Iterable[Dict[str, List]], summary: ScreeningSummary) -> Iterator[str]:
+    """CSV rows with a header, then '#'-prefixed summary lines"""
+    yield ','.join(OUTPUT_FIELDS) + '\n'
+    offset = 0
+    for chunk in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for row_id, height, weight, bmi, label, eligible in _scored_rows(chunk, offset, summary):
+            writer.writerow((row_id, '' if height != height else height, '' if weight != weight else weight,
+                             '' if bmi != bmi else bmi, label, 'true' if eligible else 'false'))
+        offset += len(chunk['heights'])
+        yield buffer.getvalue()
+    totals = summary.to_dict()
+    yield f"# total_rows={totals['total_rows']},eligible={totals['eligible']}\n"
+    for label, count in totals['categories'].items():
+        yield f"# {label}={count}\n"
+
+
+def summarize(chunks: Iterable[Dict[str, List]]) -> Dict:
+    """Per-category counts only, without rendering any rows"""
+    summary = ScreeningSummary()
+    for chunk in chunks:
+        summary.add_chunk(screen_chunk(_to_floats(chunk['heights']), _to_floats(chunk['weights'])))
+    return summary.to_dict()
@@ -0,0 +1,252 @@
+"""
+Bulk user onboarding for partner clinic imports
+Validates a whole batch in one vectorized pass, hashes passwords across cores,
+allocates usernames in bulk and inserts users in batched transactions
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import time
+from typing import Dict, Iterable, List
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User
+from password_hashing import get_password_hasher
+from bmi_classification import BMI_CATEGORIES, ELIGIBLE_BMI, classify_bmi_array
+from site_stats import adjust_site_stats
+from usernames import UsernameAllocator, is_username_conflict, username_base_from_email
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+EMAIL_LOOKUP_CHUNK = 500
+
+
+class BulkImportError(ValueError):
+    """Raised when an import payload cannot be parsed at all"""
+
+
+def parse_import_rows(payload, fmt: str) -> List[Dict]:
+    """Parse a CSV (text or binary stream) or JSON payload into row dicts"""
+    if fmt == 'csv':
+        if isinstance(payload, (bytes, str)):
+            text = payload.decode('utf-8-sig') if isinstance(payload, bytes) else payload
+            stream = io.StringIO(text)
+        elif isinstance(payload, io.TextIOBase):
+            stream = payload
+        else:
+            stream = io.TextIOWrapper(payload, encoding='utf-8-sig')
+        reader = csv.DictReader(stream)
+        missing = [field for field in ('email', 'password', 'height', 'weight')
+                   if field not in (reader.fieldnames or [])]
+        if missing:
+            raise BulkImportError(f"CSV header is missing columns: {', '.join(missing)}")
+        return [dict(row) for row in reader]
+
+    if fmt == 'json':
+        data = json.loads(payload) if isinstance(payload, (bytes, str)) else payload
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise BulkImportError('JSON payload must be a list of user objects or {"users": [...]}')
+        return data
+
+    raise BulkImportError(f"Unsupported import format: {fmt}")
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _clean(value) -> str:
+    return str(value).strip() if value is not None else ''
+
+
+def validate_rows(rows: List[Dict]) -> Dict:
+    """Validate every row at once; returns normalized columns plus per-row errors
+
+    Numeric range, BMI and eligibility checks run as numpy array operations over
+    the whole batch; existing emails are looked up with chunked IN queries.
+    """
+    emails = [_clean(row.get('email')).lower() for row in rows]
+    passwords = [str(row.get('password') or '') for row in rows]
+    heights = np.array([_to_float(row.get('height')) for row in rows], dtype=float)
+    weights = np.array([_to_float(row.get('weight')) for row in rows], dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        measurable = (np.isfinite(heights) & np.isfinite(weights)
+                      & (heights >= 100) & (heights <= 250) & (weights >= 30) & (weights <= 300))
+        bmi = np.round(weights / (heights / 100) ** 2, 2)
+        eligible = measurable & (bmi >= ELIGIBLE_BMI)
+    categories = np.where(measurable, classify_bmi_array(bmi), -1)
+
+    errors: List[List[str]] = [[] for _ in rows]
+
+    for index, email in enumerate(emails):
+        if not email or not passwords[index]:
+            errors[index].append('Email and password are required')
+        elif not EMAIL_PATTERN.match(email):
+            errors[index].append('Invalid email address')
+
+        if passwords[index] and len(passwords[index]) < 6:
+            errors[index].append('Password must be at least 6 characters long')
+
+    for index in np.flatnonzero(~measurable):
+        errors[index].append('Height must be 100-250 cm and weight 30-300 kg')
+    for index in np.flatnonzero(measurable & ~eligible):
+        errors[index].append(f'BMI {bmi[index]} is below the service threshold of {ELIGIBLE_BMI:g}')
+
+    # Only an accepted row claims its email, so a rejected row never blocks a later valid one
+    seen = set()
+    for index, email in enumerate(emails):
+        if errors[index]:
+            continue
+        if email in seen:
+            errors[index].append('Duplicate email in import')
+        seen.add(email)
+
+    candidates = sorted({email for email, row_errors in zip(emails, errors) if email and not row_errors})
+    existing = set()
+    for start in range(0, len(candidates), EMAIL_LOOKUP_CHUNK):
+        chunk = candidates[start:start + EMAIL_LOOKUP_CHUNK]
+        existing.update(email for (email,) in db.session.query(User.email).filter(User.email.in_(chunk)))
+    for index, email in enumerate(emails):
+        if email in existing and not errors[index]:
+            errors[index].append('Email already registered')
+
+    return {
+        'emails': emails,
+        'passwords': passwords,
+        'heights': heights,
+        'weights': weights,
+        'bmi': bmi,
+        'categories': categories,
+        'errors': errors
+    }
+
+
+def _column_values(record: Dict) -> Dict:
+    return {key: value for key, value in record.items() if not key.startswith('_')}
+
+
+def _count_stats(batch: List[Dict]) -> Dict:
+    # Core inserts skip mapper events, so bump the home page counters in the same transaction
+    return {
+        'total_users': len(batch),
+        'eligible_users': sum(1 for record in batch if record['BMI'] >= ELIGIBLE_BMI)
+    }
+
+
+def _insert_individually(batch: List[Dict], allocator: UsernameAllocator) -> Dict[int, str]:
+    """Fallback for a batch that hit a constraint: insert row by row, retrying username races"""
+    failures = {}
+    for record in batch:
+        for _ in range(5):
+            try:
+                db.session.execute(insert(User), [_column_values(record)])
+                adjust_site_stats(db.session, **_count_stats([record]))
+                db.session.commit()
+                break
+            except IntegrityError as error:
+                db.session.rollback()
+                if not is_username_conflict(error):
+                    failures[record['_row']] = 'Email already registered'
+                    break
+                allocator.forget(record['_base'])
+                record['username'] = allocator.allocate(record['_base'])
+        else:
+            failures[record['_row']] = 'Could not allocate a unique username'
+    return failures
+
+
+def import_users(rows: List[Dict], batch_size: int = 1000) -> Dict:
+    """Onboard a batch of users; returns a summary and a per-row report"""
+    started = time.perf_counter()
+    timings = {}
+
+    checked = validate_rows(rows)
+    accepted = [index for index, row_errors in enumerate(checked['errors']) if not row_errors]
+    db.session.commit()  # end the validation reads so no transaction stays open while hashing
+    timings['validate'] = time.perf_counter() - started
+
+    phase = time.perf_counter()
+    password_hashes = get_password_hasher().hash_many([checked['passwords'][i] for i in accepted])
+    timings['hash'] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    allocator = UsernameAllocator()
+    bases = {index: username_base_from_email(checked['emails'][index]) for index in accepted}
+    allocator.preload(bases.values())
+
+    records = []
+    for index, password_hash in zip(accepted, password_hashes):
+        row = rows[index]
+        records.append({
+            '_row': index,
+            '_base': bases[index],
+            'username': allocator.allocate(bases[index]),
+            'email': checked['emails'][index],
+            'password_hash': password_hash,
+            'height': float(checked['heights'][index]),
+            'weight': float(checked['weights'][index]),
+            'BMI': float(checked['bmi'][index]),
+            'bmi_category': BMI_CATEGORIES[checked['categories'][index]],
+            'allergies': _clean(row.get('allergies')) or None,
+            'preferences': _clean(row.get('preferences')) or None
+        })
+    timings['allocate'] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    insert_errors: Dict[int, str] = {}
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        try:
+            db.session.execute(insert(User), [_column_values(record) for record in batch])
+            adjust_site_stats(db.session, **_count_stats(batch))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            logger.warning("Bulk insert batch at offset %s hit a constraint, inserting row by row", start)
+            insert_errors.update(_insert_individually(batch, allocator))
+    timings['insert'] = time.perf_counter() - phase
+
+    records_by_row = {record['_row']: record for record in records}
+    report = []
+    for index in range(len(rows)):
+        record = records_by_row.get(index)
+        row_errors = checked['errors'][index] or ([insert_errors[index]] if index in insert_errors else [])
+        entry = {'row': index, 'email': checked['emails'][index]}
+        if row_errors:
+            entry.update({'status': 'rejected', 'errors': row_errors})
+        else:
+            entry.update({'status': 'created', 'username': record['username'], 'BMI': record['BMI']})
+        report.append(entry)
+
+    elapsed = time.perf_counter() - started
+    created = sum(1 for entry in report if entry['status'] == 'created')
+    logger.info("Bulk import finished: %s/%s users created in %.2fs", created, len(rows), elapsed)
+
+    return {
+        'summary': {
+            'total_rows': len(rows),
+            'created': created,
+            'rejected': len(rows) - created,
+            'elapsed_seconds': round(elapsed, 3),
+            'users_per_second': round(created / elapsed, 1) if elapsed else 0.0,
+            'timings': {name: round(value, 3) for name, value in timings.items()}
+        },
+        'rows': report
+    }
+
+
+def rejected_rows(report: Dict) -> Iterable[Dict]:
+    return (entry for entry in report['rows'] if entry['status'] != 'created')
@@ -0,0 +1,230 @@
+"""
+Flask CLI commands for operational jobs
+Run from backend/ with FLASK_APP=app.py, e.g. `flask import-users patients.csv`
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), default=None,
+              help='Input format (defaults to the file extension)')
+@click.option('--batch-size', default=1000, show_default=True, help='Users per insert transaction')
+@click.option('--workers', type=int, default=None,
+              help='Password hashing processes (default: PASSWORD_HASH_WORKERS or all cores)')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False), default=None,
+              help='Write the per-row JSON report to this file')
+@with_appcontext
+def import_users_command(path, fmt, batch_size, workers, report_path):
+    """Bulk-onboard clinic patients from a CSV or JSON file"""
+    from bulk_onboarding import BulkImportError, import_users, parse_import_rows, rejected_rows
+    from password_hashing import get_password_hasher
+
+    fmt = fmt or ('json' if path.lower().endswith('.json') else 'csv')
+    try:
+        with open(path, 'rb') as handle:
+            rows = parse_import_rows(handle.read(), fmt)
+    except (BulkImportError, ValueError) as e:
+        raise click.ClickException(f"Could not read {path}: {e}")
+
+    if workers is not None:
+        get_password_hasher().resize(workers)
+    click.echo(f"📥 Importing {len(rows)} rows from {os.path.basename(path)} ({fmt})")
+    report = import_users(rows, batch_size=batch_size)
+    summary = report['summary']
+
+    click.echo(f"✅ Created: {summary['created']}   ⚠️  Rejected: {summary['rejected']}")
+    click.echo(f"⏱️  {summary['elapsed_seconds']}s total, {summary['users_per_second']} users/s "
+               f"(timings: {summary['timings']})")
+
+    for entry in list(rejected_rows(report))[:20]:
+        click.echo(f"   row {entry['row']} {entry['email'] or '<no email>'}: {'; '.join(entry['errors'])}")
+
+    if report_path:
+        with open(report_path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        click.echo(f"📝 Per-row report written to {report_path}")
+
+
+@click.command('reconcile-stats')
+@click.option('--every', 'interval', type=int, default=None,
+              help='Keep running and reconcile every N seconds (default: run once)')
+@with_appcontext
+def reconcile_stats_command(interval):
+    """Recount home page statistics and correct any counter drift"""
+    from site_stats import reconcile_site_stats
+
+    while True:
+        drift = reconcile_site_stats()
+        status = '⚠️  drift corrected' if any(drift.values()) else '✅ counters in sync'
+        click.echo(f"{status}: {drift}")
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user (default: everyone)')
+@with_appcontext
+def rebuild_rollups_command(user_id):
+    """Recompute daily nutrition rollups from raw meal history"""
+    from nutrition_rollups import rebuild_daily_rollups
+
+    days = rebuild_daily_rollups(user_id)
+    click.echo(f"✅ Rebuilt {days} daily rollup rows")
+
+
+@click.command('archive-history')
+@click.option('--older-than-months', type=int, default=None,
+              help='Archive months older than this (default: HISTORY_HOT_MONTHS)')
+@with_appcontext
+def archive_history_command(older_than_months):
+    """Move old meal history months to compressed archive files"""
+    from flask import current_app
+    from history_archive import archive_history
+
+    months = older_than_months if older_than_months is not None else current_app.config['HISTORY_HOT_MONTHS']
+    moved = archive_history(months)
+    for month, rows in moved.items():
+        click.echo(f"📦 {month}: {rows} rows archived")
+    click.echo(f"✅ Archived {sum(moved.values())} rows to {current_app.config['HISTORY_ARCHIVE_DIR']}")
+
+
+@click.command('ensure-partitions')
+@click.option('--months-ahead', type=int, default=3, show_default=True, help='Future months to create')
+@with_appcontext
+def ensure_partitions_command(months_ahead):
+    """Create upcoming monthly meal_history partitions (PostgreSQL only)"""
+    from history_archive import ensure_partitions
+
+    created = ensure_partitions(months_ahead)
+    click.echo(f"✅ Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+
+
+@click.command('project-weight-goals')
+@with_appcontext
+def project_weight_goals_command():
+    """Re-estimate every user's target weight date from their stored trend"""
+    from weight_trends import project_goal_dates
+
+    summary = project_goal_dates()
+    click.echo(f"✅ Projected {summary['users']} users ({summary['updated']} changed) "
+               f"in {summary['elapsed_seconds']}s, {summary['users_per_second']} users/s")
+
+
+@click.command('precompute-recommendations')
+@click.option('--workers', type=int, default=None, help='Scoring processes (default: RECOMMENDATION_WORKERS or all cores)')
+@click.option('--chunk-size', type=int, default=None, help='Users per scoring task')
+@with_appcontext
+def precompute_recommendations_command(workers, chunk_size):
+    """Recompute and store top-N meal recommendations for every eligible user"""
+    from flask import current_app
+    from recommendations import precompute_recommendations
+
+    config = current_app.config
+    summary = precompute_recommendations(
+        top_n=config['RECOMMENDATION_COUNT'],
+        chunk_size=chunk_size or config['RECOMMENDATION_CHUNK_SIZE'],
+        workers=workers if workers is not None else config['RECOMMENDATION_WORKERS'])
+    click.echo(f"✅ {summary['users']} users, {summary['recommendations']} recommendations stored "
+               f"in {summary['elapsed_seconds']}s ({summary['users_per_second']} users/s, "
+               f"{summary['workers']} workers)")
+
+
+@click.command('rebuild-meal-neighbors')
+@with_appcontext
+def rebuild_meal_neighbors_command():
+    """Rebuild every meal's "also liked" neighbour list from all ratings"""
+    from meal_neighbors import rebuild_meal_neighbors
+
+    summary = rebuild_meal_neighbors()
+    click.echo(f"✅ {summary['neighbors']} neighbours for {summary['meals']} meals from "
+               f"{summary['ratings']} ratings in {summary['elapsed_seconds']}s")
+
+
+@click.command('reconcile-ratings')
+@with_appcontext
+def reconcile_ratings_command():
+    """Recount meal rating aggregates from MealRating and correct any drift"""
+    from rating_stats import reconcile_rating_stats
+
+    result = reconcile_rating_stats()
+    status = '⚠️  drift corrected' if result['corrected'] else '✅ aggregates in sync'
+    click.echo(f"{status}: {result['corrected']} of {result['meals']} meals")
+
+
+@click.command('sync-meal-categories')
+@with_appcontext
+def sync_meal_categories_command():
+    """Re-evaluate category rules over the whole catalog and sync meal tags"""
+    from meal_tagging import sync_meal_categories
+
+    for name, change in sync_meal_categories().items():
+        click.echo(f"✅ {name}: +{change['added']} / -{change['removed']}")
+
+
+@click.command('rebuild-ingredient-index')
+@with_appcontext
+def rebuild_ingredient_index_command():
+    """Re-tokenize every meal's ingredients and sync the posting lists"""
+    from ingredient_index import index_meal_ingredients
+
+    summary = index_meal_ingredients()
+    click.echo(f"✅ {summary['terms']} ingredient terms, {summary['postings']} postings "
+               f"(+{summary['added']} / -{summary['removed']})")
+
+
+@click.command('refresh-recipes')
+@with_appcontext
+def refresh_recipes_command():
+    """Recompute every recipe's rolled-up nutrients from its components"""
+    from recipes import refresh_all_recipes
+
+    summary = refresh_all_recipes()
+    click.echo(f"✅ Refreshed {summary['recipes']} recipes")
+
+
+@click.command('weekly-reports')
+@click.option('--week', default=None, help='Monday of the week to report, YYYY-MM-DD (default: last week)')
+@click.option('--workers', type=int, default=None, help='Render processes (default: WEEKLY_REPORT_WORKERS or all cores)')
+@with_appcontext
+def weekly_reports_command(week, workers):
+    """Write every user's weekly nutrition summary email to the outbox"""
+    from flask import current_app
+    from weekly_reports import generate_weekly_reports, week_start
+
+    try:
+        start = week_start(datetime.strptime(week, '%Y-%m-%d').date()) if week else None
+    except ValueError:
+        raise click.BadParameter('week must be YYYY-MM-DD', param_hint='--week')
+    config = current_app.config
+    summary = generate_weekly_reports(
+        start, batch_size=config['WEEKLY_REPORT_BATCH_SIZE'],
+        workers=workers if workers is not None else config['WEEKLY_REPORT_WORKERS'])
+    click.echo(f"✅ {summary['reports']} weekly reports for {summary['week_start']} written to {summary['outbox']} "
+               f"in {summary['elapsed_seconds']}s ({summary['users_per_second']} users/s, "
+               f"{summary['workers']} workers)")
+
+
+def register_commands(app):
+    """Register CLI commands on the application"""
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(reconcile_stats_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(archive_history_command)
+    app.cli.add_command(ensure_partitions_command)
+    app.cli.add_command(project_weight_goals_command)
+    app.cli.add_command(precompute_recommendations_command)
+    app.cli.add_command(rebuild_meal_neighbors_command)
+    app.cli.add_command(reconcile_ratings_command)
+    app.cli.add_command(sync_meal_categories_command)
+    app.cli.add_command(rebuild_ingredient_index_command)
+    app.cli.add_command(refresh_recipes_command)
+    app.cli.add_command(weekly_reports_command)
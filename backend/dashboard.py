@@ -0,0 +1,125 @@
+"""
+Personal dashboard in one round trip
+build_dashboard() gathers the profile, today's intake against the current
+NutritionGoal, recent meals, recommendations and the weight trend. On a
+server database the sections run concurrently on a small thread pool, each in
+its own app context and so on its own session and connection, overlapping
+their network round trips. SQLite runs in-process with nothing to overlap
+(and an in-memory database is private to one connection), so there they run
+in turn on the request's session. The assembled result
+is cached per user in a UserCache, which dashboard_invalidation drops after
+a commit that wrote any of the user's rows, so a repeat visit is served
+without a query. The cache is per process: a worker that did not handle the
+commit serves its copy for up to DASHBOARD_CACHE_TTL seconds.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from api_tokens import get_user_snapshot
+from dashboard_invalidation import dashboard_cache, finish_build, start_build
+from models import db, adjusted_nutrition, Meal, MealHistory
+from nutrition_rollups import daily_intake
+from recommendations import get_recommendations
+from weight_trends import weight_progress
+
+logger = logging.getLogger(__name__)
+
+RECENT_MEALS = 10
+DASHBOARD_RECOMMENDATIONS = 5
+WEIGHT_DAYS = 30
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def recent_meals(user_id: int, limit: int = RECENT_MEALS) -> List[Dict]:
+    """The user's latest logged meals, newest first, off the (user_id, date) index"""
+    rows = db.session.execute(
+        select(MealHistory.id, MealHistory.date, MealHistory.portion_size, Meal)
+        .join(Meal, Meal.id == MealHistory.meal_id)
+        .where(MealHistory.user_id == user_id)
+        .order_by(MealHistory.date.desc(), MealHistory.id.desc()).limit(limit)
+    ).all()
+    return [{'id': entry_id, 'meal_id': meal.id, 'meal_name': meal.name, 'date': logged_at.isoformat(),
+             'portion_size': portion_size, 'nutrition': adjusted_nutrition(meal, portion_size)}
+            for entry_id, logged_at, portion_size, meal in rows]
+
+
+def _get_executor(workers: int) -> Optional[ThreadPoolExecutor]:
+    if workers <= 1:
+        return None
+    # Created lazily and per process so a pre-forking server never shares a pool
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _runs_serially(engine) -> bool:
+    """Threads only pay off when queries wait on a database server"""
+    return engine.dialect.name == 'sqlite'
+
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        try:
+            return fn(*args)
+        finally:
+            db.session.remove()
+
+
+def build_dashboard(user: Dict, today=None) -> Dict:
+    """Every dashboard section for a user snapshot, the queries issued concurrently where possible"""
+    user_id = user['id']
+    today = today or datetime.utcnow().date()
+    sections = {
+        'today': (daily_intake, user_id, today),
+        'recent_meals': (recent_meals, user_id),
+        'recommendations': (get_recommendations, user, DASHBOARD_RECOMMENDATIONS),
+        'weight': (weight_progress, user_id, WEIGHT_DAYS),
+    }
+
+    executor = _get_executor(current_app.config.get('DASHBOARD_WORKERS', len(sections)))
+    if executor is None or _runs_serially(db.engine):
+        results = {name: fn(*args) for name, (fn, *args) in sections.items()}
+    else:
+        app = current_app._get_current_object()
+        futures = {name: executor.submit(_in_app_context, app, fn, *args) for name, (fn, *args) in sections.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    return {'user': user, 'date': today.isoformat(), 'generated_at': datetime.utcnow().isoformat(), **results}
+
+
+def get_dashboard(user_id: int) -> Optional[Dict]:
+    """Cached dashboard for a user; None if the user does not exist"""
+    dashboard = dashboard_cache.get(user_id)
+    # A cached dashboard belongs to the day it was built on
+    if dashboard is not None and dashboard['date'] == datetime.utcnow().date().isoformat():
+        return dashboard
+    build = start_build(user_id)
+    dashboard = None
+    try:
+        user = get_user_snapshot(user_id)
+        if user is not None:
+            dashboard = build_dashboard(user)
+    finally:
+        finish_build(user_id, build, dashboard)
+    return dashboard
+
+
+def init_dashboard(app):
+    """Size the dashboard cache from DASHBOARD_CACHE_* config"""
+    dashboard_cache.ttl = app.config.get('DASHBOARD_CACHE_TTL', 60)
+    dashboard_cache.max_size = app.config.get('DASHBOARD_CACHE_SIZE', 10000)
@@ -0,0 +1,90 @@
+"""
+Dashboard cache and its invalidation
+Kept apart from dashboard.py, which pulls in every section it renders, so
+write paths can report the users they touched without importing any of them.
+After a commit that wrote any of a user's rows (meal history, goals, profile,
+weight, ratings, the user itself), that user's cached dashboard is dropped,
+along with any build of it still in flight, so this process never serves it
+from rows read before the commit. The cache is per process, like UserCache:
+other workers keep their copy until DASHBOARD_CACHE_TTL lapses.
+"""
+
+import threading
+from itertools import chain
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from api_tokens import UserCache
+from models import MealHistory, MealRating, NutritionGoal, User, UserProfile, WeightLog
+
+PENDING_KEY = 'dashboard_users'  # session.info entry: users whose cached dashboard a commit must drop
+
+# Models whose rows feed a user's dashboard; a write to any of them invalidates that user's entry
+_USER_ROWS = (MealHistory, NutritionGoal, UserProfile, WeightLog, MealRating)
+
+# One cache per process, sized by dashboard.init_dashboard
+dashboard_cache = UserCache(ttl=60.0, max_size=10000)
+
+# Builds in flight per user; dropping a user's entry also drops these, so a build that
+# read the rows before a commit cannot put its stale result after the commit's invalidation
+_builds: Dict[int, Set[object]] = {}
+_builds_lock = threading.Lock()
+
+
+def start_build(user_id: int) -> object:
+    """Register a dashboard build for a user; pass the token to finish_build"""
+    build = object()
+    with _builds_lock:
+        _builds.setdefault(user_id, set()).add(build)
+    return build
+
+
+def finish_build(user_id: int, build: object, dashboard: Optional[Dict]):
+    """Cache a finished build unless the user's entry was dropped while it ran"""
+    with _builds_lock:
+        builds = _builds.get(user_id)
+        if builds is None or build not in builds:
+            return
+        builds.discard(build)
+        if not builds:
+            del _builds[user_id]
+        if dashboard is not None:
+            dashboard_cache.put(user_id, dashboard)
+
+
+def _drop_dashboard(user_id: int):
+    with _builds_lock:
+        _builds.pop(user_id, None)
+        dashboard_cache.invalidate(user_id)
+
+
+def user_rows_written(session, user_id: int):
+    """Record a Core write to a user's rows, which the flush hook below cannot see"""
+    session.info.setdefault(PENDING_KEY, set()).add(user_id)
+    _drop_dashboard(user_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dashboard_users(session, flush_context):
+    users = {instance.id if isinstance(instance, User) else instance.user_id
+             for instance in chain(session.new, session.dirty, session.deleted)
+             if isinstance(instance, (User,) + _USER_ROWS)}
+    users.discard(None)
+    if users:
+        session.info.setdefault(PENDING_KEY, set()).update(users)
+        for user_id in users:  # also now, so a read before the commit cannot outlive it
+            _drop_dashboard(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_dashboards(session):
+    # Dropped again after the commit, with any rebuild that raced the transaction and read the old rows
+    for user_id in session.info.pop(PENDING_KEY, ()):
+        _drop_dashboard(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Local FoodData Central stand-in server for offline ingestion testing
+Serves synthetic foods in the FDC search-result shape with configurable
+catalog size, latency and 429/5xx fault injection
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+# Vocabulary used to build synthetic food descriptions. Includes the terms
+# USDANutritionFetcher searches for so ingestion runs find matches.
+FOOD_BASES = [
+    'greek yogurt plain', 'oatmeal steel cut', 'egg white', 'cottage cheese low fat',
+    'protein smoothie', 'whole grain toast', 'chicken breast', 'salmon', 'turkey breast',
+    'cod fillet', 'lean ground turkey', 'tuna canned water', 'tofu firm', 'tempeh',
+    'lentils', 'black beans', 'broccoli', 'spinach', 'kale', 'asparagus', 'cauliflower',
+    'brussels sprouts', 'sweet potato', 'quinoa', 'brown rice', 'avocado', 'almonds',
+    'walnuts', 'hummus', 'olive oil extra virgin', 'chia seeds', 'flaxseed ground',
+    'cucumber', 'celery', 'carrot', 'bell pepper', 'tomato', 'lettuce romaine', 'cabbage',
+    'apple', 'pear', 'berries mixed', 'beans kidney', 'chickpeas', 'edamame',
+    'artichoke hearts'
+]
+
+PREPARATIONS = [
+    'raw', 'cooked', 'boiled', 'steamed', 'baked', 'grilled', 'roasted', 'fresh',
+    'frozen', 'canned', 'steel cut', 'scrambled', 'massaged', 'plain'
+]
+
+DATA_TYPES = ['Foundation', 'SR Legacy', 'Branded']
+
+# (nutrientId, nutrientNumber, nutrientName, unitName, low, high)
+NUTRIENTS = [
+    (1008, '208', 'Energy', 'KCAL', 20, 650),
+    (1003, '203', 'Protein', 'G', 0.0, 40.0),
+    (1005, '205', 'Carbohydrate, by difference', 'G', 0.0, 80.0),
+    (1004, '204', 'Total lipid (fat)', 'G', 0.0, 35.0),
+    (1079, '291', 'Fiber, total dietary', 'G', 0.0, 15.0),
+    (2000, '269', 'Sugars, total including NLEA', 'G', 0.0, 30.0),
+    (1093, '307', 'Sodium, Na', 'MG', 0.0, 900.0),
+]
+
+
+class SyntheticFoodCatalog:
+    """Deterministic synthetic food catalog with a token index for search"""
+
+    def __init__(self, food_count: int = 10000, seed: int = 42, first_fdc_id: int = 100000):
+        self.food_count = food_count
+        self.seed = seed
+        self.first_fdc_id = first_fdc_id
+        self.descriptions: List[str] = []
+        self.data_types: List[str] = []
+        self._token_index: Dict[str, List[int]] = {}
+
+        rng = random.Random(seed)
+        for offset in range(food_count):
+            description = f"{rng.choice(FOOD_BASES)}, {rng.choice(PREPARATIONS)}".title()
+            self.descriptions.append(description)
+            self.data_types.append(rng.choice(DATA_TYPES))
+            for token in set(description.lower().replace(',', ' ').split()):
+                self._token_index.setdefault(token, []).append(offset)
+
+    def search(self, query: str, data_types: Optional[List[str]] = None) -> List[int]:
+        """Return catalog offsets whose description contains every query token"""
+        tokens = query.lower().replace(',', ' ').split()
+        if not tokens:
+            matches = range(self.food_count)
+        else:
+            postings = sorted((self._token_index.get(token, []) for token in tokens), key=len)
+            matches = postings[0]
+            for posting in postings[1:]:
+                posting_set = set(posting)
+                matches = [offset for offset in matches if offset in posting_set]
+
+        if data_types:
+            wanted = set(data_types)
+            return [offset for offset in matches if self.data_types[offset] in wanted]
+        return list(matches)
+
+    def offset_for(self, fdc_id: int) -> Optional[int]:
+        offset = fdc_id - self.first_fdc_id
+        return offset if 0 <= offset < self.food_count else None
+
+    def food(self, offset: int) -> Dict:
+        """Build the FDC search-result representation of one synthetic food"""
+        rng = random.Random(self.seed * 1000003 + offset)
+        nutrients = []
+        for nutrient_id, number, name, unit, low, high in NUTRIENTS:
+            value = rng.uniform(low, high)
+            nutrients.append({
+                'nutrientId': nutrient_id,
+                'nutrientName': name,
+                'nutrientNumber': number,
+                'unitName': unit,
+                'value': int(value) if unit == 'KCAL' else round(value, 2)
+            })
+
+        return {
+            'fdcId': self.first_fdc_id + offset,
+            'description': self.descriptions[offset],
+            'dataType': self.data_types[offset],
+            'publishedDate': '2019-04-01',
+            'foodNutrients': nutrients
+        }
+
+
+def _list_param(name: str) -> List[str]:
+    """Read a query parameter sent either repeated or comma separated"""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(part.strip() for part in raw.split(',') if part.strip())
+    return values
+
+
+def create_mock_fdc_app(food_count: int = 10000, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                        rate_429: float = 0.0, rate_5xx: float = 0.0, seed: int = 42,
+                        require_api_key: bool = True) -> Flask:
+    """Create the FDC-compatible mock application
+
+    Routes live under /fdc/v1 so a fetcher only needs its base URL swapped.
+    Injected failures are decided per request before any work is done.
+    """
+    app = Flask(__name__)
+    catalog = SyntheticFoodCatalog(food_count=food_count, seed=seed)
+    fault_rng = random.Random(seed + 1)
+    stats_lock = threading.Lock()
+    stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'server_errors': 0, 'foods_served': 0}
+
+    app.config['FDC_CATALOG'] = catalog
+    app.config['FDC_STATS'] = stats
+
+    def count(key: str, amount: int = 1):
+        with stats_lock:
+            stats[key] += amount
+
+    @app.before_request
+    def simulate_network():
+        if request.endpoint == 'mock_stats':
+            return None
+        count('requests')
+
+        if latency_ms or jitter_ms:
+            time.sleep(max(0.0, latency_ms + fault_rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+        if require_api_key and not request.args.get('api_key'):
+            return jsonify({'error': {'code': 'API_KEY_MISSING',
+                                      'message': 'No api_key was supplied.'}}), 403
+
+        roll = fault_rng.random()
+        if roll < rate_429:
+            count('rate_limited')
+            response = jsonify({'error': {'code': 'OVER_RATE_LIMIT',
+                                          'message': 'You have exceeded your rate limit.'}})
+            response.status_code = 429
+            response.headers['Retry-After'] = '1'
+            return response
+        if roll < rate_429 + rate_5xx:
+            count('server_errors')
+            status = fault_rng.choice([500, 502, 503])
+            return jsonify({'error': {'code': 'SERVER_ERROR',
+                                      'message': f'Injected upstream failure ({status})'}}), status
+
+    @app.route('/fdc/v1/foods/search', methods=['GET', 'POST'])
+    def foods_search():
+        params = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+        query = params.get('query', request.args.get('query', ''))
+        data_types = params.get('dataType') or _list_param('dataType')
+        try:
+            page_size = max(1, min(int(params.get('pageSize', request.args.get('pageSize', 50))), 200))
+            page_number = max(1, int(params.get('pageNumber', request.args.get('pageNumber', 1))))
+        except (TypeError, ValueError):
+            return jsonify({'error': {'code': 'BAD_REQUEST',
+                                      'message': 'pageSize and pageNumber must be integers'}}), 400
+
+        matches = catalog.search(query, data_types)
+        start = (page_number - 1) * page_size
+        foods = [catalog.food(offset) for offset in matches[start:start + page_size]]
+        count('ok')
+        count('foods_served', len(foods))
+
+        return jsonify({
+            'totalHits': len(matches),
+            'currentPage': page_number,
+            'totalPages': (len(matches) + page_size - 1) // page_size,
+            'foodSearchCriteria': {'query': query, 'dataType': data_types,
+                                   'pageSize': page_size, 'pageNumber': page_number},
+            'foods': foods
+        })
+
+    @app.route('/fdc/v1/foods', methods=['GET', 'POST'])
+    def foods():
+        if request.method == 'POST':
+            raw_ids = (request.get_json(silent=True) or {}).get('fdcIds', [])
+        else:
+            raw_ids = _list_param('fdcIds')
+
+        try:
+            fdc_ids = [int(fdc_id) for fdc_id in raw_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': {'code': 'BAD_REQUEST', 'message': 'fdcIds must be integers'}}), 400
+
+        if not fdc_ids or len(fdc_ids) > 20:
+            return jsonify({'error': {'code': 'BAD_REQUEST',
+                                      'message': 'Between 1 and 20 fdcIds are required'}}), 400
+
+        offsets = [catalog.offset_for(fdc_id) for fdc_id in fdc_ids]
+        result = [catalog.food(offset) for offset in offsets if offset is not None]
+        count('ok')
+        count('foods_served', len(result))
+        return jsonify(result)
+
+    @app.route('/fdc/v1/food/<int:fdc_id>')
+    def food(fdc_id):
+        offset = catalog.offset_for(fdc_id)
+        if offset is None:
+            return jsonify({'error': {'code': 'NOT_FOUND', 'message': f'No food with fdcId {fdc_id}'}}), 404
+        count('ok')
+        count('foods_served')
+        return jsonify(catalog.food(offset))
+
+    @app.route('/fdc/v1/_stats')
+    def mock_stats():
+        with stats_lock:
+            return jsonify(dict(stats))
+
+    return app
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, **options):
+    """Run the mock server on a daemon thread; returns (server, base_url)
+
+    Pass port=0 to bind a free port. Call server.shutdown() when done.
+    """
+    app = create_mock_fdc_app(**options)
+    server = make_server(host, port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_port}/fdc/v1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local FoodData Central stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--foods', type=int, default=10000, help='synthetic catalog size')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='+/- random latency jitter')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fraction of requests answered 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='fraction of requests answered 5xx')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_mock_fdc_app(food_count=args.foods, latency_ms=args.latency_ms,
+                              jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                              rate_5xx=args.rate_5xx, seed=args.seed)
+
+    print("🧪 FoodData Central mock server")
+    print(f"📦 Synthetic foods: {args.foods}")
+    print(f"⏱️  Latency: {args.latency_ms}ms ± {args.jitter_ms}ms")
+    print(f"🚦 Fault injection: 429={args.rate_429:.1%} 5xx={args.rate_5xx:.1%}")
+    print(f"🌐 Base URL: http://{args.host}:{args.port}/fdc/v1")
+    print(f"   export USDA_API_BASE_URL=http://{args.host}:{args.port}/fdc/v1")
+
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""
+Monthly partitions and cold archive for meal history
+On PostgreSQL meal_history is range-partitioned by month (see migration
+a4d7c91e3b58) and ensure_partitions() creates upcoming months ahead of time.
+archive_history() moves whole months older than the hot window into compressed
+columnar .npz files and drops them from the database; history_entries() reads
+the hot table and only opens archive files when the range reaches past the
+archive horizon. Daily rollups of archived months are kept, so totals and
+charts never need the files.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from threading import Lock
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, func, select, text
+
+from models import db, MealHistory, MealHistoryArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = ('id', 'user_id', 'meal_id', 'date', 'portion_size', 'client_key')
+DEFAULT_PARTITION = 'meal_history_default'
+HORIZON_CACHE_SECONDS = 60
+LOADED_ARCHIVE_LIMIT = 12
+
+_history_table = MealHistory.__table__
+
+_horizon_lock = Lock()
+_horizon_cache = {'value': None, 'expires': 0.0}
+_loaded_lock = Lock()
+_loaded_archives: 'OrderedDict[tuple, Dict[str, np.ndarray]]' = OrderedDict()
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'meal_history_p{month:%Y_%m}'
+
+
+def _is_partitioned(connection) -> bool:
+    if connection.dialect.name != 'postgresql':
+        return False
+    kind = connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('meal_history')")).scalar()
+    return kind == 'p'
+
+
+def _partition_exists(connection, month: date) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"),
+                              {'name': partition_name(month)}).scalar()
+
+
+def _create_partition(connection, month: date):
+    connection.execute(text(
+        f"CREATE TABLE {partition_name(month)} PARTITION OF meal_history "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+def _create_partition_from_default(connection, month: date) -> int:
+    """Create a month's partition when the default partition already holds rows for it; returns rows moved
+
+    PostgreSQL refuses to create the partition while the default one has matching
+    rows, so the default is detached, the partition created, the month's rows moved
+    across and the default attached again, all in the caller's transaction.
+    """
+    bounds = {'start': month, 'end': add_months(month, 1)}
+    columns = ', '.join(ARCHIVE_COLUMNS)
+    connection.execute(text(f"ALTER TABLE meal_history DETACH PARTITION {DEFAULT_PARTITION}"))
+    _create_partition(connection, month)
+    moved = connection.execute(text(
+        f"INSERT INTO meal_history ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} "
+        f"WHERE date >= :start AND date < :end"), bounds).rowcount
+    connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"), bounds)
+    connection.execute(text(f"ALTER TABLE meal_history ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return moved
+
+
+def ensure_partitions(months_ahead: int = 3) -> List[str]:
+    """Create monthly partitions from last month to months_ahead; no-op unless partitioned
+
+    Rows that already landed in the default partition for one of those months
+    are moved into the new partition.
+    """
+    connection = db.session.connection()
+    if not _is_partitioned(connection):
+        return []
+
+    has_default = connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"),
+                                     {'name': DEFAULT_PARTITION}).scalar()
+    created = []
+    this_month = month_start(datetime.utcnow())
+    for offset in range(-1, months_ahead + 1):
+        month = add_months(this_month, offset)
+        if _partition_exists(connection, month):
+            continue
+        in_default = has_default and connection.execute(text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end)"),
+            {'start': month, 'end': add_months(month, 1)}).scalar()
+        if in_default:
+            moved = _create_partition_from_default(connection, month)
+            logger.warning("Moved %s meal history rows for %s out of the default partition", moved, f'{month:%Y-%m}')
+        else:
+            _create_partition(connection, month)
+        created.append(partition_name(month))
+    db.session.commit()
+    if created:
+        logger.info("Created meal history partitions: %s", ', '.join(created))
+    return created
+
+
+def _archive_dir() -> str:
+    return current_app.config.get('HISTORY_ARCHIVE_DIR') or os.path.join(current_app.instance_path,
+                                                                         'meal_history_archive')
+
+
+def _to_columns(rows) -> Dict[str, np.ndarray]:
+    return {
+        'id': np.array([row.id for row in rows], dtype=np.int64),
+        'user_id': np.array([row.user_id for row in rows], dtype=np.int64),
+        'meal_id': np.array([row.meal_id for row in rows], dtype=np.int64),
+        'date': np.array([row.date for row in rows], dtype='datetime64[us]'),
+        'portion_size': np.array([1.0 if row.portion_size is None else row.portion_size for row in rows],
+                                 dtype=np.float64),
+        'client_key': np.array([row.client_key or '' for row in rows], dtype='U64'),
+    }
+
+
+def _load_archive(path: str) -> Dict[str, np.ndarray]:
+    """Columns of one archive file, keeping the most recently used files in memory"""
+    key = (path, os.path.getmtime(path))
+    with _loaded_lock:
+        columns = _loaded_archives.get(key)
+        if columns is not None:
+            _loaded_archives.move_to_end(key)
+            return columns
+    with np.load(path) as archive:
+        columns = {name: archive[name] for name in ARCHIVE_COLUMNS}
+    with _loaded_lock:
+        _loaded_archives[key] = columns
+        while len(_loaded_archives) > LOADED_ARCHIVE_LIMIT:
+            _loaded_archives.popitem(last=False)
+    return columns
+
+
+def _write_archive(path: str, columns: Dict[str, np.ndarray]):
+    """Write atomically so readers never see a half-written file"""
+    temporary = f'{path}.tmp.npz'
+    np.savez_compressed(temporary, **columns)
+    os.replace(temporary, path)
+
+
+def _merge_columns(existing: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Append new rows to an existing month, ignoring ids already archived by an interrupted run"""
+    keep = ~np.isin(new['id'], existing['id'])
+    return {name: np.concatenate([existing[name], new[name][keep]]) for name in ARCHIVE_COLUMNS}
+
+
+def _drop_partition(connection, month: date):
+    if _is_partitioned(connection) and _partition_exists(connection, month):
+        connection.execute(text(f"ALTER TABLE meal_history DETACH PARTITION {partition_name(month)}"))
+        connection.execute(text(f"DROP TABLE {partition_name(month)}"))
+
+
+def archive_month(month: date, archive_dir: Optional[str] = None) -> int:
+    """Move one month of history into its archive file; returns rows moved"""
+    archive_dir = archive_dir or _archive_dir()
+    os.makedirs(archive_dir, exist_ok=True)
+    start, end = (datetime.combine(day, datetime.min.time()) for day in (month, add_months(month, 1)))
+    in_month = (_history_table.c.date >= start, _history_table.c.date < end)
+
+    rows = db.session.execute(
+        select(*[_history_table.c[name] for name in ARCHIVE_COLUMNS]).where(*in_month)
+        .order_by(_history_table.c.date, _history_table.c.id)
+    ).all()
+    connection = db.session.connection()
+    if not rows:
+        _drop_partition(connection, month)
+        db.session.commit()
+        return 0
+
+    manifest = db.session.get(MealHistoryArchive, month)
+    filename = f'meal_history_{month:%Y_%m}.npz'
+    path = os.path.join(archive_dir, filename)
+    columns = _to_columns(rows)
+    if manifest is not None and os.path.exists(path):
+        columns = _merge_columns(_load_archive(path), columns)
+    _write_archive(path, columns)
+
+    if manifest is None:
+        manifest = MealHistoryArchive(month=month, filename=filename)
+        db.session.add(manifest)
+    manifest.row_count = len(columns['id'])
+    manifest.archived_at = datetime.utcnow()
+
+    # Core delete: rollups of archived days stay in daily_nutrition on purpose
+    _drop_partition(connection, month)
+    connection.execute(delete(_history_table).where(*in_month))
+    db.session.commit()
+    _reset_horizon()
+
+    logger.info("Archived %s meal history rows for %s to %s", len(rows), f'{month:%Y-%m}', path)
+    return len(rows)
+
+
+def archive_history(older_than_months: int = 12, archive_dir: Optional[str] = None) -> Dict[str, int]:
+    """Archive every month that ended more than older_than_months ago; returns rows per month"""
+    cutoff = datetime.combine(add_months(month_start(datetime.utcnow()), -older_than_months), datetime.min.time())
+    oldest = db.session.execute(
+        select(func.min(_history_table.c.date)).where(_history_table.c.date < cutoff)
+    ).scalar()
+    if oldest is None:
+        return {}
+
+    moved = {}
+    month = month_start(oldest)
+    while month < cutoff.date():
+        moved[f'{month:%Y-%m}'] = archive_month(month, archive_dir)
+        month = add_months(month, 1)
+    return moved
+
+
+def _reset_horizon():
+    with _horizon_lock:
+        _horizon_cache['expires'] = 0.0
+
+
+def archive_horizon() -> Optional[date]:
+    """First day not covered by any archive (None when nothing is archived), cached briefly"""
+    now = time.monotonic()
+    with _horizon_lock:
+        if now < _horizon_cache['expires']:
+            return _horizon_cache['value']
+    latest = db.session.execute(select(func.max(MealHistoryArchive.month))).scalar()
+    value = add_months(latest, 1) if latest else None
+    with _horizon_lock:
+        _horizon_cache.update(value=value, expires=now + HORIZON_CACHE_SECONDS)
+    return value
+
+
+def _archive_columns(manifest: MealHistoryArchive, archive_dir: str) -> Optional[Dict[str, np.ndarray]]:
+    path = os.path.join(archive_dir, manifest.filename)
+    if not os.path.exists(path):
+        logger.error("Meal history archive %s is missing", path)
+        return None
+    return _load_archive(path)
+
+
+def _archived_entries(user_id: int, start: datetime, end: datetime) -> List[Dict]:
+    archive_dir = _archive_dir()
+    months = MealHistoryArchive.query.filter(MealHistoryArchive.month >= month_start(start),
+                                             MealHistoryArchive.month < end.date()).all()
+    entries = []
+    lower, upper = np.datetime64(start, 'us'), np.datetime64(end, 'us')
+    for manifest in months:
+        columns = _archive_columns(manifest, archive_dir)
+        if columns is None:
+            continue
+        mask = (columns['user_id'] == user_id) & (columns['date'] >= lower) & (columns['date'] < upper)
+        for index in np.flatnonzero(mask):
+            entries.append({
+                'id': int(columns['id'][index]),
+                'user_id': user_id,
+                'meal_id': int(columns['meal_id'][index]),
+                'date': columns['date'][index].astype(datetime),
+                'portion_size': float(columns['portion_size'][index]),
+                'client_key': str(columns['client_key'][index]) or None,
+            })
+    return entries
+
+
+def archived_client_keys(user_id: int, keys_by_month: Dict[date, Set[str]]) -> Dict[str, int]:
+    """{client_key: id} of a user's keys found in the archive files of the given months"""
+    archive_dir = _archive_dir()
+    found = {}
+    for manifest in MealHistoryArchive.query.filter(MealHistoryArchive.month.in_(list(keys_by_month))):
+        columns = _archive_columns(manifest, archive_dir)
+        if columns is None:
+            continue
+        mask = (columns['user_id'] == user_id) & np.isin(columns['client_key'], sorted(keys_by_month[manifest.month]))
+        found.update((str(columns['client_key'][index]), int(columns['id'][index])) for index in np.flatnonzero(mask))
+    return found
+
+
+def history_entries(user_id: int, start: datetime, end: datetime) -> List[Dict]:
+    """A user's history rows with start <= date < end from the hot table and, if needed, the archive"""
+    rows = db.session.execute(
+        select(*[_history_table.c[name] for name in ARCHIVE_COLUMNS])
+        .where(_history_table.c.user_id == user_id, _history_table.c.date >= start, _history_table.c.date < end)
+    )
+    entries = {row.id: dict(row._mapping) for row in rows}
+
+    horizon = archive_horizon()
+    if horizon is not None and start < datetime.combine(horizon, datetime.min.time()):
+        for entry in _archived_entries(user_id, start, end):
+            entries.setdefault(entry['id'], entry)
+
+    return sorted(entries.values(), key=lambda entry: (entry['date'], entry['id']))
@@ -0,0 +1,193 @@
+"""
+Ingredient dictionary and posting lists
+Meal.ingredients is free text. index_meal_ingredients() splits it into
+normalized terms (lowercase, singular, descriptors such as "boneless" or
+"chopped" dropped), keeps one Ingredient row per term, and stores a posting
+row per (ingredient, meal) in meal_ingredient. Its primary key is
+(ingredient_id, meal_id), so each term's posting list is one ordered index
+range. Include/exclude queries then become posting-list intersections in
+the database (self-joins probing that key), with family words ("dairy", "nuts", ...) expanded to
+their member terms. Meals added or edited through the ORM are indexed in the
+same flush; populate_usda_meals() and the recipe rollups, which write with
+Core, re-index afterwards, writing only the difference.
+"""
+
+import logging
+import re
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, delete, event, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, Ingredient, Meal, meal_ingredient
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTORS = {
+    'a', 'an', 'the', 'of', 'in', 'fresh', 'raw', 'cooked', 'boneless', 'skinless', 'chopped', 'sliced',
+    'diced', 'minced', 'grated', 'ground', 'organic', 'whole', 'low', 'reduced', 'fat', 'free', 'sodium',
+    'natural', 'plain', 'unsweetened', 'sweetened', 'large', 'small', 'medium', 'extra', 'virgin', 'dried',
+    'frozen', 'canned', 'live', 'active', 'culture', 'style', 'piece', 'fillet', 'steel', 'cut', 'lean',
+}
+
+# Family word -> member terms, so "not dairy" also rules out cheese and whey
+INGREDIENT_FAMILIES = {
+    'dairy': {'milk', 'cheese', 'butter', 'cream', 'yogurt', 'whey', 'casein', 'lactose', 'ghee', 'kefir',
+              'mozzarella', 'cheddar', 'parmesan', 'ricotta', 'feta'},
+    'nuts': {'nut', 'almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut', 'peanut', 'macadamia'},
+    'gluten': {'wheat', 'barley', 'rye', 'flour', 'bread', 'pasta', 'couscous', 'semolina', 'spelt', 'bulgur'},
+    'eggs': {'egg'},
+    'fish': {'fish', 'salmon', 'tuna', 'cod', 'tilapia', 'sardine', 'anchovy', 'shrimp', 'prawn', 'crab',
+             'lobster', 'clam', 'mussel', 'oyster', 'scallop'},
+    'soy': {'soy', 'soya', 'tofu', 'edamame', 'tempeh', 'miso'},
+    'meat': {'chicken', 'beef', 'pork', 'turkey', 'bacon', 'ham', 'lamb', 'sausage', 'steak'},
+}
+FAMILY_ALIASES = {'nut': 'nuts', 'egg': 'eggs', 'seafood': 'fish', 'shellfish': 'fish', 'soya': 'soy'}
+
+_SEPARATORS = re.compile(r'[,;:()\[\]/&+]|\band\b|\bwith\b|\bor\b')
+_WORDS = re.compile(r'[a-z]+')
+
+
+def singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    return word[:-1] if word.endswith('s') else word
+
+
+def _words(text: str) -> List[str]:
+    return [term for term in (singular(word) for word in _WORDS.findall(text)) if term not in DESCRIPTORS]
+
+
+@lru_cache(maxsize=65536)
+def _part_terms(part: str) -> FrozenSet[str]:
+    # Catalogs repeat the same phrases ("brown rice", "olive oil"), so each is normalized once
+    return frozenset(_words(part))
+
+
+def ingredient_terms(text: Optional[str]) -> Set[str]:
+    """Normalized ingredient terms in a free-text ingredient list"""
+    terms = set()
+    for part in _SEPARATORS.split((text or '').lower()):
+        terms.update(_part_terms(part.strip()))
+    return terms
+
+
+def query_groups(term: str) -> List[Set[str]]:
+    """A query term as groups that must all match, each satisfied by any of its terms"""
+    words = _words(term.lower())
+    if len(words) == 1:
+        family = FAMILY_ALIASES.get(words[0], words[0])
+        if family in INGREDIENT_FAMILIES:
+            return [INGREDIENT_FAMILIES[family] | {words[0]}]
+    return [{word} for word in words]
+
+
+def write_postings(connection, meal_ids: Optional[Iterable[int]] = None,
+                    batch_size: int = 5000) -> Dict[str, int]:
+    """Re-tokenize meals (all, or the given ids) and write only the posting changes, without committing"""
+    meal_ids = list(meal_ids) if meal_ids is not None else None
+    in_scope = [Meal.id.in_(meal_ids)] if meal_ids is not None else []
+    wanted: Set[Tuple[int, str]] = set()
+    for meal_id, text in connection.execute(select(Meal.id, Meal.ingredients).where(*in_scope)):
+        wanted.update((meal_id, term) for term in ingredient_terms(text))
+
+    dictionary = dict(connection.execute(select(Ingredient.name, Ingredient.id)).all())
+    new_terms = sorted({term for _, term in wanted} - set(dictionary))
+    if new_terms:
+        connection.execute(insert(Ingredient), [{'name': term} for term in new_terms])
+        dictionary = dict(connection.execute(select(Ingredient.name, Ingredient.id)).all())
+    wanted_ids = {(meal_id, dictionary[term]) for meal_id, term in wanted}
+
+    postings = meal_ingredient.c
+    current = {(meal_id, ingredient_id) for meal_id, ingredient_id in connection.execute(
+        select(postings.meal_id, postings.ingredient_id)
+        .where(*([postings.meal_id.in_(meal_ids)] if meal_ids is not None else [])))}
+    added, removed = sorted(wanted_ids - current), sorted(current - wanted_ids)
+
+    for start in range(0, len(added), batch_size):
+        connection.execute(insert(meal_ingredient), [
+            {'meal_id': meal_id, 'ingredient_id': ingredient_id} for meal_id, ingredient_id in added[start:start + batch_size]])
+    if removed:
+        connection.execute(
+            delete(meal_ingredient).where(postings.meal_id == bindparam('key_meal'),
+                                          postings.ingredient_id == bindparam('key_ingredient')),
+            [{'key_meal': meal_id, 'key_ingredient': ingredient_id} for meal_id, ingredient_id in removed])
+    return {'postings': len(wanted_ids), 'terms': len(dictionary), 'added': len(added), 'removed': len(removed)}
+
+
+def index_meal_ingredients(meal_ids: Optional[Iterable[int]] = None, batch_size: int = 5000) -> Dict[str, int]:
+    """Re-tokenize meals (all, or the given ids) and write only the posting changes"""
+    summary = write_postings(db.session.connection(), meal_ids, batch_size)
+    db.session.commit()
+    logger.info("Indexed meal ingredients: %s", summary)
+    return summary
+
+
+@event.listens_for(Session, 'before_flush')
+def _drop_deleted_postings(session, flush_context, instances):
+    # Before the meal rows go, so the meal_ingredient foreign key never sees an orphan
+    deleted = [instance.id for instance in session.deleted if isinstance(instance, Meal) and instance.id is not None]
+    if deleted:
+        session.connection().execute(delete(meal_ingredient).where(meal_ingredient.c.meal_id.in_(deleted)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _index_after_flush(session, flush_context):
+    # Meals added or edited through the ORM; Core writes (imports, recipe rollups) re-index themselves
+    meal_ids = {instance.id for instance in chain(session.new, session.dirty)
+                if isinstance(instance, Meal) and instance not in session.deleted
+                and (instance in session.new or get_history(instance, 'ingredients').has_changes())}
+    if meal_ids:
+        write_postings(session.connection(), meal_ids)
+
+
+def _on_every_list(groups: List[List[int]]):
+    """Meal ids on a posting list of every group, as a self-join of meal_ingredient
+
+    The database walks one posting list and probes the others through the
+    (ingredient_id, meal_id) key, which beat INTERSECT in bench_ingredient_index.
+    """
+    postings = [meal_ingredient.alias() for _ in groups]
+    joined = postings[0]
+    for other in postings[1:]:
+        joined = joined.join(other, other.c.meal_id == postings[0].c.meal_id)
+    return select(postings[0].c.meal_id).select_from(joined).where(
+        *[posting.c.ingredient_id.in_(ids) for posting, ids in zip(postings, groups)])
+
+
+def ingredient_filters(include: Iterable[str] = (), exclude: Iterable[str] = ()) -> List:
+    """WHERE clauses on Meal for meals containing every include term and none of the exclude terms"""
+    include = [query_groups(term) for term in include if term.strip()]
+    exclude = [query_groups(term) for term in exclude if term.strip()]
+    names = {name for groups in include + exclude for group in groups for name in group}
+    if not names:
+        return []
+    dictionary = dict(db.session.execute(select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(names))).all())
+
+    def resolve(groups):
+        return [[dictionary[name] for name in group if name in dictionary] for group in groups]
+
+    filters = []
+    required = [ids for groups in include for ids in resolve(groups)]
+    if any(not ids for ids in required):
+        return [Meal.id.is_(None)]  # an include term no meal has: nothing matches
+    single = [ids for ids in required if len(ids) == 1]
+    if single:
+        filters.append(Meal.id.in_(_on_every_list(single)))
+    # A family such as "dairy" is the union of its members' lists, filtered on its own
+    filters.extend(Meal.id.in_(_on_every_list([ids])) for ids in required if len(ids) > 1)
+    # Single-word exclusions share one NOT IN over the union of their lists; "peanut butter" needs both words
+    banned = [resolve(groups) for groups in exclude]
+    banned = [groups for groups in banned if groups and all(groups)]
+    merged = sorted({ingredient_id for groups in banned if len(groups) == 1 for ingredient_id in groups[0]})
+    if merged:
+        filters.append(Meal.id.not_in(_on_every_list([merged])))
+    filters.extend(Meal.id.not_in(_on_every_list(groups)) for groups in banned if len(groups) > 1)
+    return filters
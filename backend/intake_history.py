@@ -0,0 +1,114 @@
+"""
+Downsampled intake time series for progress charts
+Aggregates daily_nutrition rollups into day/week/month buckets in SQL, so a
+request reads at most one row per day in range and returns a fixed, zero-filled
+list of buckets however many meals were logged
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import Date, cast, func, literal_column, select
+
+from models import db, DailyNutrition
+from nutrition_rollups import NUTRIENT_FIELDS
+
+BUCKETS = ('day', 'week', 'month')
+
+
+class HistoryRangeError(ValueError):
+    """Raised for an empty/reversed range or one that needs too many buckets"""
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """First day of the bucket containing day (weeks start on Monday)"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: date, bucket: str) -> date:
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(start: date, end: date, bucket: str) -> List[date]:
+    starts = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        starts.append(current)
+        current = _next_bucket(current, bucket)
+    return starts
+
+
+def _bucket_expression(dialect_name: str, bucket: str):
+    """SQL expression mapping daily_nutrition.day to its bucket's first day"""
+    day = DailyNutrition.day
+    if bucket == 'day':
+        return day
+    if dialect_name == 'postgresql':
+        return cast(func.date_trunc(bucket, day), Date)
+    if dialect_name == 'sqlite':
+        if bucket == 'week':
+            # Next Sunday-or-today, minus six days, is this week's Monday
+            return func.date(day, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+        return func.strftime('%Y-%m-01', day)
+    return None
+
+
+def _as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def intake_history(user_id: int, start: date, end: date, bucket: str = 'day', max_buckets: int = 400) -> Dict:
+    """Totals per bucket between start and end inclusive, one GROUP BY query"""
+    if bucket not in BUCKETS:
+        raise HistoryRangeError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    if end < start:
+        raise HistoryRangeError('from must not be after to')
+    starts = bucket_starts(start, end, bucket)
+    if len(starts) > max_buckets:
+        raise HistoryRangeError(f'Range needs {len(starts)} {bucket} buckets (max {max_buckets}); '
+                                f'use a coarser bucket or a shorter range')
+
+    in_range = (DailyNutrition.user_id == user_id, DailyNutrition.day.between(start, end))
+    key = _bucket_expression(db.session.get_bind().dialect.name, bucket)
+    totals: Dict[date, Dict] = {}
+    if key is not None:
+        rows = db.session.execute(
+            select(key.label('bucket'),
+                   *[func.sum(getattr(DailyNutrition, field)) for field in NUTRIENT_FIELDS],
+                   func.sum(DailyNutrition.entries), func.count())
+            .where(*in_range).group_by(key)
+        )
+        for row in rows:
+            totals[_as_date(row[0])] = dict(zip(NUTRIENT_FIELDS + ('entries', 'days_logged'), row[1:]))
+    else:
+        # Other databases: group the (at most one per day) rollup rows here instead
+        for rollup in DailyNutrition.query.filter(*in_range):
+            bucket_totals = totals.setdefault(bucket_start(rollup.day, bucket),
+                                              dict.fromkeys(NUTRIENT_FIELDS + ('entries', 'days_logged'), 0))
+            for field in NUTRIENT_FIELDS + ('entries',):
+                bucket_totals[field] += getattr(rollup, field)
+            bucket_totals['days_logged'] += 1
+
+    series = []
+    for bucket_day in starts:
+        values = totals.get(bucket_day, {})
+        point = {'start': bucket_day.isoformat()}
+        point.update({field: round(values.get(field) or 0, 1) for field in NUTRIENT_FIELDS})
+        point['entries'] = int(values.get('entries') or 0)
+        point['days_logged'] = int(values.get('days_logged') or 0)
+        series.append(point)
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'bucket': bucket,
+        'buckets': series
+    }
@@ -0,0 +1,120 @@
+"""
+App-wide structured logging through a background queue
+Request threads only render the message and enqueue the record; a
+QueueListener thread encodes it as a JSON line and does the console/file I/O
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask.logging import default_handler
+
+LOG_FILE = os.path.join('logs', 'nutrition_assistant.log')
+
+# Attributes every LogRecord has; anything else was passed via extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+_exception_formatter = logging.Formatter()
+
+logger = logging.getLogger(__name__)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, including any extra={...} fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue a snapshot of the record; the listener thread does the JSON formatting
+
+    The message and traceback are rendered here, on the calling thread, so
+    mutable %-args cannot change before the listener reads them and no
+    traceback (with its frames) is kept alive across threads. The JSON
+    encoding and the I/O stay off the request path.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)  # other handlers still see the original
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def configure_logging(app):
+    """Route root logging through a queue to console (and a file outside debug)
+
+    Idempotent: a second app in the same process reuses the running listener.
+    """
+    global _listener, _queue_handler
+    level_name = str(app.config.get('LOG_LEVEL') or 'INFO').upper()
+    level = logging.getLevelName(level_name)
+    valid_level = isinstance(level, int)
+    if not valid_level:
+        level = logging.INFO
+
+    # Leave the root level alone when the host (e.g. a server's log config) has installed its own handlers
+    root = logging.getLogger()
+    if all(handler is _queue_handler for handler in root.handlers):
+        root.setLevel(level)
+
+    if _listener is None:
+        formatter = JsonLogFormatter()
+        handlers = [logging.StreamHandler()]
+        if not app.debug:
+            os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            handlers.append(logging.FileHandler(LOG_FILE))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            handler.setLevel(level)
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _DeferredQueueHandler(log_queue)
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+    # Records propagate to the root queue handler; Flask's own stderr handler would duplicate them
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(logging.NOTSET)
+    if not valid_level:
+        logger.warning("Unknown LOG_LEVEL %r, logging at INFO", level_name)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
@@ -0,0 +1,167 @@
+"""
+Batched, idempotent meal logging for offline mobile sync
+Every entry carries a client_key and the time the meal was eaten. A batch is
+validated with one IN query for its meals and one for already-synced client
+keys (matched on the key alone, whatever date a retry sends, and in the
+archive file of the entry's month when it is older than the archive
+horizon), then written with a single executemany insert plus the matching
+daily rollup upsert in the same transaction. Retrying a batch is a no-op for
+entries that were already stored.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from dashboard_invalidation import user_rows_written
+from history_archive import archive_horizon, archived_client_keys, month_start
+from models import db, MealHistory
+from nutrition_rollups import add_contribution, apply_rollup_deltas, meal_nutrients, new_delta_map
+
+logger = logging.getLogger(__name__)
+
+CLIENT_KEY_MAX_LENGTH = 64
+MAX_PORTION_SIZE = 20.0
+
+
+class MealLogError(ValueError):
+    """Raised when a batch payload is structurally unusable"""
+
+
+def _parse_logged_at(value) -> datetime:
+    """ISO 8601 timestamp (stored as naive UTC)"""
+    logged_at = datetime.fromisoformat(str(value))
+    if logged_at.tzinfo is not None:
+        logged_at = logged_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return logged_at
+
+
+def _normalize_entry(entry) -> Dict:
+    """Validate one entry; raises ValueError with a client-facing message"""
+    if not isinstance(entry, dict):
+        raise ValueError('Entry must be an object')
+    client_key = entry.get('client_key')
+    if not isinstance(client_key, str) or not client_key.strip():
+        raise ValueError('client_key is required')
+    if len(client_key) > CLIENT_KEY_MAX_LENGTH:
+        raise ValueError(f'client_key must be at most {CLIENT_KEY_MAX_LENGTH} characters')
+    try:
+        meal_id = int(entry.get('meal_id'))
+    except (TypeError, ValueError):
+        raise ValueError('meal_id must be an integer') from None
+    try:
+        portion_size = float(entry.get('portion_size', 1.0) or 1.0)
+    except (TypeError, ValueError):
+        raise ValueError('portion_size must be a number') from None
+    if not 0 < portion_size <= MAX_PORTION_SIZE:
+        raise ValueError(f'portion_size must be between 0 and {MAX_PORTION_SIZE:g}')
+    # Required rather than defaulted to now: the stored key is (user_id, client_key, date), so a retry
+    # stamped with a fresh time would slip past it when two syncs race
+    if entry.get('date') in (None, ''):
+        raise ValueError('date is required')
+    try:
+        logged_at = _parse_logged_at(entry.get('date'))
+    except ValueError:
+        raise ValueError('date must be an ISO 8601 timestamp') from None
+    return {'client_key': client_key, 'meal_id': meal_id, 'date': logged_at, 'portion_size': portion_size}
+
+
+def _existing_entries(user_id: int, client_keys: List[str]) -> Dict[str, int]:
+    rows = db.session.execute(
+        select(MealHistory.client_key, MealHistory.id)
+        .where(MealHistory.user_id == user_id, MealHistory.client_key.in_(client_keys))
+    )
+    return dict(rows.all())
+
+
+def _archived_entries(user_id: int, rows) -> Dict[str, int]:
+    """Keys already moved to the cold archive; only entries dated before the archive horizon can be there"""
+    horizon = archive_horizon()
+    if horizon is None:
+        return {}
+    cutoff = datetime.combine(horizon, datetime.min.time())
+    keys_by_month: Dict = {}
+    for row in rows:
+        if row['date'] < cutoff:
+            keys_by_month.setdefault(month_start(row['date']), set()).add(row['client_key'])
+    return archived_client_keys(user_id, keys_by_month) if keys_by_month else {}
+
+
+def log_meal_batch(user_id: int, entries: List, max_batch: Optional[int] = None) -> Dict:
+    """Store a batch of meal log entries for a user; returns per-entry statuses
+
+    Two syncs racing with the same client_key but different dates can both
+    store it: the unique key is (user_id, client_key, date), since the
+    partitioned table needs date in every unique key. A retry that arrives
+    after the first sync committed is always caught.
+    """
+    if not isinstance(entries, list):
+        raise MealLogError('entries must be a list')
+    if max_batch and len(entries) > max_batch:
+        raise MealLogError(f'A batch may contain at most {max_batch} entries')
+
+    results: List[Dict] = []
+    accepted: Dict[str, Dict] = {}
+    for entry in entries:
+        try:
+            row = _normalize_entry(entry)
+        except ValueError as e:
+            key = entry.get('client_key') if isinstance(entry, dict) else None
+            results.append({'client_key': key, 'status': 'rejected', 'error': str(e)})
+            continue
+        if row['client_key'] in accepted:
+            results.append({'client_key': row['client_key'], 'status': 'duplicate'})
+            continue
+        accepted[row['client_key']] = row
+        results.append({'client_key': row['client_key'], 'status': 'pending'})
+
+    if accepted:
+        nutrients = meal_nutrients(db.session.connection(), {row['meal_id'] for row in accepted.values()})
+        for result in results:
+            if result['status'] == 'pending' and accepted[result['client_key']]['meal_id'] not in nutrients:
+                result.update({'status': 'rejected', 'error': 'Unknown meal_id'})
+                del accepted[result['client_key']]
+        archived = _archived_entries(user_id, accepted.values())
+        for result in results:
+            if result['status'] == 'pending' and result['client_key'] in archived:
+                result.update({'status': 'duplicate', 'id': archived[result['client_key']]})
+                del accepted[result['client_key']]
+
+    stored: Dict[str, int] = {}
+    created_keys = set()
+    for attempt in range(2):
+        if not accepted:
+            break
+        already = _existing_entries(user_id, list(accepted))
+        new_rows = [dict(row, user_id=user_id) for key, row in accepted.items() if key not in already]
+        try:
+            if new_rows:
+                db.session.execute(insert(MealHistory), new_rows)
+                # Core executemany skips mapper events, so roll the batch into daily totals here
+                deltas = new_delta_map()
+                for row in new_rows:
+                    add_contribution(deltas, user_id, row['date'], row['portion_size'], nutrients[row['meal_id']])
+                apply_rollup_deltas(db.session.connection(), deltas)
+                user_rows_written(db.session, user_id)
+            stored = _existing_entries(user_id, list(accepted))
+            db.session.commit()
+            created_keys = {row['client_key'] for row in new_rows}
+            break
+        except IntegrityError:
+            # A concurrent retry of the same batch won the race; re-read and insert what is left
+            db.session.rollback()
+            if attempt:
+                raise
+            logger.info("Meal log batch for user %s raced with another sync, retrying", user_id)
+
+    for result in results:
+        if result['status'] == 'pending':
+            key = result['client_key']
+            result.update({'status': 'created' if key in created_keys else 'duplicate', 'id': stored[key]})
+
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('created', 'duplicate', 'rejected')}
+    return {'summary': counts, 'entries': results}
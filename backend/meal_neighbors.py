@@ -0,0 +1,297 @@
+"""
+Item-item collaborative filtering over MealRating
+Two meals are similar when the users who rated both rated them alike: a cosine
+over co-raters of stars centred on the 3-star midpoint, shrunk towards zero
+while few users rated both. Only pairs touched by a rating change move, so a
+new, edited or deleted rating recomputes that meal's neighbour row with one
+grouped self-join and patches the affected entries of the meals the same user
+rated, all in the rating's own flush. rebuild_meal_neighbors() builds every
+list from scratch with sparse numpy products, for the initial load or after
+Core bulk imports.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, event, func, insert, select
+from sqlalchemy.orm.attributes import get_history
+
+from meal_planner import allergy_safe, catalog_cache
+from models import db, Meal, MealNeighbor, MealRating
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS = 20            # top-K similar meals kept per meal
+SHRINKAGE = 10            # co-raters at which a similarity keeps half its raw value
+MIN_CO_RATERS = 2
+RATING_MIDPOINT = 3
+LIKED_RATING = 4
+PAIR_BUDGET = 5_000_000   # co-rating pairs expanded per block during a rebuild
+
+_neighbor_table = MealNeighbor.__table__
+_rating_table = MealRating.__table__
+
+
+class MealRatingError(ValueError):
+    """Raised for a rating outside 1-5 stars"""
+
+
+def similarities(co_raters: np.ndarray, dot: np.ndarray, own_squares: np.ndarray,
+                 other_squares: np.ndarray) -> np.ndarray:
+    """Shrunk co-rater cosine per pair; 0 where the pair does not qualify"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = dot / np.sqrt(own_squares * other_squares)
+    shrunk = np.nan_to_num(cosine) * co_raters / (co_raters + SHRINKAGE)
+    return np.where((co_raters >= MIN_CO_RATERS) & (shrunk > 0), shrunk, 0.0)
+
+
+def _top(neighbor_ids: np.ndarray, sims: np.ndarray, co_raters: np.ndarray, k: int) -> List[Tuple]:
+    """(neighbor_id, similarity, co_raters) of the k best qualifying pairs, best first"""
+    keep = np.flatnonzero(sims > 0)
+    order = keep[np.lexsort((neighbor_ids[keep], -sims[keep]))][:k]
+    return list(zip(neighbor_ids[order].tolist(), sims[order].tolist(), co_raters[order].tolist()))
+
+
+def _row(connection, meal_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Similarity of one meal to every meal sharing a rater"""
+    mine, other = _rating_table.alias('mine'), _rating_table.alias('other')
+    own, theirs = mine.c.rating - RATING_MIDPOINT, other.c.rating - RATING_MIDPOINT
+    rows = connection.execute(
+        select(other.c.meal_id, func.count(), func.sum(own * theirs), func.sum(own * own), func.sum(theirs * theirs))
+        .select_from(mine.join(other, mine.c.user_id == other.c.user_id))
+        .where(mine.c.meal_id == meal_id, other.c.meal_id != meal_id)
+        .group_by(other.c.meal_id)
+    ).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+    neighbor_ids, co_raters, dot, own_squares, other_squares = (np.array(column) for column in zip(*rows))
+    sims = similarities(co_raters, dot.astype(float), own_squares.astype(float), other_squares.astype(float))
+    return neighbor_ids.astype(np.int64), sims, co_raters.astype(np.int64)
+
+
+def _insert_neighbors(connection, rows: List[Tuple]):
+    if rows:
+        connection.execute(insert(_neighbor_table), [
+            {'meal_id': meal_id, 'neighbor_id': neighbor_id, 'similarity': similarity, 'co_raters': co_raters}
+            for meal_id, neighbor_id, similarity, co_raters in rows])
+
+
+def _replace_row(connection, meal_id: int, row=None):
+    neighbor_ids, sims, co_raters = row if row is not None else _row(connection, meal_id)
+    connection.execute(delete(_neighbor_table).where(_neighbor_table.c.meal_id == meal_id))
+    _insert_neighbors(connection, [(meal_id, *entry) for entry in _top(neighbor_ids, sims, co_raters, NEIGHBORS)])
+
+
+def apply_rating_change(connection, user_id: int, meal_id: int):
+    """Bring the neighbour lists up to date after user_id's rating of meal_id changed"""
+    row = _row(connection, meal_id)
+    _replace_row(connection, meal_id, row)
+
+    # Only pairs (meal_id, j) for the meals j this user rated moved; sim(j, meal_id) == sim(meal_id, j)
+    affected = connection.execute(
+        select(_rating_table.c.meal_id)
+        .where(_rating_table.c.user_id == user_id, _rating_table.c.meal_id != meal_id)
+    ).scalars().all()
+    if not affected:
+        return
+    pair = {neighbor_id: (sim, co) for neighbor_id, sim, co in zip(row[0].tolist(), row[1].tolist(), row[2].tolist())}
+    lists = defaultdict(dict)
+    for owner, neighbor_id, sim in connection.execute(
+            select(_neighbor_table.c.meal_id, _neighbor_table.c.neighbor_id, _neighbor_table.c.similarity)
+            .where(_neighbor_table.c.meal_id.in_(affected))):
+        lists[owner][neighbor_id] = sim
+
+    removals, additions, rebuilds = [], [], []
+    for owner in affected:
+        entries = lists.get(owner, {})
+        sim, co = pair.get(owner, (0.0, 0))
+        full = len(entries) >= NEIGHBORS
+        floor = min(entries.values()) if entries else 0.0  # nothing outside the list scores above this
+        if meal_id in entries:
+            if full and sim < floor:
+                rebuilds.append(owner)  # an outside meal may now rank higher
+                continue
+            removals.append((owner, meal_id))
+            if sim > 0:
+                additions.append((owner, meal_id, sim, co))
+        elif sim > 0 and (not full or sim > floor):
+            additions.append((owner, meal_id, sim, co))
+            if full:
+                removals.append((owner, min(entries, key=lambda neighbor: (entries[neighbor], -neighbor))))
+
+    if removals:
+        connection.execute(
+            delete(_neighbor_table).where(_neighbor_table.c.meal_id == bindparam('owner'),
+                                          _neighbor_table.c.neighbor_id == bindparam('neighbor')),
+            [{'owner': owner, 'neighbor': neighbor} for owner, neighbor in removals])
+    _insert_neighbors(connection, additions)
+    for owner in rebuilds:
+        _replace_row(connection, owner)
+
+
+@event.listens_for(MealRating, 'after_insert')
+def _rating_added(mapper, connection, target):
+    apply_rating_change(connection, target.user_id, target.meal_id)
+
+
+@event.listens_for(MealRating, 'after_delete')
+def _rating_deleted(mapper, connection, target):
+    apply_rating_change(connection, target.user_id, target.meal_id)
+
+
+@event.listens_for(MealRating, 'after_update')
+def _rating_updated(mapper, connection, target):
+    histories = {name: get_history(target, name) for name in ('user_id', 'meal_id', 'rating')}
+    if not any(history.has_changes() for history in histories.values()):
+        return
+    apply_rating_change(connection, target.user_id, target.meal_id)
+    previous = tuple(histories[name].deleted[0] if histories[name].deleted else getattr(target, name)
+                     for name in ('user_id', 'meal_id'))
+    if previous != (target.user_id, target.meal_id):
+        apply_rating_change(connection, *previous)
+
+
+# Load the previous user and meal before they are overwritten so after_update can patch both pairs
+for _attribute in (MealRating.user_id, MealRating.meal_id):
+    event.listen(_attribute, 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+def rate_meal(user_id: int, meal_id: int, rating, review: Optional[str] = None) -> MealRating:
+    """Create or replace a user's rating of a meal; neighbour lists follow in the same commit"""
+    try:
+        rating = int(rating)
+    except (TypeError, ValueError):
+        raise MealRatingError('rating must be a whole number of stars') from None
+    if not 1 <= rating <= 5:
+        raise MealRatingError('rating must be between 1 and 5 stars')
+
+    entry = MealRating.query.filter_by(user_id=user_id, meal_id=meal_id).first()
+    if entry is None:
+        entry = MealRating(user_id=user_id, meal_id=meal_id)
+        db.session.add(entry)
+    entry.rating = rating
+    if review is not None:
+        entry.review = review
+    db.session.commit()
+    return entry
+
+
+def _compressed(keys: np.ndarray, *columns: np.ndarray):
+    """Sort by keys and split into (unique keys, start offsets, sorted columns)"""
+    order = np.argsort(keys, kind='stable')
+    unique, starts = np.unique(keys[order], return_index=True)
+    return unique, np.append(starts, len(keys)), [column[order] for column in columns]
+
+
+def rebuild_meal_neighbors(neighbors: int = NEIGHBORS) -> Dict:
+    """Recompute every meal's neighbour list from all ratings; returns size and timing figures"""
+    started = time.perf_counter()
+    rows = db.session.execute(
+        select(_rating_table.c.user_id, _rating_table.c.meal_id, _rating_table.c.rating)).all()
+    connection = db.session.connection()
+    connection.execute(delete(_neighbor_table))
+    if not rows:
+        db.session.commit()
+        return {'ratings': 0, 'meals': 0, 'pairs': 0, 'neighbors': 0, 'elapsed_seconds': 0.0}
+
+    user_ids, meal_ids, stars = (np.array(column) for column in zip(*rows))
+    meals, meal_index = np.unique(meal_ids, return_inverse=True)
+    _, user_index = np.unique(user_ids, return_inverse=True)
+    centred = stars.astype(float) - RATING_MIDPOINT
+
+    # Ratings grouped by user (to expand co-raters) and by meal (to walk meals in blocks)
+    users, user_starts, (user_meals, user_values) = _compressed(user_index, meal_index, centred)
+    degree = np.diff(user_starts)
+    _, meal_starts, (meal_users, meal_values) = _compressed(meal_index, user_index, centred)
+    volume_end = np.cumsum(np.add.reduceat(degree[meal_users], meal_starts[:-1]))  # pairs up to each meal
+    pairs_total, stored = 0, 0
+
+    first = 0
+    while first < len(meals):
+        # As many meals as fit in the pair budget, at least one
+        spent = volume_end[first - 1] if first else 0
+        last = min(max(first + 1, int(np.searchsorted(volume_end, spent + PAIR_BUDGET, 'right'))), len(meals))
+        entries = slice(meal_starts[first], meal_starts[last])
+        owner = np.repeat(np.arange(first, last), np.diff(meal_starts[first:last + 1]))
+        raters, own = meal_users[entries], meal_values[entries]
+
+        # Expand each (meal, rater) entry to every meal that rater rated
+        counts = degree[raters]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(user_starts[raters], counts) + offsets
+        owner, own = np.repeat(owner, counts), np.repeat(own, counts)
+        other, theirs = user_meals[positions], user_values[positions]
+        distinct = owner != other
+        owner, own, other, theirs = owner[distinct], own[distinct], other[distinct], theirs[distinct]
+        pairs_total += len(owner)
+
+        keys, inverse = np.unique(owner * len(meals) + other, return_inverse=True)
+        co_raters = np.bincount(inverse)
+        sims = similarities(co_raters, np.bincount(inverse, own * theirs), np.bincount(inverse, own * own),
+                            np.bincount(inverse, theirs * theirs))
+        key_owner, key_other = keys // len(meals), keys % len(meals)
+
+        # Top-K per owner: order by owner, then best similarity, then lowest meal id
+        keep = np.flatnonzero(sims > 0)
+        keep = keep[np.lexsort((meals[key_other[keep]], -sims[keep], key_owner[keep]))]
+        group_start = np.searchsorted(key_owner[keep], key_owner[keep])
+        keep = keep[np.arange(len(keep)) - group_start < neighbors]
+        _insert_neighbors(connection, list(zip(meals[key_owner[keep]].tolist(), meals[key_other[keep]].tolist(),
+                                               sims[keep].tolist(), co_raters[keep].tolist())))
+        stored += len(keep)
+        first = last
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    summary = {'ratings': len(rows), 'meals': len(meals), 'pairs': pairs_total, 'neighbors': stored,
+               'elapsed_seconds': round(elapsed, 3)}
+    logger.info("Rebuilt meal neighbours: %s", summary)
+    return summary
+
+
+def also_liked(meal_id: int, limit: int = 10) -> List[Dict]:
+    """People who liked this meal also liked these, most similar first"""
+    rows = db.session.execute(
+        select(MealNeighbor.neighbor_id, MealNeighbor.similarity, MealNeighbor.co_raters,
+               Meal.name, Meal.type, Meal.calories)
+        .join(Meal, Meal.id == MealNeighbor.neighbor_id)
+        .where(MealNeighbor.meal_id == meal_id)
+        .order_by(MealNeighbor.similarity.desc(), MealNeighbor.neighbor_id).limit(limit)
+    ).all()
+    return [{'meal_id': neighbor_id, 'name': name, 'type': meal_type, 'calories': calories,
+             'similarity': round(similarity, 4), 'co_raters': co_raters}
+            for neighbor_id, similarity, co_raters, name, meal_type, calories in rows]
+
+
+def also_liked_for_user(user: Dict, limit: int = 10) -> List[Dict]:
+    """Neighbours of the meals a user liked, weighted by how much, minus rated and unsafe meals"""
+    liked = (select(_rating_table.c.meal_id, _rating_table.c.rating)
+             .where(_rating_table.c.user_id == user['id'], _rating_table.c.rating >= LIKED_RATING).subquery())
+    rated = select(_rating_table.c.meal_id).where(_rating_table.c.user_id == user['id'])
+    score = func.sum(_neighbor_table.c.similarity * (liked.c.rating - RATING_MIDPOINT))
+    rows = db.session.execute(
+        select(_neighbor_table.c.neighbor_id, score.label('score'))
+        .join(liked, liked.c.meal_id == _neighbor_table.c.meal_id)
+        .where(_neighbor_table.c.neighbor_id.not_in(rated))
+        .group_by(_neighbor_table.c.neighbor_id)
+        .order_by(score.desc(), _neighbor_table.c.neighbor_id).limit(limit * 4)
+    ).all()
+    if not rows:
+        return []
+
+    catalog = catalog_cache.get()
+    neighbor_ids = np.array([neighbor_id for neighbor_id, _ in rows])
+    positions = np.minimum(np.searchsorted(catalog.ids, neighbor_ids), max(len(catalog.ids) - 1, 0))
+    safe = np.zeros(len(rows), dtype=bool)
+    if len(catalog.ids):
+        allowed = catalog.eligible & allergy_safe(catalog, user.get('allergies'))
+        safe = (catalog.ids[positions] == neighbor_ids) & allowed[positions]
+    picked = [(neighbor_id, score) for (neighbor_id, score), ok in zip(rows, safe) if ok][:limit]
+    meals = {meal.id: meal for meal in Meal.query.filter(Meal.id.in_([neighbor_id for neighbor_id, _ in picked]))}
+    return [{'meal_id': neighbor_id, 'name': meals[neighbor_id].name, 'type': meals[neighbor_id].type,
+             'calories': meals[neighbor_id].calories, 'score': round(score, 4)}
+            for neighbor_id, score in picked if neighbor_id in meals]
@@ -0,0 +1,291 @@
+"""
+Daily meal plans that hit a user's NutritionGoal
+The meal catalog is held in memory as numpy arrays (nutrients, slot, score,
+eligibility, allergen flags) and rebuilt when meals change. For each slot
+the best-fitting allowed meals are shortlisted with argpartition, which
+prunes the search to a few dozen meals per slot; every breakfast+lunch pair
+is then scored against every dinner+snack pair as one broadcast matrix per
+nutrient. Days are planned in order without repeating meals, under a hard
+time budget.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import takewhile
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import event, select
+
+from bmi_classification import ELIGIBLE_BMI
+from models import db, Meal
+from nutrition_rollups import compare_to_goal, current_goal
+from nutrition_rules import BMI_30_CRITERIA, NUTRITION_SCORE
+
+logger = logging.getLogger(__name__)
+
+MEAL_SLOTS = ('breakfast', 'lunch', 'dinner', 'snack')
+SLOT_SHARES = np.array([0.25, 0.35, 0.30, 0.10])  # share of the day's goal each slot aims for
+PLAN_NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+GOAL_COLUMNS = ('daily_calories', 'daily_protein', 'daily_carbs', 'daily_fat')
+TOLERANCES = np.array([0.10, 0.20, 0.20, 0.20])  # allowed relative miss per nutrient
+WEIGHTS = np.array([2.0, 1.5, 1.0, 1.0])
+SCORE_WEIGHT = 0.002  # per nutrition score point, breaks ties between near-equal plans
+SHORTLIST_SIZE = 24
+
+# Free-text allergy terms mapped onto the allergen labels assigned on USDA import
+ALLERGY_ALIASES = {
+    'milk': 'dairy', 'lactose': 'dairy', 'cheese': 'dairy',
+    'nut': 'nuts', 'peanut': 'nuts', 'peanuts': 'nuts', 'tree nuts': 'nuts',
+    'egg': 'eggs',
+    'wheat': 'gluten', 'celiac': 'gluten', 'coeliac': 'gluten',
+    'shellfish': 'fish', 'seafood': 'fish',
+    'soya': 'soy',
+}
+NO_ALLERGY_TERMS = {'', 'none', 'no', 'n/a', 'na', 'nil'}
+
+
+class MealPlanError(ValueError):
+    """Raised when no plan can be built for the user (no goal, not eligible, empty slot)"""
+
+
+@dataclass
+class MealCatalog:
+    ids: np.ndarray            # ascending, so ids map to positions with searchsorted
+    slots: np.ndarray          # index into MEAL_SLOTS, -1 for other types
+    nutrients: np.ndarray      # (n, 4) in PLAN_NUTRIENTS order
+    scores: np.ndarray
+    eligible: np.ndarray       # meets_eligibility_criteria for an eligible (BMI >= 30) user
+    allergen_sets: np.ndarray  # per meal, its row in allergen_matrix (one row per distinct allergens text)
+    allergen_matrix: np.ndarray  # (distinct allergens texts, labels) bool; any number of labels fits
+    allergen_labels: Dict[str, int]
+    names: np.ndarray          # lowercase, for allergy terms that are not a known label
+
+
+def _allergen_tokens(value: Optional[str]) -> List[str]:
+    return [token.strip().lower() for token in (value or '').split(',')
+            if token.strip().lower() not in NO_ALLERGY_TERMS]
+
+
+def load_catalog() -> MealCatalog:
+    """Read every meal's planning columns in one query into arrays"""
+    table = Meal.__table__
+    rows = db.session.connection().execute(select(
+        table.c.id, table.c.type, table.c.name, table.c.allergens, table.c.calories,
+        table.c.protein, table.c.carbs, table.c.fat, table.c.fiber, table.c.sugar
+    ).order_by(table.c.id)).all()
+
+    count = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * 10
+    numeric = np.array(columns[4:], dtype=float).reshape(6, count)
+    numeric = np.nan_to_num(numeric)  # missing nutrients count as 0, as in the model methods
+    calories, protein, carbs, fat, fiber, sugar = numeric
+    nutrients = dict(calories=calories, protein=protein, fiber=fiber, sugar=sugar)
+
+    slot_index = {slot: index for index, slot in enumerate(MEAL_SLOTS)}
+    labels: Dict[str, int] = {}
+    texts: Dict[Optional[str], int] = {}
+    text_labels: List[List[int]] = []
+    allergen_sets = np.zeros(count, dtype=np.int32)
+    for index, value in enumerate(columns[3]):
+        if value not in texts:
+            texts[value] = len(text_labels)
+            text_labels.append([labels.setdefault(token, len(labels)) for token in _allergen_tokens(value)])
+        allergen_sets[index] = texts[value]
+    allergen_matrix = np.zeros((len(text_labels), len(labels)), dtype=bool)
+    for row, label_ids in enumerate(text_labels):
+        allergen_matrix[row, label_ids] = True
+
+    return MealCatalog(
+        ids=np.array(columns[0], dtype=np.int64),
+        slots=np.array([slot_index.get(kind, -1) for kind in columns[1]], dtype=np.int8),
+        nutrients=np.column_stack([calories, protein, carbs, fat]),
+        scores=NUTRITION_SCORE.array(nutrients),
+        eligible=BMI_30_CRITERIA.array(nutrients),
+        allergen_sets=allergen_sets,
+        allergen_matrix=allergen_matrix,
+        allergen_labels=labels,
+        names=np.array([name.lower() for name in columns[2]], dtype=str),
+    )
+
+
+class CatalogCache:
+    """Process-wide catalog, rebuilt after local meal writes or once the TTL lapses"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._catalog: Optional[MealCatalog] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> MealCatalog:
+        with self._lock:
+            if self._catalog is not None and time.monotonic() < self._expires:
+                return self._catalog
+        catalog = load_catalog()
+        with self._lock:
+            self._catalog, self._expires = catalog, time.monotonic() + self.ttl
+        return catalog
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = 0.0
+
+
+catalog_cache = CatalogCache()
+
+
+def init_meal_planner(app):
+    """Set the catalog cache lifetime from MEAL_PLAN_CATALOG_TTL"""
+    catalog_cache.ttl = app.config.get('MEAL_PLAN_CATALOG_TTL', 300)
+
+
+@event.listens_for(Meal, 'after_insert')
+@event.listens_for(Meal, 'after_update')
+@event.listens_for(Meal, 'after_delete')
+def _invalidate_catalog(mapper, connection, target):
+    catalog_cache.invalidate()
+
+
+def allowed_meals(catalog: MealCatalog, allergies: Optional[str], bmi: Optional[float]) -> np.ndarray:
+    """Mask of meals the user may be offered: eligible for their BMI and free of their allergens"""
+    if bmi is None or bmi < ELIGIBLE_BMI:
+        # meets_eligibility_criteria rejects every meal below the service threshold
+        return np.zeros(len(catalog.ids), dtype=bool)
+    return catalog.eligible & (catalog.slots >= 0) & allergy_safe(catalog, allergies)
+
+
+def allergy_safe(catalog: MealCatalog, allergies: Optional[str]) -> np.ndarray:
+    """Mask of meals free of every allergen named in a user's free-text allergies"""
+    allowed = np.ones(len(catalog.ids), dtype=bool)
+    banned = []
+    for term in re.split(r'[,;/]|\band\b', (allergies or '').lower()):
+        term = term.strip()
+        if term in NO_ALLERGY_TERMS:
+            continue
+        label = ALLERGY_ALIASES.get(term, term)
+        column = catalog.allergen_labels.get(label, catalog.allergen_labels.get(label + 's'))
+        if column is not None:
+            banned.append(column)
+        else:
+            # Not a label we assign on import: keep out meals that name it
+            allowed &= np.char.find(catalog.names, term) < 0
+    if banned:
+        # Decide once per distinct allergens text, then spread to the meals carrying it
+        allowed &= ~catalog.allergen_matrix[:, banned].any(axis=1)[catalog.allergen_sets]
+    return allowed
+
+
+def _shortlists(catalog: MealCatalog, allowed: np.ndarray, goal: np.ndarray, size: int) -> List[np.ndarray]:
+    """Per slot, catalog indexes of allowed meals ordered by fit to that slot's share of the goal"""
+    targeted = ~np.isnan(goal)
+    shortlists = []
+    for slot, share in enumerate(SLOT_SHARES):
+        candidates = np.flatnonzero(allowed & (catalog.slots == slot))
+        if not len(candidates):
+            raise MealPlanError(f'No eligible {MEAL_SLOTS[slot]} meals match your allergies')
+        target = goal[targeted] * share
+        miss = np.abs(catalog.nutrients[candidates][:, targeted] - target) / target
+        fit = miss @ WEIGHTS[targeted] - SCORE_WEIGHT * catalog.scores[candidates]
+        if len(candidates) > size:
+            best = np.argpartition(fit, size)[:size]
+            candidates, fit = candidates[best], fit[best]
+        shortlists.append(candidates[np.argsort(fit, kind='stable')])
+    return shortlists
+
+
+def _best_day(catalog: MealCatalog, shortlists: Sequence[np.ndarray], goal: np.ndarray) -> Dict:
+    """Best four-slot combination: breakfast+lunch half-sums against dinner+snack half-sums"""
+    breakfast, lunch, dinner, snack = shortlists
+    first = (catalog.nutrients[breakfast][:, None] + catalog.nutrients[lunch][None, :]).reshape(-1, 4)
+    second = (catalog.nutrients[dinner][:, None] + catalog.nutrients[snack][None, :]).reshape(-1, 4)
+    first_scores = (catalog.scores[breakfast][:, None] + catalog.scores[lunch][None, :]).ravel()
+    second_scores = (catalog.scores[dinner][:, None] + catalog.scores[snack][None, :]).ravel()
+
+    # One (first x second) matrix per nutrient, accumulated in float32 without gathering rows
+    cost = (first_scores[:, None] + second_scores[None, :]).astype(np.float32) * -SCORE_WEIGHT
+    feasible = np.ones(cost.shape, dtype=bool)
+    for column in np.flatnonzero(~np.isnan(goal)):
+        miss = np.abs(first[:, column].astype(np.float32)[:, None] + second[:, column].astype(np.float32)[None, :]
+                      - goal[column]) / goal[column]
+        feasible &= miss <= TOLERANCES[column]
+        cost += WEIGHTS[column] * miss
+    cost[~feasible] += 10  # any in-tolerance plan beats every out-of-tolerance one
+
+    row, col = np.unravel_index(int(np.argmin(cost)), cost.shape)
+    picks = (breakfast[row // len(lunch)], lunch[row % len(lunch)],
+             dinner[col // len(snack)], snack[col % len(snack)])
+    return {'picks': [int(index) for index in picks], 'within_tolerance': bool(feasible[row, col])}
+
+
+def _plan_days(catalog: MealCatalog, allowed: np.ndarray, goal: np.ndarray, days: int,
+               deadline: float) -> List[Dict]:
+    allowed = allowed.copy()
+    planned = []
+    for _ in range(days):
+        if planned and time.monotonic() > deadline:
+            break
+        day = _best_day(catalog, _shortlists(catalog, allowed, goal, SHORTLIST_SIZE), goal)
+        planned.append(day)
+        # No repeats within the plan while alternatives remain for the slot
+        for index in day['picks']:
+            if np.count_nonzero(allowed & (catalog.slots == catalog.slots[index])) > 1:
+                allowed[index] = False
+    return planned
+
+
+def generate_meal_plan(user: Dict, start: date, days: int = 7, time_budget: float = 0.8) -> Dict:
+    """A `days`-long plan for a user snapshot (id, BMI, allergies) against their current goal
+
+    'complete' only says that no day was cut off (by the time budget or a
+    deleted meal); each day's 'within_tolerance' says whether it is on target.
+    """
+    deadline = time.monotonic() + time_budget
+    if user.get('BMI') is None or user['BMI'] < ELIGIBLE_BMI:
+        raise MealPlanError(f'Meal plans are available for BMI ≥ {ELIGIBLE_BMI:g}')
+    goal_row = current_goal(user['id'])
+    if goal_row is None:
+        raise MealPlanError('Set a nutrition goal before generating a meal plan')
+
+    goal = np.array([getattr(goal_row, column) or np.nan for column in GOAL_COLUMNS], dtype=float)
+    for attempt in range(2):
+        catalog = catalog_cache.get()
+        allowed = allowed_meals(catalog, user.get('allergies'), user.get('BMI'))
+        planned = _plan_days(catalog, allowed, goal, days, deadline)
+        picked_ids = {int(catalog.ids[index]) for day in planned for index in day['picks']}
+        meals = {meal.id: meal for meal in Meal.query.filter(Meal.id.in_(picked_ids))}
+        if len(meals) == len(picked_ids):
+            break
+        # Another process deleted a picked meal while this one's catalog was cached: reload and re-plan once
+        logger.info("Meal plan for user %s picked %s deleted meal(s), reloading the catalog",
+                    user['id'], len(picked_ids) - len(meals))
+        catalog_cache.invalidate()
+    # Still missing after the reload (deleted again meanwhile): stop before the first day that needs one
+    planned = list(takewhile(lambda day: all(int(catalog.ids[index]) in meals for index in day['picks']), planned))
+
+    plan_days = []
+    for offset, day in enumerate(planned):
+        totals = dict(zip(PLAN_NUTRIENTS, catalog.nutrients[day['picks']].sum(axis=0)))
+        totals = {field: round(float(value), 1) for field, value in totals.items()}
+        plan_days.append({
+            'date': (start + timedelta(days=offset)).isoformat(),
+            'meals': [{'slot': slot, **_meal_summary(meals[int(catalog.ids[index])])}
+                      for slot, index in zip(MEAL_SLOTS, day['picks'])],
+            'totals': totals,
+            'goal': compare_to_goal(totals, goal_row),
+            'within_tolerance': day['within_tolerance']
+        })
+
+    if len(plan_days) < days:
+        logger.warning("Meal plan for user %s stopped after %s of %s days (time budget %ss, or a meal deleted mid-plan)",
+                       user['id'], len(plan_days), days, time_budget)
+    return {'start': start.isoformat(), 'days': plan_days, 'complete': len(plan_days) == days}
+
+
+def _meal_summary(meal: Meal) -> Dict:
+    return {'meal_id': meal.id, 'name': meal.name, 'calories': meal.calories, 'protein': meal.protein,
+            'carbs': meal.carbs, 'fat': meal.fat, 'allergens': meal.allergens}
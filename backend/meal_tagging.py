@@ -0,0 +1,59 @@
+"""
+Rule-based meal categories
+Each FoodCategory created by the USDA import has a rule from nutrition_rules,
+compiled to a SQL predicate over Meal columns. sync_meal_categories() evaluates
+every rule set-based inside the database and writes only the difference to the
+meal_categories junction: INSERT ... SELECT for meals that newly match, DELETE
+for meals that no longer do. populate_usda_meals() runs it after each import, so category filters are
+indexed joins rather than Python checks over loaded rows.
+"""
+
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, exists, insert, literal, select
+
+from models import db, FoodCategory, Meal, meal_categories
+from nutrition_rules import BMI_30_CRITERIA, Rule, Threshold
+
+logger = logging.getLogger(__name__)
+
+
+# Category name -> rule, compiled to SQL so the whole catalog is evaluated in the database
+CATEGORY_RULES: Dict[str, Rule] = {
+    'High Protein': Threshold('protein', '>=', 15),
+    'High Fiber': Threshold('fiber', '>=', 3),
+    'Low Calorie Dense': Threshold('calories', '<=', 200),
+    'BMI ≥30 Optimized': BMI_30_CRITERIA,
+}
+
+
+def sync_meal_categories(meal_ids: Optional[Iterable[int]] = None) -> Dict[str, Dict[str, int]]:
+    """Bring meal_categories in line with CATEGORY_RULES (optionally for some meals); returns the diff"""
+    categories = dict(db.session.execute(
+        select(FoodCategory.name, FoodCategory.id).where(FoodCategory.name.in_(list(CATEGORY_RULES)))).all())
+    missing = set(CATEGORY_RULES) - set(categories)
+    if missing:
+        logger.warning("Skipping rules for categories not created yet: %s", ', '.join(sorted(missing)))
+
+    junction = meal_categories.c
+    meal_ids = list(meal_ids) if meal_ids is not None else None
+    changes = {}
+    for name, category_id in categories.items():
+        rule = CATEGORY_RULES[name].sql(Meal)
+        tagged = exists().where(junction.meal_id == Meal.id, junction.category_id == category_id)
+        in_scope = [Meal.id.in_(meal_ids)] if meal_ids is not None else []
+        added = db.session.execute(insert(meal_categories).from_select(
+            ['meal_id', 'category_id'], select(Meal.id, literal(category_id)).where(rule, ~tagged, *in_scope)
+        )).rowcount
+
+        # NOT IN the matching set rather than NOT rule, so meals whose nutrients are NULL drop out too
+        in_scope = [junction.meal_id.in_(meal_ids)] if meal_ids is not None else []
+        removed = db.session.execute(delete(meal_categories).where(
+            junction.category_id == category_id, junction.meal_id.not_in(select(Meal.id).where(rule)), *in_scope
+        )).rowcount
+        changes[name] = {'added': added, 'removed': removed}
+    db.session.commit()
+
+    logger.info("Synced meal categories: %s", changes)
+    return changes
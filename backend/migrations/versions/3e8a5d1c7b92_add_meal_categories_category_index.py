@@ -0,0 +1,35 @@
+"""Add category index to meal_categories for tag filters
+
+Revision ID: 3e8a5d1c7b92
+Revises: d81f4c2a9e65
+Create Date: 2026-10-19 18:04:19.772630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8a5d1c7b92'
+down_revision = 'd81f4c2a9e65'
+branch_labels = None
+depends_on = None
+
+
+def _has_junction():
+    # meal_categories is created by db.create_all() rather than a revision, so it may not exist yet
+    return sa.inspect(op.get_bind()).has_table('meal_categories')
+
+
+def upgrade():
+    if _has_junction():
+        with op.batch_alter_table('meal_categories', schema=None) as batch_op:
+            batch_op.create_index('ix_meal_categories_category_id', ['category_id', 'meal_id'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if _has_junction() and any(index['name'] == 'ix_meal_categories_category_id'
+                               for index in sa.inspect(bind).get_indexes('meal_categories')):
+        with op.batch_alter_table('meal_categories', schema=None) as batch_op:
+            batch_op.drop_index('ix_meal_categories_category_id')
@@ -0,0 +1,97 @@
+"""Partition meal_history by month and add meal_history_archive
+
+Revision ID: a4d7c91e3b58
+Revises: f2c95d1e6a07
+Create Date: 2026-10-19 14:02:37.518840
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7c91e3b58'
+down_revision = 'f2c95d1e6a07'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_history_table(partitioned):
+    """meal_history as a plain table, or range-partitioned by date (key columns must include date)"""
+    key = ', date' if partitioned else ''
+    op.execute(f"""
+        CREATE TABLE meal_history (
+            id INTEGER NOT NULL DEFAULT nextval('meal_history_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES "user" (id),
+            meal_id INTEGER NOT NULL REFERENCES meal (id),
+            date TIMESTAMP WITHOUT TIME ZONE {'NOT NULL' if partitioned else ''},
+            portion_size FLOAT,
+            client_key VARCHAR(64),
+            CONSTRAINT meal_history_pkey PRIMARY KEY (id{key}),
+            CONSTRAINT unique_user_meal_log_key UNIQUE (user_id, client_key{key})
+        ){' PARTITION BY RANGE (date)' if partitioned else ''}
+    """)
+    op.execute("CREATE INDEX ix_meal_history_user_id_date ON meal_history (user_id, date)")
+
+
+def _replace_history_table(partitioned):
+    """Rebuild meal_history in the requested layout and copy every row across"""
+    op.execute("ALTER SEQUENCE meal_history_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE meal_history RENAME TO meal_history_old")
+    op.execute("ALTER TABLE meal_history_old DROP CONSTRAINT unique_user_meal_log_key")
+    op.execute("ALTER TABLE meal_history_old RENAME CONSTRAINT meal_history_pkey TO meal_history_old_pkey")
+    op.execute("DROP INDEX ix_meal_history_user_id_date")
+
+    _create_history_table(partitioned)
+    if partitioned:
+        bind = op.get_bind()
+        oldest = bind.execute(sa.text("SELECT min(date) FROM meal_history_old")).scalar()
+        this_month = date.today().replace(day=1)
+        month = date(oldest.year, oldest.month, 1) if oldest else this_month
+        while month <= _add_months(this_month, PARTITIONS_AHEAD):
+            op.execute(f"CREATE TABLE meal_history_p{month:%Y_%m} PARTITION OF meal_history "
+                       f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')")
+            month = _add_months(month, 1)
+        op.execute("CREATE TABLE meal_history_default PARTITION OF meal_history DEFAULT")
+
+    op.execute("""
+        INSERT INTO meal_history (id, user_id, meal_id, date, portion_size, client_key)
+        SELECT id, user_id, meal_id, date, portion_size, client_key FROM meal_history_old
+    """)
+    op.execute("DROP TABLE meal_history_old")
+    op.execute("ALTER SEQUENCE meal_history_id_seq OWNED BY meal_history.id")
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('meal_history_archive',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('month')
+    )
+    # ### end Alembic commands ###
+
+    # Native declarative partitioning is PostgreSQL-only; SQLite keeps one indexed table
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("UPDATE meal_history SET date = timezone('utc', now()) WHERE date IS NULL")
+        _replace_history_table(partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_history_table(partitioned=False)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('meal_history_archive')
+    # ### end Alembic commands ###
@@ -0,0 +1,36 @@
+"""Align meal_history keys on non-partitioned databases with the model
+
+Revision ID: d2b8e5f1a376
+Revises: c6f2a9d4e803
+Create Date: 2026-10-20 10:41:08.927314
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b8e5f1a376'
+down_revision = 'c6f2a9d4e803'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PostgreSQL already has these keys from the partitioned table built in a4d7c91e3b58
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    op.execute("UPDATE meal_history SET date = CURRENT_TIMESTAMP WHERE date IS NULL")
+    with op.batch_alter_table('meal_history', schema=None) as batch_op:
+        batch_op.alter_column('date', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_constraint('unique_user_meal_log_key', type_='unique')
+        batch_op.create_unique_constraint('unique_user_meal_log_key', ['user_id', 'client_key', 'date'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    with op.batch_alter_table('meal_history', schema=None) as batch_op:
+        batch_op.drop_constraint('unique_user_meal_log_key', type_='unique')
+        batch_op.create_unique_constraint('unique_user_meal_log_key', ['user_id', 'client_key'])
+        batch_op.alter_column('date', existing_type=sa.DateTime(), nullable=True)
@@ -1,6 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.schema import PrimaryKeyConstraint
 from datetime import datetime
 
+from bmi_classification import calculate_bmi, classify_bmi, is_eligible
+from nutrition_rules import BMI_30_CRITERIA, NUTRITION_SCORE
+
 db = SQLAlchemy()
 
 class User(db.Model):
@@ -11,6 +18,7 @@ class User(db.Model):
     height = db.Column(db.Float, nullable=False)
     weight = db.Column(db.Float, nullable=False)
     BMI = db.Column(db.Float, nullable=True)
+    bmi_category = db.Column(db.String(32), nullable=True, index=True)
     allergies = db.Column(db.String(256), nullable=True)
     preferences = db.Column(db.String(256), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -20,34 +28,30 @@ class User(db.Model):
         """Calculate BMI following copilot health-centric data model"""
         if self.height and self.weight:
             # Critical: height in cm, convert to meters for BMI calculation
-            height_m = self.height / 100
-            self.BMI = round(self.weight / (height_m ** 2), 2)
+            self.BMI = calculate_bmi(self.height, self.weight)
+            self.bmi_category = classify_bmi(self.BMI)
         return self.BMI
 
     def is_eligible_for_service(self):
         """Check BMI eligibility following copilot business rules"""
-        return self.BMI and self.BMI >= 30.0
+        return is_eligible(self.BMI)
 
     def get_bmi_category(self):
         """Get BMI category following health-centric patterns"""
-        if not self.BMI:
-            return 'Unknown'
-        if self.BMI < 18.5:
-            return 'Underweight'
-        elif self.BMI < 25:
-            return 'Normal weight'
-        elif self.BMI < 30:
-            return 'Overweight'
-        elif self.BMI < 35:
-            return 'Class I Obesity'
-        elif self.BMI < 40:
-            return 'Class II Obesity'
-        else:
-            return 'Class III Obesity'
+        return self.bmi_category or classify_bmi(self.BMI)
 
     def __repr__(self):
         return f'<User {self.username}>'
 
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def _sync_bmi_category(mapper, connection, target):
+    """Keep BMI and the stored, indexed category in step with height/weight on every flush"""
+    state = db.inspect(target)
+    if state.attrs.height.history.has_changes() or state.attrs.weight.history.has_changes():
+        target.BMI = calculate_bmi(target.height, target.weight)
+    target.bmi_category = classify_bmi(target.BMI) if target.BMI else None
+
 class Meal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -64,56 +68,43 @@ class Meal(db.Model):
     usda_id = db.Column(db.String(50), nullable=True)  # USDA FoodData Central ID
     serving_size = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # owner of a user recipe; NULL for catalog meals
+    # Rating aggregates kept in step with MealRating by rating_stats (never GROUP BY per request)
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_score = db.Column(db.Float, nullable=False, default=3.0, server_default='3')  # Bayesian average
     meal_history = db.relationship('MealHistory', backref='meal', lazy=True)
 
+    # Leaderboard order within a meal type, read straight off the index
+    __table_args__ = (db.Index('ix_meal_type_rating_score', 'type', 'rating_score', 'id'),)
+
+    @hybrid_property
+    def nutrition_score(self):
+        """Nutrition score for meal recommendations (0-50); usable in filters and ORDER BY too"""
+        return NUTRITION_SCORE.evaluate(self)
+
+    @nutrition_score.expression
+    def nutrition_score(cls):
+        return NUTRITION_SCORE.sql(cls)
+
+    @hybrid_property
+    def eligible_for_bmi_30(self):
+        """Meets the BMI >= 30 criteria; usable in filters too"""
+        return BMI_30_CRITERIA.evaluate(self)
+
+    @eligible_for_bmi_30.expression
+    def eligible_for_bmi_30(cls):
+        return BMI_30_CRITERIA.sql(cls)
+
     def calculate_nutrition_score(self):
         """Calculate nutrition score for meal recommendations following health-centric model"""
-        score = 0
-        
-        # Protein scoring (higher is better for weight management)
-        if self.protein:
-            score += min(self.protein / 30 * 20, 20)  # Max 20 points for 30g+ protein
-        
-        # Fiber scoring (higher is better)
-        if self.fiber:
-            score += min(self.fiber / 10 * 15, 15)  # Max 15 points for 10g+ fiber
-        
-        # Calorie density scoring (lower density is better)
-        if self.calories <= 200:
-            score += 15
-        elif self.calories <= 400:
-            score += 10
-        else:
-            score += 5
-        
-        return min(score, 50)  # Max score of 50
+        return self.nutrition_score
 
     def meets_eligibility_criteria(self, user_bmi):
         """Check if meal meets criteria for BMI >= 30 demographic following copilot business rules"""
         if user_bmi < 30:
             return False
-        
-        criteria_met = 0
-        total_criteria = 4
-        
-        # 1. Reasonable calorie count (not too high for weight management)
-        if self.calories <= 400:
-            criteria_met += 1
-        
-        # 2. Adequate protein (muscle preservation during weight loss)
-        if (self.protein or 0) >= 15:
-            criteria_met += 1
-        
-        # 3. Good fiber content (satiety and digestive health)
-        if (self.fiber or 0) >= 3:
-            criteria_met += 1
-        
-        # 4. Not too high in sugar (blood sugar management for obese adults)
-        if (self.sugar or 0) <= 15:
-            criteria_met += 1
-        
-        # Must meet at least 75% of criteria following copilot health-centric patterns
-        return criteria_met >= (total_criteria * 0.75)
+        return self.eligible_for_bmi_30
 
     def to_dict(self):
         """Convert meal to dictionary for API responses following copilot patterns"""
@@ -132,37 +123,101 @@ class Meal(db.Model):
             'allergens': self.allergens,
             'usda_id': self.usda_id,
             'serving_size': self.serving_size,
-            'nutrition_score': self.calculate_nutrition_score(),
-            'eligible_for_bmi_30': self.meets_eligibility_criteria(30.0)
+            'created_by': self.created_by,
+            'nutrition_score': self.nutrition_score,
+            'eligible_for_bmi_30': self.eligible_for_bmi_30,
+            'rating_count': self.rating_count or 0,
+            'average_rating': round(self.rating_sum / self.rating_count, 2) if self.rating_count else None,
+            'rating_score': round(self.rating_score, 3) if self.rating_score is not None else None
         }
 
     def __repr__(self):
         return f'<Meal {self.name}>'
 
+def adjusted_nutrition(meal, portion_size):
+    """A meal's nutrients scaled by a portion multiplier (also used for archived history rows)"""
+    multiplier = portion_size or 1.0
+    
+    return {
+        'calories': round((meal.calories or 0) * multiplier),
+        'protein': round((meal.protein or 0) * multiplier, 1),
+        'carbs': round((meal.carbs or 0) * multiplier, 1),
+        'fat': round((meal.fat or 0) * multiplier, 1),
+        'fiber': round((meal.fiber or 0) * multiplier, 1)
+    }
+
+# Keys as migration a4d7c91e3b58 creates them on PostgreSQL, where meal_history is partitioned by month
+# and every key must include the partition column (date)
 class MealHistory(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, db.Sequence('meal_history_id_seq'), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     meal_id = db.Column(db.Integer, db.ForeignKey('meal.id'), nullable=False)
-    date = db.Column(db.DateTime, default=datetime.utcnow)
+    date = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow, info={'partition_key': True})
     portion_size = db.Column(db.Float, default=1.0)  # multiplier for serving
+    client_key = db.Column(db.String(64), nullable=True)  # idempotency key from offline sync
+
+    # A retried sync cannot log the same client entry twice (meal_logging checks (user_id, client_key) itself)
+    __table_args__ = (db.PrimaryKeyConstraint('id', 'date', name='meal_history_pkey'),
+                      db.UniqueConstraint('user_id', 'client_key', 'date', name='unique_user_meal_log_key'),
+                      db.Index('ix_meal_history_user_id_date', 'user_id', 'date'))
 
     def calculate_adjusted_nutrition(self):
         """Calculate nutrition based on portion size following copilot health-centric model"""
         if not self.meal:
             return {}
-        
-        multiplier = self.portion_size or 1.0
-        
+        return adjusted_nutrition(self.meal, self.portion_size)
+
+    def __repr__(self):
+        return f'<MealHistory User:{self.user_id} Meal:{self.meal_id}>'
+
+@compiles(PrimaryKeyConstraint, 'sqlite')
+def _sqlite_primary_key(constraint, compiler, **kw):
+    # SQLite has no partitions and only numbers rows for a single-column INTEGER key, so keep id alone there
+    columns = [column for column in constraint.columns if not column.info.get('partition_key')]
+    if len(columns) == len(constraint.columns):
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    return f"CONSTRAINT {compiler.preparer.format_constraint(constraint)} PRIMARY KEY " \
+           f"({', '.join(compiler.preparer.quote(column.name) for column in columns)})"
+
+# Months of meal history moved out of the database into compressed columnar files
+class MealHistoryArchive(db.Model):
+    __tablename__ = 'meal_history_archive'
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the archived month
+    filename = db.Column(db.String(255), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MealHistoryArchive {self.month:%Y-%m} rows:{self.row_count}>'
+
+# Per-user, per-day intake totals maintained from MealHistory by nutrition_rollups
+class DailyNutrition(db.Model):
+    __tablename__ = 'daily_nutrition'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    fiber = db.Column(db.Float, nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Rounded the same way as MealHistory.calculate_adjusted_nutrition"""
         return {
-            'calories': round((self.meal.calories or 0) * multiplier),
-            'protein': round((self.meal.protein or 0) * multiplier, 1),
-            'carbs': round((self.meal.carbs or 0) * multiplier, 1),
-            'fat': round((self.meal.fat or 0) * multiplier, 1),
-            'fiber': round((self.meal.fiber or 0) * multiplier, 1)
+            'date': self.day.isoformat(),
+            'calories': round(self.calories),
+            'protein': round(self.protein, 1),
+            'carbs': round(self.carbs, 1),
+            'fat': round(self.fat, 1),
+            'fiber': round(self.fiber, 1),
+            'entries': self.entries
         }
 
     def __repr__(self):
-        return f'<MealHistory User:{self.user_id} Meal:{self.meal_id}>'
+        return f'<DailyNutrition User:{self.user_id} {self.day} Calories:{round(self.calories)}>'
 
 class NutritionGoal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -195,6 +250,84 @@ class UserProfile(db.Model):
     def __repr__(self):
         return f'<UserProfile User:{self.user_id}>'
 
+# Weight measurements over time (User.weight holds the latest one)
+class WeightLog(db.Model):
+    __tablename__ = 'weight_log'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    weight = db.Column(db.Float, nullable=False)  # kg
+
+    __table_args__ = (db.Index('ix_weight_log_user_id_date', 'user_id', 'date'),)
+
+    def to_dict(self):
+        return {'id': self.id, 'date': self.date.isoformat(), 'weight': self.weight}
+
+    def __repr__(self):
+        return f'<WeightLog User:{self.user_id} {self.weight}kg>'
+
+# Per-user weight trend maintained incrementally from WeightLog by weight_trends
+class WeightTrend(db.Model):
+    __tablename__ = 'weight_trend'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+    last_log_id = db.Column(db.Integer, nullable=False)  # newest weight_log row folded in
+    first_date = db.Column(db.DateTime, nullable=False)
+    latest_date = db.Column(db.DateTime, nullable=False)
+    latest_weight = db.Column(db.Float, nullable=False)
+    ema_weight = db.Column(db.Float, nullable=False)  # time-weighted moving average (~7 days)
+    # Exponentially decayed regression sums (t in days since first_date) behind the slope
+    sum_w = db.Column(db.Float, nullable=False, default=0)
+    sum_t = db.Column(db.Float, nullable=False, default=0)
+    sum_y = db.Column(db.Float, nullable=False, default=0)
+    sum_tt = db.Column(db.Float, nullable=False, default=0)
+    sum_ty = db.Column(db.Float, nullable=False, default=0)
+    slope_per_week = db.Column(db.Float, nullable=True)  # kg/week, None until enough spread
+    projected_goal_date = db.Column(db.Date, nullable=True)
+    projected_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'entries': self.entries,
+            'latest_weight': self.latest_weight,
+            'latest_date': self.latest_date.isoformat(),
+            'average_weight': round(self.ema_weight, 2),
+            'slope_per_week': None if self.slope_per_week is None else round(self.slope_per_week, 3),
+            'projected_goal_date': self.projected_goal_date.isoformat() if self.projected_goal_date else None
+        }
+
+    def __repr__(self):
+        return f'<WeightTrend User:{self.user_id} avg:{self.ema_weight:.1f}kg>'
+
+# Top-N meals per user, precomputed by the recommendations batch job
+class UserRecommendation(db.Model):
+    __tablename__ = 'user_recommendation'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 1 = best
+    meal_id = db.Column(db.Integer, db.ForeignKey('meal.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserRecommendation User:{self.user_id} #{self.rank} Meal:{self.meal_id}>'
+
+# Top-K most similar meals per meal by co-rating, maintained incrementally from MealRating
+class MealNeighbor(db.Model):
+    __tablename__ = 'meal_neighbor'
+
+    meal_id = db.Column(db.Integer, db.ForeignKey('meal.id'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('meal.id'), primary_key=True)
+    similarity = db.Column(db.Float, nullable=False)
+    co_raters = db.Column(db.Integer, nullable=False)  # users who rated both meals
+
+    __table_args__ = (db.Index('ix_meal_neighbor_meal_id_similarity', 'meal_id', 'similarity'),)
+
+    def __repr__(self):
+        return f'<MealNeighbor Meal:{self.meal_id} -> {self.neighbor_id} ({self.similarity:.3f})>'
+
 # Model for meal ratings and reviews
 class MealRating(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -208,7 +341,8 @@ class MealRating(db.Model):
     meal = db.relationship('Meal', backref='ratings')
     
     # Unique constraint to prevent duplicate ratings from same user
-    __table_args__ = (db.UniqueConstraint('user_id', 'meal_id', name='unique_user_meal_rating'),)
+    __table_args__ = (db.UniqueConstraint('user_id', 'meal_id', name='unique_user_meal_rating'),
+                      db.Index('ix_meal_rating_meal_id', 'meal_id'))
 
     def __repr__(self):
         return f'<MealRating User:{self.user_id} Meal:{self.meal_id} Rating:{self.rating}>'
@@ -227,9 +361,59 @@ class FoodCategory(db.Model):
 # Junction table for meal-category relationships
 meal_categories = db.Table('meal_categories',
     db.Column('meal_id', db.Integer, db.ForeignKey('meal.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('food_category.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('food_category.id'), primary_key=True),
+    db.Index('ix_meal_categories_category_id', 'category_id', 'meal_id')  # category filters join from here
 )
 
 # Add relationship to Meal model for categories
 Meal.categories = db.relationship('FoodCategory', secondary=meal_categories, lazy='subquery',
                                  backref=db.backref('meals', lazy=True))
+
+# Dictionary of normalized ingredient terms, filled by ingredient_index
+class Ingredient(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Ingredient {self.name}>'
+
+# Posting lists: the primary key leads with ingredient_id so each term's meals are one index range
+meal_ingredient = db.Table('meal_ingredient',
+    db.Column('ingredient_id', db.Integer, db.ForeignKey('ingredient.id'), primary_key=True),
+    db.Column('meal_id', db.Integer, db.ForeignKey('meal.id'), primary_key=True),
+    db.Index('ix_meal_ingredient_meal_id', 'meal_id')
+)
+
+# Recipe edges: a composite Meal made of other Meals (recipes included) by weight
+class RecipeComponent(db.Model):
+    __tablename__ = 'recipe_component'
+
+    recipe_id = db.Column(db.Integer, db.ForeignKey('meal.id'), primary_key=True)
+    component_id = db.Column(db.Integer, db.ForeignKey('meal.id'), primary_key=True)
+    grams = db.Column(db.Float, nullable=False)
+
+    # Reverse edges, walked upwards to find the recipes a changed meal feeds into
+    __table_args__ = (db.Index('ix_recipe_component_component_id', 'component_id'),)
+
+    def __repr__(self):
+        return f'<RecipeComponent Recipe:{self.recipe_id} Meal:{self.component_id} {self.grams}g>'
+
+# Denormalized home page statistics, a single row kept current by site_stats events
+class SiteStats(db.Model):
+    __tablename__ = 'site_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    eligible_users = db.Column(db.Integer, nullable=False, default=0)
+    total_meals = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'total_users': self.total_users,
+            'eligible_users': self.eligible_users,
+            'total_meals': self.total_meals
+        }
+
+    def __repr__(self):
+        return f'<SiteStats users:{self.total_users} eligible:{self.eligible_users} meals:{self.total_meals}>'
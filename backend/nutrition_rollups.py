@@ -0,0 +1,248 @@
+"""
+Daily nutrition rollups maintained incrementally from MealHistory
+Each MealHistory insert, edit or delete applies its portion-adjusted nutrients
+as a delta to the (user_id, day) row of daily_nutrition in the same flush, so
+daily and weekly views read a handful of pre-aggregated rows
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import get_history
+
+from history_archive import archive_horizon, history_entries
+from models import db, adjusted_nutrition, DailyNutrition, Meal, MealHistory, NutritionGoal
+
+logger = logging.getLogger(__name__)
+
+NUTRIENT_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber')
+GOAL_FIELDS = {'calories': 'daily_calories', 'protein': 'daily_protein',
+               'carbs': 'daily_carbs', 'fat': 'daily_fat'}
+
+_rollup_table = DailyNutrition.__table__
+_meal_table = Meal.__table__
+
+RollupKey = Tuple[int, date]
+
+
+def meal_nutrients(connection, meal_ids: Iterable[int]) -> Dict[int, Dict[str, float]]:
+    """Per-serving nutrients for a set of meals in one query, missing values as 0"""
+    columns = [_meal_table.c[field] for field in NUTRIENT_FIELDS]
+    rows = connection.execute(select(_meal_table.c.id, *columns).where(_meal_table.c.id.in_(set(meal_ids))))
+    return {row[0]: {field: value or 0 for field, value in zip(NUTRIENT_FIELDS, row[1:])} for row in rows}
+
+
+def add_contribution(deltas: Dict[RollupKey, Dict[str, float]], user_id: int, logged_at: datetime,
+                     portion_size, nutrients: Dict[str, float], sign: int = 1):
+    """Accumulate one history entry's portion-adjusted nutrients into a delta map"""
+    key = (user_id, (logged_at or datetime.utcnow()).date())
+    multiplier = (portion_size or 1.0) * sign
+    bucket = deltas[key]
+    for field in NUTRIENT_FIELDS:
+        bucket[field] += nutrients.get(field, 0) * multiplier
+    bucket['entries'] += sign
+
+
+def new_delta_map() -> Dict[RollupKey, Dict[str, float]]:
+    return defaultdict(lambda: dict.fromkeys(NUTRIENT_FIELDS + ('entries',), 0))
+
+
+def _upsert_statement(dialect_name: str):
+    excluded_columns = NUTRIENT_FIELDS + ('entries',)
+    if dialect_name == 'postgresql':
+        stmt = postgresql.insert(_rollup_table)
+    elif dialect_name == 'sqlite':
+        stmt = sqlite.insert(_rollup_table)
+    else:
+        return None
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={name: _rollup_table.c[name] + stmt.excluded[name] for name in excluded_columns}
+    )
+
+
+def apply_rollup_deltas(connection, deltas: Dict[RollupKey, Dict[str, float]]):
+    """Add deltas to daily_nutrition rows, creating missing days; one executemany where supported"""
+    params = [{'user_id': user_id, 'day': day, **values}
+              for (user_id, day), values in deltas.items() if any(values.values())]
+    if not params:
+        return
+
+    stmt = _upsert_statement(connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt, params)
+    else:
+        # Portable fallback: update in place, insert the days that did not exist yet
+        for values in params:
+            result = connection.execute(
+                update(_rollup_table)
+                .where(_rollup_table.c.user_id == values['user_id'], _rollup_table.c.day == values['day'])
+                .values({name: _rollup_table.c[name] + values[name] for name in NUTRIENT_FIELDS + ('entries',)})
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(_rollup_table), [values])
+
+    # Drop days whose last entry was removed so rollups match a rebuild exactly
+    emptied = [{'key_user': values['user_id'], 'key_day': values['day']}
+               for values in params if values['entries'] < 0]
+    if emptied:
+        connection.execute(
+            delete(_rollup_table).where(_rollup_table.c.user_id == bindparam('key_user'),
+                                        _rollup_table.c.day == bindparam('key_day'),
+                                        _rollup_table.c.entries <= 0),
+            emptied
+        )
+
+
+@event.listens_for(MealHistory, 'after_insert')
+def _history_inserted(mapper, connection, target):
+    deltas = new_delta_map()
+    nutrients = meal_nutrients(connection, [target.meal_id]).get(target.meal_id, {})
+    add_contribution(deltas, target.user_id, target.date, target.portion_size, nutrients)
+    apply_rollup_deltas(connection, deltas)
+
+
+@event.listens_for(MealHistory, 'after_delete')
+def _history_deleted(mapper, connection, target):
+    deltas = new_delta_map()
+    nutrients = meal_nutrients(connection, [target.meal_id]).get(target.meal_id, {})
+    add_contribution(deltas, target.user_id, target.date, target.portion_size, nutrients, sign=-1)
+    apply_rollup_deltas(connection, deltas)
+
+
+_TRACKED_ATTRIBUTES = ('user_id', 'meal_id', 'date', 'portion_size')
+
+
+@event.listens_for(MealHistory, 'after_update')
+def _history_updated(mapper, connection, target):
+    histories = {name: get_history(target, name) for name in _TRACKED_ATTRIBUTES}
+    if not any(history.has_changes() for history in histories.values()):
+        return
+
+    previous = {name: history.deleted[0] if history.deleted else getattr(target, name)
+                for name, history in histories.items()}
+    nutrients = meal_nutrients(connection, [previous['meal_id'], target.meal_id])
+    deltas = new_delta_map()
+    add_contribution(deltas, previous['user_id'], previous['date'], previous['portion_size'],
+                     nutrients.get(previous['meal_id'], {}), sign=-1)
+    add_contribution(deltas, target.user_id, target.date, target.portion_size,
+                     nutrients.get(target.meal_id, {}))
+    apply_rollup_deltas(connection, deltas)
+
+
+# Load previous values before they are overwritten so after_update can subtract them
+for _name in _TRACKED_ATTRIBUTES:
+    event.listen(getattr(MealHistory, _name), 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+def rebuild_daily_rollups(user_id: Optional[int] = None) -> int:
+    """Recompute rollups from raw history (after meal nutrient edits or drift); returns days written"""
+    history_day = func.date(MealHistory.date)
+    portion = func.coalesce(MealHistory.portion_size, 1.0)
+    aggregated = (
+        select(
+            MealHistory.user_id,
+            history_day,
+            *[func.sum(func.coalesce(getattr(Meal, field), 0) * portion) for field in NUTRIENT_FIELDS],
+            func.count(MealHistory.id)
+        )
+        .join(Meal, Meal.id == MealHistory.meal_id)
+        .group_by(MealHistory.user_id, history_day)
+    )
+    cleared = delete(_rollup_table)
+    # Archived months are no longer in meal_history; their rollups are kept as they were
+    horizon = archive_horizon()
+    if horizon is not None:
+        aggregated = aggregated.where(MealHistory.date >= datetime.combine(horizon, datetime.min.time()))
+        cleared = cleared.where(_rollup_table.c.day >= horizon)
+    if user_id is not None:
+        aggregated = aggregated.where(MealHistory.user_id == user_id)
+        cleared = cleared.where(_rollup_table.c.user_id == user_id)
+
+    db.session.execute(cleared)
+    result = db.session.execute(
+        insert(_rollup_table).from_select(['user_id', 'day', *NUTRIENT_FIELDS, 'entries'], aggregated)
+    )
+    db.session.commit()
+    logger.info("Rebuilt daily nutrition rollups (user=%s): %s days", user_id or 'all', result.rowcount)
+    return result.rowcount
+
+
+def current_goal(user_id: int) -> Optional[NutritionGoal]:
+    """The user's most recently set nutrition goal"""
+    return (NutritionGoal.query.filter_by(user_id=user_id)
+            .order_by(NutritionGoal.created_at.desc(), NutritionGoal.id.desc()).first())
+
+
+def compare_to_goal(totals: Dict, goal: Optional[NutritionGoal], days: int = 1) -> Optional[Dict]:
+    if goal is None:
+        return None
+    comparison = {}
+    for field, goal_field in GOAL_FIELDS.items():
+        target = getattr(goal, goal_field)
+        if target:
+            target = target * days
+            comparison[field] = {
+                'goal': round(target, 1),
+                'remaining': round(target - totals[field], 1),
+                'percent': round(totals[field] / target * 100, 1)
+            }
+    return comparison
+
+
+def _empty_day(day: date) -> DailyNutrition:
+    return DailyNutrition(day=day, entries=0, **dict.fromkeys(NUTRIENT_FIELDS, 0))
+
+
+def daily_intake(user_id: int, day: date) -> Dict:
+    """One day's totals versus the current goal: a primary-key read plus the goal lookup"""
+    rollup = db.session.get(DailyNutrition, (user_id, day)) or _empty_day(day)
+    totals = rollup.to_dict()
+    return {'totals': totals, 'goal': compare_to_goal(totals, current_goal(user_id))}
+
+
+def weekly_intake(user_id: int, start: date) -> Dict:
+    """Seven days of rollups from start, with weekly totals and per-day goal comparison"""
+    end = start + timedelta(days=6)
+    rows = {row.day: row for row in DailyNutrition.query.filter(
+        DailyNutrition.user_id == user_id, DailyNutrition.day.between(start, end))}
+    goal = current_goal(user_id)
+
+    days: List[Dict] = []
+    for offset in range(7):
+        day = start + timedelta(days=offset)
+        totals = (rows.get(day) or _empty_day(day)).to_dict()
+        days.append({'totals': totals, 'goal': compare_to_goal(totals, goal)})
+
+    week = {field: sum(getattr(row, field) for row in rows.values()) for field in NUTRIENT_FIELDS}
+    week_totals = {field: round(value, 1) for field, value in week.items()}
+    week_totals['entries'] = sum(row.entries for row in rows.values())
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': days,
+        'totals': week_totals,
+        'goal': compare_to_goal(week_totals, goal, days=7)
+    }
+
+
+def meal_log(user_id: int, day: date) -> List[Dict]:
+    """A day's history entries (hot or archived) with their meals fetched in one IN query"""
+    start = datetime.combine(day, datetime.min.time())
+    entries = history_entries(user_id, start, start + timedelta(days=1))
+    meals = {meal.id: meal for meal in
+             Meal.query.filter(Meal.id.in_({entry['meal_id'] for entry in entries}))} if entries else {}
+    return [{
+        'id': entry['id'],
+        'meal_id': entry['meal_id'],
+        'meal_name': meals[entry['meal_id']].name if entry['meal_id'] in meals else None,
+        'date': entry['date'].isoformat(),
+        'portion_size': entry['portion_size'],
+        'nutrition': adjusted_nutrition(meals[entry['meal_id']], entry['portion_size'])
+                     if entry['meal_id'] in meals else {}
+    } for entry in entries]
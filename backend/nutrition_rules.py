@@ -0,0 +1,152 @@
+"""
+Declarative meal nutrition rules
+The nutrition score and the BMI >= 30 eligibility criteria are defined once, as
+small rule trees, and compiled three ways from the same definition: to
+SQLAlchemy expressions (so filters and ORDER BY run in the database), to plain
+Python over a Meal or a dict of nutrients, and to numpy over whole columns.
+Missing nutrients count as 0 everywhere, as the original model methods did
+with `value or 0`.
+"""
+
+import operator
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Mapping, Tuple
+
+import numpy as np
+from sqlalchemy import case, func
+
+_COMPARISONS = {'<=': operator.le, '>=': operator.ge, '<': operator.lt, '>': operator.gt}
+
+
+class _PythonBackend:
+    def __init__(self, source):
+        self.source = source
+
+    def value(self, column: str):
+        value = self.source.get(column) if isinstance(self.source, Mapping) else getattr(self.source, column)
+        return value or 0
+
+    minimum = staticmethod(min)
+
+    @staticmethod
+    def choose(condition, when_true, when_false):
+        return when_true if condition else when_false
+
+
+class _SqlBackend:
+    def __init__(self, entity):
+        self.entity = entity
+
+    def value(self, column: str):
+        return func.coalesce(getattr(self.entity, column), 0)
+
+    @staticmethod
+    def minimum(value, cap):
+        return case((value > cap, cap), else_=value)
+
+    @staticmethod
+    def choose(condition, when_true, when_false):
+        return case((condition, when_true), else_=when_false)
+
+
+class _ArrayBackend:
+    def __init__(self, columns: Mapping[str, np.ndarray]):
+        self.columns = columns
+
+    def value(self, column: str):
+        return np.nan_to_num(np.asarray(self.columns[column], dtype=float))
+
+    minimum = staticmethod(np.minimum)
+    choose = staticmethod(np.where)
+
+
+class Rule(ABC):
+    @abstractmethod
+    def build(self, backend):
+        """The rule compiled by one backend (SQL, Python or numpy)"""
+
+    def sql(self, entity):
+        """Column expression over a mapped class such as Meal"""
+        return self.build(_SqlBackend(entity))
+
+    def evaluate(self, source):
+        """Value for one Meal (or any object with the columns as attributes) or a dict of nutrients"""
+        return self.build(_PythonBackend(source))
+
+    def array(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Values for whole columns at once; NaN counts as a missing nutrient"""
+        return self.build(_ArrayBackend(columns))
+
+
+@dataclass(frozen=True)
+class Threshold(Rule):
+    """column <op> limit, e.g. Threshold('protein', '>=', 15)"""
+    column: str
+    op: str
+    limit: float
+
+    def build(self, backend):
+        return _COMPARISONS[self.op](backend.value(self.column), self.limit)
+
+
+@dataclass(frozen=True)
+class AtLeast(Rule):
+    """True when at least `count` of the conditions hold"""
+    count: int
+    conditions: Tuple[Rule, ...]
+
+    def build(self, backend):
+        met = sum(backend.choose(condition.build(backend), 1, 0) for condition in self.conditions)
+        return met >= self.count
+
+
+@dataclass(frozen=True)
+class Linear(Rule):
+    """Points growing linearly with the column, reaching `points` at `full` and capped there"""
+    column: str
+    full: float
+    points: float
+
+    def build(self, backend):
+        return backend.minimum(backend.value(self.column) / self.full * self.points, self.points)
+
+
+@dataclass(frozen=True)
+class Steps(Rule):
+    """Points of the first (limit, points) step with column <= limit, else `otherwise`"""
+    column: str
+    steps: Tuple[Tuple[float, float], ...]
+    otherwise: float
+
+    def build(self, backend):
+        value, result = backend.value(self.column), self.otherwise
+        for limit, points in reversed(self.steps):
+            result = backend.choose(value <= limit, points, result)
+        return result
+
+
+@dataclass(frozen=True)
+class Total(Rule):
+    """Sum of the parts, capped"""
+    parts: Tuple[Rule, ...]
+    cap: float
+
+    def build(self, backend):
+        return backend.minimum(sum(part.build(backend) for part in self.parts), self.cap)
+
+
+# Nutrition score for recommendations (0-50): protein and fiber up to 20 and 15 points, plus calorie density
+NUTRITION_SCORE = Total((
+    Linear('protein', full=30, points=20),
+    Linear('fiber', full=10, points=15),
+    Steps('calories', ((200, 15), (400, 10)), otherwise=5),
+), cap=50)
+
+# Meal suitability for BMI >= 30 users: at least 3 of the 4 criteria (75%)
+BMI_30_CRITERIA = AtLeast(3, (
+    Threshold('calories', '<=', 400),   # reasonable for weight management
+    Threshold('protein', '>=', 15),     # muscle preservation during weight loss
+    Threshold('fiber', '>=', 3),        # satiety and digestive health
+    Threshold('sugar', '<=', 15),       # blood sugar management
+))
@@ -0,0 +1,164 @@
+"""
+Bounded process-pool password hashing with admission control
+Keeps PBKDF2 work off the request thread and sheds overload with a fast error
+"""
+
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+
+def _hash_parameters(method: str) -> Tuple:
+    """(algorithm, cost parameters...) of a werkzeug method or stored hash prefix, defaults filled in as werkzeug does
+
+    'pbkdf2', 'pbkdf2:sha256' and 'pbkdf2:sha256:600000' all give ('pbkdf2', 'sha256', 600000).
+    """
+    algorithm, *args = method.split('$', 1)[0].split(':')
+    if algorithm == 'pbkdf2':
+        return ('pbkdf2', args[0] if args else 'sha256', int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS)
+    if algorithm == 'scrypt':
+        return ('scrypt',) + (tuple(map(int, args)) if args else (2 ** 15, 8, 1))
+    return (algorithm, *args)
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full or a hash did not finish in time"""
+
+    def __init__(self, message: str = 'Password hashing capacity exceeded', retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs werkzeug hashing in worker processes behind a queue-depth limit
+
+    ``workers=0`` hashes inline on the calling thread (useful for scripts and
+    debugging) while still applying the admission limit.
+    """
+
+    def __init__(self, method: str = DEFAULT_HASH_METHOD, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, timeout: float = 10.0):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        # Create lazily and per process so a pre-forking server never shares a pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _release_slot(self, _future=None):
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded()
+
+        # A submitted hash keeps its slot until it finishes: cancel() cannot stop one
+        # a worker has already started, so a timed-out hash still occupies that worker
+        released_on_done = False
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return fn(*args)
+
+            future = executor.submit(fn, *args)
+            future.add_done_callback(self._release_slot)
+            released_on_done = True
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                raise HashingOverloaded('Password hashing timed out') from None
+        except BrokenProcessPool:
+            logger.error("Password hashing pool broke; it will be recreated on next use")
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            if not released_on_done:
+                self._release_slot()
+
+    def hash_password(self, password: str) -> str:
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """Hash a batch of passwords across the shared pool for bulk imports
+
+        Skips the admission slots, which meter interactive requests. Interactive
+        hashes queue behind the batch, so the HTTP import path only takes small
+        batches and large files go through the import-users CLI.
+        """
+        executor = self._get_executor()
+        if executor is None or len(passwords) < 2:
+            return [generate_password_hash(password, self.method) for password in passwords]
+
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(executor.map(generate_password_hash, passwords, repeat(self.method), chunksize=chunksize))
+
+    def resize(self, workers: int):
+        """Change the pool size (0 hashes inline); the pool is recreated on next use"""
+        self.shutdown()
+        self.workers = workers
+
+    def verify_password(self, password_hash: str, password: str) -> Tuple[bool, bool]:
+        """Check a password; returns (valid, needs_rehash)"""
+        valid = self._run(check_password_hash, password_hash, password)
+        return valid, valid and self.needs_rehash(password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when a stored hash was made with a different algorithm or cost factor"""
+        try:
+            return _hash_parameters(password_hash) != _hash_parameters(self.method)
+        except ValueError:  # unparseable cost factor: replace the hash
+            return True
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+def init_password_hasher(app):
+    """Create the app's PasswordHasher from PASSWORD_HASH_* config"""
+    hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+        workers=app.config.get('PASSWORD_HASH_WORKERS'),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING'),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+    )
+    app.extensions['password_hasher'] = hasher
+    atexit.register(hasher.shutdown)
+    return hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the current app's hasher, creating it on first use"""
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        hasher = init_password_hasher(current_app)
+    return hasher
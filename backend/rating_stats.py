@@ -0,0 +1,115 @@
+"""
+Denormalized meal rating aggregates and top-rated leaderboards
+MealRating mapper events add to Meal.rating_count/rating_sum and recompute the
+Bayesian-average rating_score with one atomic UPDATE in the same flush that
+writes the rating, so an average rating never needs a GROUP BY. Each meal
+type's leaderboard is the (type, rating_score, id) index: the database keeps it
+sorted as scores move, and top_rated() reads the first entries of one type.
+reconcile_rating_stats() recounts from MealRating to correct drift from writes
+that bypass the ORM.
+"""
+
+import logging
+from typing import Dict, List
+
+from sqlalchemy import Float, bindparam, cast, event, func, select, update
+from sqlalchemy.orm.attributes import get_history
+
+from meal_planner import MEAL_SLOTS
+from models import db, Meal, MealRating
+
+logger = logging.getLogger(__name__)
+
+RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT = 3.0, 5  # every meal starts as if rated 3 stars five times
+MIN_LEADERBOARD_RATINGS = 1
+
+_meal_table = Meal.__table__
+
+
+def bayesian_score(count: int, total: int) -> float:
+    """Average rating pulled towards the prior while a meal has few ratings"""
+    return (total + RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT) / (count + RATING_PRIOR_WEIGHT)
+
+
+def _adjust(connection, meal_id: int, count: int, total: int):
+    """Atomic UPDATE ... SET rating_count = rating_count + n; SET reads the pre-update row"""
+    if not count and not total:
+        return
+    new_count = _meal_table.c.rating_count + count
+    new_total = _meal_table.c.rating_sum + total
+    new_score = (cast(new_total, Float) + RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT) / (new_count + RATING_PRIOR_WEIGHT)
+    connection.execute(update(_meal_table).where(_meal_table.c.id == meal_id).values(
+        rating_count=new_count, rating_sum=new_total, rating_score=new_score))
+
+
+@event.listens_for(MealRating, 'after_insert')
+def _rating_added(mapper, connection, target):
+    _adjust(connection, target.meal_id, 1, target.rating)
+
+
+@event.listens_for(MealRating, 'after_delete')
+def _rating_deleted(mapper, connection, target):
+    _adjust(connection, target.meal_id, -1, -target.rating)
+
+
+@event.listens_for(MealRating, 'after_update')
+def _rating_updated(mapper, connection, target):
+    meal_history, rating_history = get_history(target, 'meal_id'), get_history(target, 'rating')
+    if not (meal_history.has_changes() or rating_history.has_changes()):
+        return
+    previous_meal = meal_history.deleted[0] if meal_history.deleted else target.meal_id
+    previous_rating = rating_history.deleted[0] if rating_history.deleted else target.rating
+    if previous_meal == target.meal_id:
+        _adjust(connection, target.meal_id, 0, target.rating - previous_rating)
+    else:
+        _adjust(connection, previous_meal, -1, -previous_rating)
+        _adjust(connection, target.meal_id, 1, target.rating)
+
+
+# Load the previous meal and stars before they are overwritten so after_update can move them
+for _attribute in (MealRating.meal_id, MealRating.rating):
+    event.listen(_attribute, 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+def top_rated(meal_type: str, limit: int = 10) -> List[Dict]:
+    """Best-rated meals of one type, straight off the leaderboard index"""
+    rows = db.session.execute(
+        select(Meal.id, Meal.name, Meal.calories, Meal.rating_count, Meal.rating_sum, Meal.rating_score)
+        .where(Meal.type == meal_type, Meal.rating_count >= MIN_LEADERBOARD_RATINGS)
+        .order_by(Meal.rating_score.desc(), Meal.id).limit(limit)
+    ).all()
+    return [{'rank': rank, 'meal_id': meal_id, 'name': name, 'calories': calories, 'rating_count': count,
+             'average_rating': round(total / count, 2), 'rating_score': round(score, 3)}
+            for rank, (meal_id, name, calories, count, total, score) in enumerate(rows, start=1)]
+
+
+def leaderboards(limit: int = 10) -> Dict[str, List[Dict]]:
+    return {meal_type: top_rated(meal_type, limit) for meal_type in MEAL_SLOTS}
+
+
+def reconcile_rating_stats(batch_size: int = 5000) -> Dict:
+    """Recount every meal's ratings and overwrite drifted aggregates; returns counts"""
+    actual = {meal_id: (count, total) for meal_id, count, total in db.session.execute(
+        select(MealRating.meal_id, func.count(), func.sum(MealRating.rating)).group_by(MealRating.meal_id))}
+    stored = db.session.execute(
+        select(_meal_table.c.id, _meal_table.c.rating_count, _meal_table.c.rating_sum, _meal_table.c.rating_score)
+    ).all()
+
+    params = []
+    for meal_id, count, total, score in stored:
+        expected_count, expected_total = actual.get(meal_id, (0, 0))
+        expected_score = bayesian_score(expected_count, expected_total)
+        if (count, total) != (expected_count, expected_total) or score is None or abs(score - expected_score) > 1e-9:
+            params.append({'key_id': meal_id, 'count': expected_count, 'total': expected_total,
+                           'score': expected_score})
+
+    stmt = (update(_meal_table).where(_meal_table.c.id == bindparam('key_id'))
+            .values(rating_count=bindparam('count'), rating_sum=bindparam('total'), rating_score=bindparam('score')))
+    for start in range(0, len(params), batch_size):
+        db.session.execute(stmt, params[start:start + batch_size])
+    db.session.commit()
+
+    if params:
+        logger.warning("Meal rating aggregates drift corrected on %s meals", len(params))
+    return {'meals': len(stored), 'corrected': len(params)}
@@ -0,0 +1,246 @@
+"""
+Composite recipes with cached nutrient rollups
+A recipe is a Meal listed in recipe_component with the Meals it is made of
+(recipes included, nested to any depth) and the grams of each. Its nutrients,
+serving weight, allergens and ingredient text are rolled up into its own Meal
+columns, so reading, scoring and filtering a recipe cost exactly what a plain
+meal does: nutrition_score and eligible_for_bmi_30 are expressions over those
+columns. Only the user who created a recipe can change its components, and
+catalog meals (which have no owner) never become recipes. After each flush
+that edits a component list or a meal's nutrients, one recursive query over
+the reverse edges finds the recipes above the change and only those are
+recomputed, components before the recipes that use them.
+refresh_all_recipes() recomputes every recipe, for writes that bypass the ORM.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from graphlib import CycleError, TopologicalSorter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from ingredient_index import index_meal_ingredients, write_postings
+from meal_planner import MEAL_SLOTS, NO_ALLERGY_TERMS, catalog_cache
+from meal_tagging import sync_meal_categories
+from models import db, Meal, RecipeComponent
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+ROLLUP_COLUMNS = ROLLUP_NUTRIENTS + ('serving_size', 'allergens', 'ingredients')
+ROLLUP_SOURCES = ROLLUP_COLUMNS + ('name',)  # a change to any of these moves the recipes above
+DEFAULT_SERVING_GRAMS = 100.0  # USDA nutrients are per 100 g when no serving weight is given
+MAX_COMPONENTS = 100
+REFRESHED_KEY = 'refreshed_recipes'  # session.info entry: recipe ids rolled up since the last sync
+
+_meal_table = Meal.__table__
+_edges = RecipeComponent.__table__
+_GRAMS = re.compile(r'(\d+(?:\.\d+)?)\s*g\b', re.IGNORECASE)
+
+
+class RecipeError(ValueError):
+    """Raised for an invalid recipe: unknown meals, bad gram amounts or a recipe containing itself"""
+
+
+class RecipePermissionError(RecipeError):
+    """Raised when a user edits a meal that is not a recipe they created"""
+
+
+def serving_grams(serving_size: Optional[str]) -> float:
+    """Weight of one serving from text such as '150g' or '1 cup (240 g)'"""
+    match = _GRAMS.search(serving_size or '')
+    grams = float(match.group(1)) if match else 0.0
+    return grams if grams > 0 else DEFAULT_SERVING_GRAMS
+
+
+def roll_up(parts) -> Dict:
+    """A recipe's column values from (grams, component columns) pairs; the whole recipe is one serving"""
+    totals = dict.fromkeys(ROLLUP_NUTRIENTS, 0.0)
+    allergens: Dict[str, str] = {}
+    ingredients: Dict[str, str] = {}
+    weight = 0.0
+    for grams, meal in parts:
+        share = grams / serving_grams(meal['serving_size'])
+        for column in ROLLUP_NUTRIENTS:
+            totals[column] += (meal[column] or 0) * share
+        weight += grams
+        for token in (meal['allergens'] or '').split(','):
+            if token.strip().lower() not in NO_ALLERGY_TERMS:
+                allergens.setdefault(token.strip().lower(), token.strip())
+        for part in (meal['ingredients'] or meal['name'] or '').split(','):
+            if part.strip():
+                ingredients.setdefault(part.strip().lower(), part.strip())
+
+    values = {column: round(total, 2) for column, total in totals.items()}
+    values['calories'] = int(round(totals['calories']))
+    values['serving_size'] = f'{weight:g}g'
+    values['allergens'] = ', '.join(sorted(allergens.values())) or 'None'
+    values['ingredients'] = ', '.join(ingredients.values()) or None
+    return values
+
+
+def refresh_recipes(connection, recipe_ids: Iterable[int] = (), changed_ids: Iterable[int] = ()) -> List[int]:
+    """Recompute recipe_ids and every recipe above them or above changed_ids; returns ids in update order"""
+    recipe_ids, changed_ids = set(recipe_ids), set(changed_ids)
+    if not recipe_ids and not changed_ids:
+        return []
+
+    above = (select(_edges.c.recipe_id).where(_edges.c.component_id.in_(recipe_ids | changed_ids))
+             .cte('above', recursive=True))
+    above = above.union(select(_edges.c.recipe_id).join(above, _edges.c.component_id == above.c.recipe_id))
+    targets = recipe_ids | set(connection.execute(select(above.c.recipe_id)).scalars())
+
+    components = defaultdict(list)
+    for recipe_id, component_id, grams in connection.execute(
+            select(_edges.c.recipe_id, _edges.c.component_id, _edges.c.grams).where(_edges.c.recipe_id.in_(targets))):
+        components[recipe_id].append((component_id, grams))
+    try:
+        order = list(TopologicalSorter({recipe_id: [component_id for component_id, _ in parts if component_id in components]
+                                        for recipe_id, parts in components.items()}).static_order())
+    except CycleError as e:
+        raise RecipeError(f"A recipe cannot contain itself (meals {' -> '.join(map(str, e.args[1]))})") from None
+
+    needed = set(order) | {component_id for parts in components.values() for component_id, _ in parts}
+    meals = {row.id: dict(row._mapping) for row in connection.execute(
+        select(_meal_table.c.id, *[_meal_table.c[column] for column in ROLLUP_SOURCES])
+        .where(_meal_table.c.id.in_(needed)))}
+
+    params = []
+    for recipe_id in order:
+        values = roll_up((grams, meals[component_id]) for component_id, grams in components[recipe_id])
+        if any(meals[recipe_id][column] != value for column, value in values.items()):
+            params.append({'key_id': recipe_id, **values})
+        meals[recipe_id].update(values)  # recipes further up read the fresh values
+
+    if params:
+        connection.execute(update(_meal_table).where(_meal_table.c.id == bindparam('key_id'))
+                           .values({column: bindparam(column) for column in ROLLUP_COLUMNS}), params)
+        catalog_cache.invalidate()
+    return order
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    # In after_flush the session still lists what was flushed, with attribute history intact
+    recipe_ids, changed_ids = set(), set()
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, RecipeComponent):
+            recipe_ids.update(value for value in (instance.recipe_id, *get_history(instance, 'recipe_id').deleted)
+                              if value is not None)
+        elif (isinstance(instance, Meal) and instance in session.dirty
+              and any(get_history(instance, column).has_changes() for column in ROLLUP_SOURCES)):
+            changed_ids.add(instance.id)
+    if recipe_ids or changed_ids:
+        refreshed = refresh_recipes(session.connection(), recipe_ids, changed_ids)
+        # Postings follow the rolled-up ingredient text in the same flush, so searches never lag it
+        write_postings(session.connection(), refreshed)
+        session.info.setdefault(REFRESHED_KEY, set()).update(refreshed)
+
+
+def sync_refreshed_recipes() -> int:
+    """Re-tag and re-index the recipes rolled up since the last call; returns how many"""
+    refreshed = db.session.info.pop(REFRESHED_KEY, set())
+    if refreshed:
+        sync_meal_categories(refreshed)
+        index_meal_ingredients(refreshed)
+    return len(refreshed)
+
+
+def _parse_components(components) -> Dict[int, float]:
+    """{meal_id: grams} from a mapping or a list of {"meal_id", "grams"} entries"""
+    if isinstance(components, dict):
+        components = [{'meal_id': meal_id, 'grams': grams} for meal_id, grams in components.items()]
+    if not isinstance(components, list) or not components:
+        raise RecipeError('components must be a non-empty list of {"meal_id", "grams"}')
+    if len(components) > MAX_COMPONENTS:
+        raise RecipeError(f'A recipe can have at most {MAX_COMPONENTS} components')
+
+    parsed: Dict[int, float] = {}
+    for entry in components:
+        try:
+            meal_id, grams = int(entry['meal_id']), float(entry['grams'])
+        except (KeyError, TypeError, ValueError):
+            raise RecipeError('each component needs a meal_id and grams') from None
+        if not 0 < grams <= 10000:
+            raise RecipeError('grams must be between 0 and 10000')
+        parsed[meal_id] = parsed.get(meal_id, 0.0) + grams
+    return parsed
+
+
+def set_recipe_components(recipe_id: int, components, user_id: int) -> Meal:
+    """Replace the components of a recipe user_id created; it and every recipe above it are rolled up in the same commit"""
+    parsed = _parse_components(components)
+    if recipe_id in parsed:
+        raise RecipeError('A recipe cannot contain itself')
+    recipe = db.session.get(Meal, recipe_id)
+    if recipe is None:
+        raise RecipeError('Recipe not found')
+    # Catalog meals have no owner, so their USDA values are never overwritten by a rollup
+    if recipe.created_by != user_id:
+        raise RecipePermissionError('Only the recipe\'s creator can change its components')
+    known = set(db.session.execute(select(Meal.id).where(Meal.id.in_(list(parsed)))).scalars())
+    unknown = sorted(set(parsed) - known)
+    if unknown:
+        raise RecipeError(f"Unknown meals: {', '.join(map(str, unknown))}")
+
+    current = {entry.component_id: entry for entry in RecipeComponent.query.filter_by(recipe_id=recipe_id)}
+    if not current and any(getattr(recipe, column) for column in ROLLUP_NUTRIENTS):
+        raise RecipeError('This meal has its own nutrients; create a new recipe instead')
+    for component_id, entry in current.items():
+        if component_id not in parsed:
+            db.session.delete(entry)
+    for component_id, grams in parsed.items():
+        if component_id in current:
+            current[component_id].grams = grams
+        else:
+            db.session.add(RecipeComponent(recipe_id=recipe_id, component_id=component_id, grams=grams))
+    try:
+        db.session.commit()
+    except RecipeError:
+        db.session.rollback()
+        raise
+    sync_refreshed_recipes()
+    return db.session.get(Meal, recipe_id)
+
+
+def create_recipe(name: str, meal_type: str, components, user_id: int) -> Meal:
+    """A new recipe Meal, owned by user_id, whose nutrients come entirely from its components"""
+    if not (name or '').strip():
+        raise RecipeError('name is required')
+    if meal_type not in MEAL_SLOTS:
+        raise RecipeError(f"type must be one of {', '.join(MEAL_SLOTS)}")
+    _parse_components(components)  # reject bad input before creating the meal
+    recipe = Meal(name=name.strip(), type=meal_type, calories=0, created_by=user_id)
+    db.session.add(recipe)
+    db.session.flush()
+    try:
+        return set_recipe_components(recipe.id, components, user_id)
+    except RecipeError:
+        db.session.rollback()
+        raise
+
+
+def recipe_components(recipe_id: int) -> List[Dict]:
+    """A recipe's components with their names (empty for a plain meal)"""
+    rows = db.session.execute(
+        select(RecipeComponent.component_id, Meal.name, RecipeComponent.grams)
+        .join(Meal, Meal.id == RecipeComponent.component_id)
+        .where(RecipeComponent.recipe_id == recipe_id).order_by(RecipeComponent.grams.desc())
+    ).all()
+    return [{'meal_id': meal_id, 'name': name, 'grams': grams} for meal_id, name, grams in rows]
+
+
+def refresh_all_recipes() -> Dict[str, int]:
+    """Recompute every recipe from its components and re-sync their tags and postings"""
+    recipe_ids = set(db.session.execute(select(_edges.c.recipe_id).distinct()).scalars())
+    refreshed = refresh_recipes(db.session.connection(), recipe_ids)
+    db.session.commit()
+    db.session.info.setdefault(REFRESHED_KEY, set()).update(refreshed)
+    sync_refreshed_recipes()
+    logger.info("Refreshed %s recipes", len(refreshed))
+    return {'recipes': len(refreshed)}
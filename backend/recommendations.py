@@ -0,0 +1,341 @@
+"""
+Precomputed per-user meal recommendations
+A nightly job scores the catalog for every eligible user and stores the top N
+in user_recommendation, so a request is one indexed read. Users sharing the
+same allergies and preferences share one scored catalog vector (nutrition
+score, Bayesian-average rating, preference adjustments, allergen exclusions);
+each user's rating history then adds per-meal-type affinity and removes meals
+already rated. Chunks of users are scored across a process pool while the
+parent streams users in and writes results out.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import delete, insert, select
+
+from bmi_classification import ELIGIBLE_CATEGORIES, is_eligible
+from meal_neighbors import also_liked_for_user
+from meal_planner import MEAL_SLOTS, MealCatalog, allergy_safe, catalog_cache, load_catalog
+from models import db, Meal, MealRating, User, UserRecommendation
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 20
+CANDIDATES_PER_SLOT = 3      # x top_n best meals per type kept per allergy/preference group
+QUALITY_WEIGHT = 0.3
+PREFERENCE_WEIGHT = 0.3
+AFFINITY_WEIGHT = 0.25
+SIGNATURE_CACHE_SIZE = 4096
+
+MEAT_TERMS = ('chicken', 'beef', 'pork', 'turkey', 'bacon', 'ham', 'lamb', 'salmon', 'tuna', 'cod',
+              'fish', 'shrimp', 'sausage', 'steak')
+
+_recommendation_table = UserRecommendation.__table__
+
+
+@dataclass
+class ScoringContext:
+    catalog: MealCatalog
+    base: np.ndarray      # nutrition score and rating quality, before per-group adjustments
+    features: Dict[str, np.ndarray]
+    top_n: int
+
+
+def _scaled(values: np.ndarray) -> np.ndarray:
+    """Map to [0, 1] against the 95th percentile so outliers do not flatten everyone else"""
+    if not len(values):
+        return values
+    ceiling = np.percentile(values, 95) or 1.0
+    return np.clip(values / ceiling, 0, 1)
+
+
+def meal_quality(catalog: MealCatalog) -> np.ndarray:
+    """Bayesian-average star rating per meal (kept on Meal by rating_stats), mapped from 1..5 stars to -1..1"""
+    rows = db.session.execute(select(Meal.id, Meal.rating_score).where(Meal.rating_count > 0)).all()
+    quality = np.zeros(len(catalog.ids))
+    if rows and len(catalog.ids):
+        meal_ids, scores = (np.array(column, dtype=float) for column in zip(*rows))
+        positions = np.searchsorted(catalog.ids, meal_ids)
+        known = (positions < len(catalog.ids)) & (catalog.ids[np.minimum(positions, len(catalog.ids) - 1)] == meal_ids)
+        quality[positions[known]] = (scores[known] - 3) / 2
+    return quality
+
+
+def build_context(catalog: MealCatalog, top_n: int = TOP_N, quality: Optional[np.ndarray] = None) -> ScoringContext:
+    calories = np.maximum(catalog.nutrients[:, 0], 1)
+    features = {
+        'protein': _scaled(catalog.nutrients[:, 1] / calories),
+        'carbs': _scaled(catalog.nutrients[:, 2] / calories),
+        'fat': _scaled(catalog.nutrients[:, 3] / calories),
+        'calories': _scaled(catalog.nutrients[:, 0]),
+    }
+    base = catalog.scores / 50
+    if quality is not None:
+        base = base + QUALITY_WEIGHT * quality
+    return ScoringContext(catalog=catalog, base=base, features=features, top_n=top_n)
+
+
+def _preference_terms(preferences: Optional[str]) -> List[str]:
+    return [term.strip() for term in re.split(r'[,;/]|\band\b', (preferences or '').lower()) if term.strip()]
+
+
+def _group_scores(context: ScoringContext, allergies: Optional[str], preferences: Optional[str]) -> np.ndarray:
+    """Catalog-wide scores for one allergies/preferences combination; -inf where excluded"""
+    catalog = context.catalog
+    allowed = catalog.eligible & (catalog.slots >= 0) & allergy_safe(catalog, allergies)
+    adjustment = np.zeros(len(catalog.ids))
+    for term in _preference_terms(preferences):
+        if term in ('vegetarian', 'vegan'):
+            for meat in MEAT_TERMS:
+                allowed &= np.char.find(catalog.names, meat) < 0
+            if term == 'vegan':
+                allowed &= allergy_safe(catalog, 'dairy, eggs')
+        elif term == 'high protein':
+            adjustment += context.features['protein']
+        elif term in ('low carb', 'keto'):
+            adjustment -= context.features['carbs']
+        elif term == 'low fat':
+            adjustment -= context.features['fat']
+        elif term in ('low calorie', 'light'):
+            adjustment -= context.features['calories']
+        elif term in MEAL_SLOTS:
+            adjustment += catalog.slots == MEAL_SLOTS.index(term)
+        else:
+            adjustment += np.char.find(catalog.names, term) >= 0
+    return np.where(allowed, context.base + PREFERENCE_WEIGHT * adjustment, -np.inf)
+
+
+def _candidates(context: ScoringContext, scores: np.ndarray) -> np.ndarray:
+    """Best few meals of each type; type affinity can reorder these but rarely reaches past them"""
+    keep = context.top_n * CANDIDATES_PER_SLOT
+    picked = []
+    for slot in range(len(MEAL_SLOTS)):
+        members = np.flatnonzero((context.catalog.slots == slot) & np.isfinite(scores))
+        if len(members) > keep:
+            members = members[np.argpartition(-scores[members], keep)[:keep]]
+        picked.append(members)
+    return np.concatenate(picked)
+
+
+_worker_context: Optional[ScoringContext] = None
+_signature_cache: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def _init_worker(context: ScoringContext):
+    global _worker_context
+    _worker_context = context
+    _signature_cache.clear()
+
+
+def _signature_candidates(context: ScoringContext, cache: Dict, allergies: Optional[str],
+                          preferences: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+    key = (allergies or '', preferences or '')
+    cached = cache.get(key)
+    if cached is None:
+        scores = _group_scores(context, allergies, preferences)
+        candidates = _candidates(context, scores)
+        cached = (candidates, scores[candidates])
+        if len(cache) >= SIGNATURE_CACHE_SIZE:
+            cache.clear()
+        cache[key] = cached
+    return cached
+
+
+def _score_in_worker(users: List[Tuple], ratings: List[Tuple]) -> List[Tuple]:
+    return score_chunk(_worker_context, users, ratings, _signature_cache)
+
+
+def score_chunk(context: ScoringContext, users: List[Tuple], ratings: List[Tuple],
+                cache: Optional[Dict] = None) -> List[Tuple]:
+    """(user_id, rank, meal_id, score) rows for users given as (id, allergies, preferences)"""
+    catalog = context.catalog
+    top_n = context.top_n
+    cache = {} if cache is None else cache
+    row_of = {user_id: row for row, (user_id, _, _) in enumerate(users)}
+
+    # Per-user affinity for each meal type from their own ratings, all users at once
+    affinity = np.zeros((len(users), len(MEAL_SLOTS)))
+    rated_rows = rated_positions = np.zeros(0, dtype=np.int64)
+    if ratings and len(catalog.ids):
+        user_ids, meal_ids, stars = zip(*ratings)
+        rows = np.array([row_of.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        meal_ids, stars = np.array(meal_ids), np.array(stars, dtype=float)
+        positions = np.minimum(np.searchsorted(catalog.ids, meal_ids), len(catalog.ids) - 1)
+        known = (catalog.ids[positions] == meal_ids) & (rows >= 0)
+        rated_rows, rated_positions, stars = rows[known], positions[known], stars[known]
+        slots = catalog.slots[rated_positions]
+        typed = slots >= 0
+        liking, counts = np.zeros_like(affinity), np.zeros_like(affinity)
+        np.add.at(liking, (rated_rows[typed], slots[typed]), (stars[typed] - 3) / 2)
+        np.add.at(counts, (rated_rows[typed], slots[typed]), 1)
+        affinity = liking / np.maximum(counts, 1)
+
+    groups = defaultdict(list)
+    for row, (_, allergies, preferences) in enumerate(users):
+        groups[(allergies, preferences)].append(row)
+    group_of = np.empty(len(users), dtype=np.int64)
+    for index, members in enumerate(groups.values()):
+        group_of[members] = index
+    rated_groups = group_of[rated_rows]
+    local_row = np.empty(len(users), dtype=np.int64)
+
+    user_column, rank_column, meal_column, score_column = [], [], [], []
+    for index, ((allergies, preferences), members) in enumerate(groups.items()):
+        candidates, base = _signature_candidates(context, cache, allergies, preferences)
+        if not len(candidates):
+            continue
+        members = np.array(members, dtype=np.int64)
+        scores = base + AFFINITY_WEIGHT * affinity[members][:, catalog.slots[candidates]]
+
+        # Meals a member already rated are never recommended back to them
+        in_group = rated_groups == index
+        if in_group.any():
+            local_row[members] = np.arange(len(members))
+            order = np.argsort(candidates)
+            found = np.minimum(np.searchsorted(candidates[order], rated_positions[in_group]), len(candidates) - 1)
+            hit = candidates[order][found] == rated_positions[in_group]
+            scores[local_row[rated_rows[in_group][hit]], order[found[hit]]] = -np.inf
+
+        keep = min(top_n, len(candidates))
+        top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        finite = np.isfinite(top_scores)
+        user_column.append(np.repeat(members, keep)[finite.ravel()])
+        rank_column.append(np.tile(np.arange(1, keep + 1), len(members))[finite.ravel()])
+        meal_column.append(catalog.ids[candidates[top]][finite])
+        score_column.append(np.round(top_scores[finite], 4))
+
+    if not user_column:
+        return []
+    user_ids = np.array([user_id for user_id, _, _ in users])
+    return list(zip(user_ids[np.concatenate(user_column)].tolist(), np.concatenate(rank_column).tolist(),
+                    np.concatenate(meal_column).tolist(), np.concatenate(score_column).tolist()))
+
+
+def _user_chunks(chunk_size: int) -> Iterator[Dict]:
+    """Eligible users in id order with their ratings; each chunk owns the id range (low, high]"""
+    low = 0
+    while True:
+        users = db.session.execute(
+            select(User.id, User.allergies, User.preferences)
+            .where(User.id > low, User.bmi_category.in_(ELIGIBLE_CATEGORIES))
+            .order_by(User.id).limit(chunk_size)
+        ).all()
+        if not users:
+            return
+        high = users[-1][0]
+        ratings = db.session.execute(
+            select(MealRating.user_id, MealRating.meal_id, MealRating.rating)
+            .where(MealRating.user_id > low, MealRating.user_id <= high)
+        ).all()
+        yield {'low': low, 'high': high, 'users': [tuple(user) for user in users],
+               'ratings': [tuple(rating) for rating in ratings]}
+        low = high
+
+
+def _store(low: int, high: Optional[int], rows: List[Tuple], generated_at: datetime):
+    """Replace the stored recommendations of every user id in (low, high]"""
+    in_range = [_recommendation_table.c.user_id > low]
+    if high is not None:
+        in_range.append(_recommendation_table.c.user_id <= high)
+    db.session.execute(delete(_recommendation_table).where(*in_range))
+    if rows:
+        db.session.execute(insert(_recommendation_table), [
+            {'user_id': user_id, 'rank': rank, 'meal_id': meal_id, 'score': score, 'generated_at': generated_at}
+            for user_id, rank, meal_id, score in rows])
+    db.session.commit()
+
+
+def precompute_recommendations(top_n: int = TOP_N, chunk_size: int = 2000,
+                               workers: Optional[int] = None) -> Dict:
+    """Recompute and store the top-N meals of every eligible user; returns throughput figures"""
+    started = time.perf_counter()
+    catalog = load_catalog()
+    context = build_context(catalog, top_n, meal_quality(catalog))
+    generated_at = datetime.utcnow()
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    totals = {'users': 0, 'rows': 0}
+    last_high = 0
+
+    def finish(chunk, rows):
+        nonlocal last_high
+        _store(chunk['low'], chunk['high'], rows, generated_at)
+        totals['users'] += len(chunk['users'])
+        totals['rows'] += len(rows)
+        last_high = chunk['high']
+
+    if workers <= 1:
+        cache = {}
+        for chunk in _user_chunks(chunk_size):
+            finish(chunk, score_chunk(context, chunk['users'], chunk['ratings'], cache))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as executor:
+            pending = deque()
+            for chunk in _user_chunks(chunk_size):
+                pending.append((chunk, executor.submit(_score_in_worker, chunk['users'], chunk['ratings'])))
+                if len(pending) >= workers * 2:
+                    chunk, future = pending.popleft()
+                    finish(chunk, future.result())
+            while pending:
+                chunk, future = pending.popleft()
+                finish(chunk, future.result())
+
+    # Users past the last eligible one (e.g. no longer eligible) keep nothing stale
+    _store(last_high, None, [], generated_at)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'users': totals['users'],
+        'recommendations': totals['rows'],
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'users_per_second': round(totals['users'] / elapsed, 1) if elapsed else 0.0
+    }
+    logger.info("Precomputed recommendations: %s", summary)
+    return summary
+
+
+def get_recommendations(user: Dict, limit: int = 10) -> Dict:
+    """A user's stored recommendations (one indexed read), scored on the fly if the job has not run yet,
+    plus what people who liked the same meals also liked"""
+    rows = db.session.execute(
+        select(UserRecommendation.rank, UserRecommendation.score, UserRecommendation.generated_at,
+               Meal.id, Meal.name, Meal.type, Meal.calories, Meal.protein, Meal.carbs, Meal.fat)
+        .join(Meal, Meal.id == UserRecommendation.meal_id)
+        .where(UserRecommendation.user_id == user['id'])
+        .order_by(UserRecommendation.rank).limit(limit)
+    ).all()
+    generated_at = rows[0].generated_at.isoformat() if rows else None
+
+    if not rows and is_eligible(user.get('BMI')):
+        context = build_context(catalog_cache.get(), limit)
+        ratings = db.session.execute(
+            select(MealRating.user_id, MealRating.meal_id, MealRating.rating)
+            .where(MealRating.user_id == user['id'])
+        ).all()
+        scored = score_chunk(context, [(user['id'], user.get('allergies'), user.get('preferences'))],
+                             [tuple(rating) for rating in ratings])
+        meals = {meal.id: meal for meal in Meal.query.filter(Meal.id.in_([row[2] for row in scored]))}
+        rows = [(rank, score, None, meal_id, meals[meal_id].name, meals[meal_id].type, meals[meal_id].calories,
+                 meals[meal_id].protein, meals[meal_id].carbs, meals[meal_id].fat)
+                for _, rank, meal_id, score in scored]
+
+    return {
+        'generated_at': generated_at,
+        'recommendations': [{
+            'rank': rank, 'score': score, 'meal_id': meal_id, 'name': name, 'type': meal_type,
+            'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat
+        } for rank, score, _, meal_id, name, meal_type, calories, protein, carbs, fat in rows],
+        'also_liked': also_liked_for_user(user, limit)
+    }
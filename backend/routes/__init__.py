@@ -5,6 +5,9 @@ from .bmi import bmi_bp
 from .features import features_bp
 from .contact import contact_bp
 from .home import home_bp
+from .intake import intake_bp
+from .weight import weight_bp
+from .dashboard import dashboard_bp
 
 def register_blueprints(app):
     """Register all application blueprints following Flask blueprint organization"""
@@ -14,6 +17,9 @@ def register_blueprints(app):
     app.register_blueprint(bmi_bp, url_prefix='/bmi')
     app.register_blueprint(features_bp, url_prefix='/features')
     app.register_blueprint(contact_bp, url_prefix='/contact')
+    app.register_blueprint(intake_bp, url_prefix='/api')
+    app.register_blueprint(weight_bp, url_prefix='/api')
+    app.register_blueprint(dashboard_bp, url_prefix='/api')
     
     # Add API info route following copilot API response conventions
     @app.route('/api')
@@ -28,6 +34,10 @@ def register_blueprints(app):
                 'meals': 'GET /meals',
                 'contact': 'GET /contact',
                 'bmi': 'GET /bmi',
-                'auth': 'GET /auth/login, POST /auth/register'
+                'auth': 'GET /auth/login, POST /auth/register',
+                'intake': 'GET /api/intake/daily, GET /api/intake/weekly, GET /api/intake/log',
+                'history': 'GET /api/history?from=&to=&bucket=day|week|month',
+                'weight': 'GET /api/weight?days=, POST /api/weight',
+                'dashboard': 'GET /api/dashboard'
             }
         }
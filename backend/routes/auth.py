@@ -1,27 +1,30 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app, g
 from models import db, User
+from bulk_onboarding import BulkImportError, import_users, parse_import_rows
+from api_tokens import issue_access_token, token_required, get_user_snapshot
+from password_hashing import get_password_hasher, HashingOverloaded
+from bmi_classification import calculate_bmi, is_eligible
+from usernames import UsernameAllocator, commit_with_unique_username, username_base_from_email
 import re
+import hmac
 import logging
 
-# Setup logger following copilot QA integration patterns
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Create console handler if not already exists
-if not logger.handlers:
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(formatter)
-    
-    # Add handler to logger
-    logger.addHandler(console_handler)
 
 auth_bp = Blueprint('auth', __name__)
 
+def _upgrade_password_hash(user, password):
+    """Re-hash a verified password with the current cost factor; skipped when hashing is saturated"""
+    try:
+        user.password_hash = get_password_hasher().hash_password(password)
+        db.session.commit()
+        logger.info("Password hash upgraded to current cost factor for user: %s", user.username)
+    except HashingOverloaded:
+        logger.info("Skipped password rehash under load for user: %s", user.username)
+    except Exception as rehash_error:
+        db.session.rollback()
+        logger.warning("Password rehash failed for user %s: %s", user.username, rehash_error)
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page following copilot authentication patterns with enhanced error handling"""
@@ -32,92 +35,100 @@ def login():
             password = request.form.get('password', '')
             
             # Debug logging for troubleshooting
-            logger.info(f"Login attempt initiated for email: {email}")
+            logger.info("Login attempt initiated for email: %s", email)
             
             # Validation following copilot API response conventions
             if not all([email, password]):
-                logger.warning(f"Login attempt with missing fields - email: {bool(email)}, password: {bool(password)}")
+                logger.warning("Login attempt with missing fields - email: %s, password: %s", bool(email), bool(password))
                 flash('Please enter both email and password', 'error')
                 return render_template('login.html')
             
             if not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
-                logger.warning(f"Login attempt with invalid email format: {email}")
+                logger.warning("Login attempt with invalid email format: %s", email)
                 flash('Please enter a valid email address', 'error')
                 return render_template('login.html')
             
             # Database query with detailed logging
-            logger.debug(f"Querying database for user with email: {email}")
+            logger.debug("Querying database for user with email: %s", email)
             try:
                 user = User.query.filter_by(email=email).first()
-                logger.debug(f"Database query result - User found: {user is not None}")
+                logger.debug("Database query result - User found: %s", user is not None)
                 
                 if user:
-                    logger.debug(f"User details - ID: {user.id}, Username: {user.username}, BMI: {user.BMI}")
+                    logger.debug("User details - ID: %s, Username: %s, BMI: %s", user.id, user.username, user.BMI)
                     
                     # Verify all required User model columns exist
                     required_attrs = ['username', 'email', 'password_hash', 'height', 'weight', 'BMI']
                     missing_attrs = [attr for attr in required_attrs if not hasattr(user, attr)]
                     
                     if missing_attrs:
-                        logger.error(f"User model missing required attributes: {missing_attrs}")
+                        logger.error("User model missing required attributes: %s", missing_attrs)
                         flash('Account data incomplete. Please contact support.', 'error')
                         return render_template('login.html')
                     
                 else:
-                    logger.info(f"No user found with email: {email}")
+                    logger.info("No user found with email: %s", email)
                     
             except Exception as db_error:
-                logger.error(f"Database query error for email {email}: {db_error}")
+                logger.error("Database query error for email %s: %s", email, db_error)
                 flash('Unable to access user database. Please try again.', 'error')
                 return render_template('login.html')
             
             # Password verification
             if not user:
-                logger.warning(f"Login attempt with non-existent email: {email}")
+                logger.warning("Login attempt with non-existent email: %s", email)
                 flash('Invalid email or password', 'error')
                 return render_template('login.html')
             
             try:
-                password_valid = check_password_hash(user.password_hash, password)
-                logger.debug(f"Password verification for {email}: {password_valid}")
+                password_valid, needs_rehash = get_password_hasher().verify_password(user.password_hash, password)
+                logger.debug("Password verification for %s: %s", email, password_valid)
                 
                 if not password_valid:
-                    logger.warning(f"Failed login attempt - incorrect password for email: {email}")
+                    logger.warning("Failed login attempt - incorrect password for email: %s", email)
                     flash('Invalid email or password', 'error')
                     return render_template('login.html')
+                
+                if needs_rehash:
+                    _upgrade_password_hash(user, password)
+                    
+            except HashingOverloaded as overload:
+                logger.warning("Login shed under hashing load for %s: %s", email, overload)
+                flash('We are experiencing high demand. Please try again in a moment.', 'error')
+                return render_template('login.html'), 503, {'Retry-After': str(overload.retry_after)}
                     
             except Exception as pwd_error:
-                logger.error(f"Password verification error for {email}: {pwd_error}")
+                logger.error("Password verification error for %s: %s", email, pwd_error)
                 flash('Authentication system error. Please try again.', 'error')
                 return render_template('login.html')
             
             # BMI eligibility check following copilot business rules
             try:
-                logger.debug(f"Checking BMI eligibility for user {email} - BMI: {user.BMI}")
+                logger.debug("Checking BMI eligibility for user %s - BMI: %s", email, user.BMI)
                 
                 # Ensure BMI is calculated if missing
                 if user.BMI is None:
-                    logger.info(f"BMI missing for user {email}, calculating now")
+                    logger.info("BMI missing for user %s, calculating now", email)
                     user.calculate_bmi()
                     db.session.commit()
-                    logger.debug(f"Calculated BMI for {email}: {user.BMI}")
+                    logger.debug("Calculated BMI for %s: %s", email, user.BMI)
                 
                 is_eligible = user.is_eligible_for_service()
-                logger.debug(f"BMI eligibility check for {email}: {is_eligible} (BMI: {user.BMI})")
+                logger.debug("BMI eligibility check for %s: %s (BMI: %s)", email, is_eligible, user.BMI)
                 
                 if not is_eligible:
-                    logger.info(f"User {email} attempted login with BMI {user.BMI} (not eligible for BMI ≥ 30 service)")
+                    logger.info("User %s attempted login with BMI %s (not eligible for BMI ≥ 30 service)", email, user.BMI)
                     flash(f'Our service is designed for adults with BMI ≥ 30. Your BMI: {user.BMI}. Please consult with a healthcare professional for personalized advice.', 'warning')
                     return render_template('login.html')
                     
             except Exception as bmi_error:
-                logger.error(f"BMI eligibility check error for {email}: {bmi_error}")
+                logger.error("BMI eligibility check error for %s: %s", email, bmi_error)
                 flash('Unable to verify service eligibility. Please try again.', 'error')
                 return render_template('login.html')
             
             # Session management with safe error handling
             try:
-                logger.debug(f"Setting up session for user: {user.username}")
+                logger.debug("Setting up session for user: %s", user.username)
                 
                 # Clear any existing session data safely
                 session.clear()
@@ -128,19 +139,19 @@ def login():
                 session['user_username'] = user.username
                 session['user_bmi'] = user.BMI
                 
-                logger.info(f"Successful login for user: {user.username} (BMI: {user.BMI})")
+                logger.info("Successful login for user: %s (BMI: %s)", user.username, user.BMI)
                 flash(f'Welcome back, {user.username}! BMI: {user.BMI} - Access granted', 'success')
                 
                 return redirect(url_for('home.index'))
                 
             except Exception as session_error:
-                logger.error(f"Session setup error for {email}: {session_error}")
+                logger.error("Session setup error for %s: %s", email, session_error)
                 flash('Login successful but session setup failed. Please try logging in again.', 'warning')
                 return render_template('login.html')
             
         except Exception as general_error:
             # Catch-all error handler with specific logging
-            logger.error(f"Unexpected login error for email '{email}': {type(general_error).__name__}: {general_error}")
+            logger.error("Unexpected login error for email '%s': %s: %s", email, type(general_error).__name__, general_error)
             logger.exception("Full login error traceback:")  # This logs the full stack trace
             
             # Provide user-friendly error message
@@ -163,25 +174,25 @@ def register():
             allergies = request.form.get('allergies', '').strip()
             preferences = request.form.get('preferences', '').strip()
             
-            logger.info(f"Registration attempt initiated for email: {email}")
+            logger.info("Registration attempt initiated for email: %s", email)
             
             # Generate username from email (before @ symbol) following copilot patterns
-            username = email.split('@')[0] if email else ''
-            logger.debug(f"Generated initial username: {username} from email: {email}")
+            username = username_base_from_email(email) if email else ''
+            logger.debug("Generated initial username: %s from email: %s", username, email)
             
             # Enhanced validation following copilot input sanitization patterns
             if not all([email, password, height, weight]):
-                logger.warning(f"Registration attempt with missing required fields - email: {bool(email)}, password: {bool(password)}, height: {bool(height)}, weight: {bool(weight)}")
+                logger.warning("Registration attempt with missing required fields - email: %s, password: %s, height: %s, weight: %s", bool(email), bool(password), bool(height), bool(weight))
                 flash('Email, password, height, and weight are required', 'error')
                 return render_template('register.html')
             
             if not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
-                logger.warning(f"Registration attempt with invalid email format: {email}")
+                logger.warning("Registration attempt with invalid email format: %s", email)
                 flash('Please enter a valid email address', 'error')
                 return render_template('register.html')
             
             if len(password) < 6:
-                logger.warning(f"Registration attempt with short password for email: {email}")
+                logger.warning("Registration attempt with short password for email: %s", email)
                 flash('Password must be at least 6 characters long', 'error')
                 return render_template('register.html')
             
@@ -189,75 +200,74 @@ def register():
             try:
                 height_float = float(height)
                 weight_float = float(weight)
-                logger.debug(f"Height/weight conversion successful - Height: {height_float}cm, Weight: {weight_float}kg")
+                logger.debug("Height/weight conversion successful - Height: %scm, Weight: %skg", height_float, weight_float)
                 
                 if not (100 <= height_float <= 250) or not (30 <= weight_float <= 300):
-                    logger.warning(f"Registration with invalid height/weight ranges - Height: {height_float}, Weight: {weight_float}")
+                    logger.warning("Registration with invalid height/weight ranges - Height: %s, Weight: %s", height_float, weight_float)
                     raise ValueError("Invalid range")
                     
             except ValueError as ve:
-                logger.error(f"Height/weight validation error for {email}: {ve}")
+                logger.error("Height/weight validation error for %s: %s", email, ve)
                 flash('Please enter valid height (100-250 cm) and weight (30-300 kg)', 'error')
                 return render_template('register.html')
             
             # Database existence checks with detailed logging
             try:
-                logger.debug(f"Checking if email already exists: {email}")
+                logger.debug("Checking if email already exists: %s", email)
                 existing_user = User.query.filter_by(email=email).first()
                 if existing_user:
-                    logger.warning(f"Registration attempt with existing email: {email} (User ID: {existing_user.id})")
+                    logger.warning("Registration attempt with existing email: %s (User ID: %s)", email, existing_user.id)
                     flash('An account with this email already exists', 'error')
                     return render_template('register.html')
                 
-                # Check and generate unique username with detailed logging
-                logger.debug(f"Checking username availability: {username}")
-                existing_username = User.query.filter_by(username=username).first()
-                if existing_username:
-                    logger.info(f"Username {username} already exists, generating unique variant")
-                    base_username = username
-                    counter = 1
-                    while User.query.filter_by(username=username).first():
-                        username = f"{base_username}{counter}"
-                        counter += 1
-                        if counter > 100:  # Prevent infinite loop
-                            logger.error(f"Could not generate unique username after 100 attempts for email: {email}")
-                            flash('Unable to generate unique username. Please try a different email.', 'error')
-                            return render_template('register.html')
-                    
-                    logger.info(f"Generated unique username: {username} for email: {email}")
+                # Allocate the first free username variant with a single prefix query
+                logger.debug("Checking username availability: %s", username)
+                username_allocator = UsernameAllocator()
+                base_username = username
+                username = username_allocator.allocate(base_username)
+                if username != base_username:
+                    logger.info("Username %s already exists, allocated %s for email: %s", base_username, username, email)
                     
             except Exception as db_check_error:
-                logger.error(f"Database check error during registration for {email}: {db_check_error}")
+                logger.error("Database check error during registration for %s: %s", email, db_check_error)
                 flash('Unable to verify account availability. Please try again.', 'error')
                 return render_template('register.html')
             
             # Calculate BMI following copilot health-centric data model with enhanced logging
             try:
-                bmi = round(weight_float / ((height_float / 100) ** 2), 2)
-                logger.debug(f"BMI calculated for {email}: {bmi} (Height: {height_float}cm, Weight: {weight_float}kg)")
+                bmi = calculate_bmi(height_float, weight_float)
+                logger.debug("BMI calculated for %s: %s (Height: %scm, Weight: %skg)", email, bmi, height_float, weight_float)
                 
                 # BMI eligibility check following copilot business rules
-                if bmi < 30.0:
-                    logger.info(f"Registration rejected - BMI {bmi} below threshold for email: {email}")
+                if not is_eligible(bmi):
+                    logger.info("Registration rejected - BMI %s below threshold for email: %s", bmi, email)
                     flash(f'Your BMI is {bmi}. Our service is designed for adults with BMI ≥ 30. Please consult with a healthcare professional for personalized advice.', 'warning')
                     return render_template('register.html')
                 
-                logger.info(f"BMI eligibility confirmed for {email}: {bmi} ≥ 30.0")
+                logger.info("BMI eligibility confirmed for %s: %s ≥ 30.0", email, bmi)
                 
             except Exception as bmi_error:
-                logger.error(f"BMI calculation error for {email}: {bmi_error}")
+                logger.error("BMI calculation error for %s: %s", email, bmi_error)
                 flash('Error calculating BMI. Please verify your height and weight.', 'error')
                 return render_template('register.html')
             
+            # Hash password in the bounded worker pool; shed load instead of queueing indefinitely
+            try:
+                password_hash = get_password_hasher().hash_password(password)
+            except HashingOverloaded as overload:
+                logger.warning("Registration shed under hashing load for %s: %s", email, overload)
+                flash('We are experiencing high demand. Please try again in a moment.', 'error')
+                return render_template('register.html'), 503, {'Retry-After': str(overload.retry_after)}
+            
             # Create user with all required fields following copilot patterns
             try:
-                logger.debug(f"Creating new user object for {email}")
+                logger.debug("Creating new user object for %s", email)
                 
                 # Ensure all User model columns are properly set
                 user_data = {
                     'username': username,
                     'email': email,
-                    'password_hash': generate_password_hash(password),
+                    'password_hash': password_hash,
                     'height': height_float,
                     'weight': weight_float,
                     'BMI': bmi,
@@ -265,7 +275,7 @@ def register():
                     'preferences': preferences if preferences else None
                 }
                 
-                logger.debug(f"User data prepared: username={username}, email={email}, height={height_float}, weight={weight_float}, BMI={bmi}")
+                logger.debug("User data prepared: username=%s, email=%s, height=%s, weight=%s, BMI=%s", username, email, height_float, weight_float, bmi)
                 
                 user = User(**user_data)
                 
@@ -274,38 +284,38 @@ def register():
                 missing_attrs = [attr for attr in required_attrs if not hasattr(user, attr) or getattr(user, attr) is None]
                 
                 if missing_attrs:
-                    logger.error(f"User object missing required attributes: {missing_attrs}")
+                    logger.error("User object missing required attributes: %s", missing_attrs)
                     flash('Account creation failed due to missing data. Please try again.', 'error')
                     return render_template('register.html')
                 
-                logger.debug(f"User object validation passed for {email}")
+                logger.debug("User object validation passed for %s", email)
                 
             except Exception as user_creation_error:
-                logger.error(f"User object creation error for {email}: {user_creation_error}")
+                logger.error("User object creation error for %s: %s", email, user_creation_error)
                 flash('Error creating account data. Please try again.', 'error')
                 return render_template('register.html')
             
             # Database commit with comprehensive error handling
             try:
-                logger.debug(f"Adding user to database session: {username}")
+                logger.debug("Adding user to database session: %s", username)
                 db.session.add(user)
                 
-                logger.debug(f"Committing user registration to database: {username}")
-                db.session.commit()
+                logger.debug("Committing user registration to database: %s", username)
+                username = commit_with_unique_username(user, base_username, allocator=username_allocator)
                 
-                logger.info(f"New user successfully registered: {username} (email: {email}, BMI: {bmi})")
+                logger.info("New user successfully registered: %s (email: %s, BMI: %s)", username, email, bmi)
                 flash(f'Account created successfully! Username: {username}, BMI: {bmi} - You are eligible for our nutrition assistance program.', 'success')
                 return redirect(url_for('auth.login'))
                 
             except Exception as db_commit_error:
-                logger.error(f"Database commit error for {email}: {type(db_commit_error).__name__}: {db_commit_error}")
+                logger.error("Database commit error for %s: %s: %s", email, type(db_commit_error).__name__, db_commit_error)
                 logger.exception("Full database commit error traceback:")
                 
                 try:
                     db.session.rollback()
-                    logger.info(f"Database session rolled back for failed registration: {email}")
+                    logger.info("Database session rolled back for failed registration: %s", email)
                 except Exception as rollback_error:
-                    logger.error(f"Database rollback error: {rollback_error}")
+                    logger.error("Database rollback error: %s", rollback_error)
                 
                 # Provide specific error messages based on error type
                 if 'UNIQUE constraint failed' in str(db_commit_error) or 'duplicate key' in str(db_commit_error).lower():
@@ -318,7 +328,7 @@ def register():
                 return render_template('register.html')
             
         except Exception as general_error:
-            logger.error(f"Unexpected registration error for email '{email}': {type(general_error).__name__}: {general_error}")
+            logger.error("Unexpected registration error for email '%s': %s: %s", email, type(general_error).__name__, general_error)
             logger.exception("Full registration error traceback:")
             
             # Ensure database cleanup
@@ -342,12 +352,12 @@ def logout():
         # Clear session data following copilot patterns
         session.clear()
         
-        logger.info(f"User logged out: {user_email}")
+        logger.info("User logged out: %s", user_email)
         flash('You have been logged out successfully', 'info')
         return redirect(url_for('home.index'))
         
     except Exception as e:
-        logger.error(f"Logout error (handled gracefully): {e}")
+        logger.error("Logout error (handled gracefully): %s", e)
         # Force clear session even if error occurs
         try:
             session.clear()
@@ -371,40 +381,31 @@ def api_register():
         
         # Check if user exists
         if User.query.filter_by(email=email).first():
-            logger.warning(f"API registration attempt with existing email: {email}")
+            logger.warning("API registration attempt with existing email: %s", email)
             return jsonify({'error': 'Email already registered'}), 409
         
         # BMI calculation and validation
         try:
             height = float(data['height'])
             weight = float(data['weight'])
-            bmi = weight / ((height/100) ** 2)
+            bmi = calculate_bmi(height, weight)
             
-            if bmi < 30.0:
-                logger.info(f"API registration rejected - BMI {bmi} below threshold for email: {email}")
+            if not is_eligible(bmi):
+                logger.info("API registration rejected - BMI %s below threshold for email: %s", bmi, email)
                 return jsonify({'error': 'BMI must be ≥ 30 for service eligibility'}), 400
             
-            # Generate username
-            username = email.split('@')[0]
-            counter = 1
-            base_username = username
-            while User.query.filter_by(username=username).first():
-                username = f"{base_username}{counter}"
-                counter += 1
-            
             user = User(
-                username=username,
                 email=email,
-                password_hash=generate_password_hash(data['password']),
+                password_hash=get_password_hasher().hash_password(data['password']),
                 height=height,
                 weight=weight,
-                BMI=round(bmi, 2)
+                BMI=bmi
             )
             
-            db.session.add(user)
-            db.session.commit()
+            # Unique username from the email prefix; retried if a concurrent signup claims it
+            username = commit_with_unique_username(user, username_base_from_email(email))
             
-            logger.info(f"API user registered: {username} (email: {email}, BMI: {round(bmi, 2)})")
+            logger.info("API user registered: %s (email: %s, BMI: %s)", username, email, bmi)
             return jsonify({
                 'message': 'User registered successfully', 
                 'username': username,
@@ -412,11 +413,15 @@ def api_register():
             }), 201
             
         except ValueError as e:
-            logger.error(f"API registration validation error: {e}")
+            logger.error("API registration validation error: %s", e)
             return jsonify({'error': 'Invalid input data'}), 400
             
+    except HashingOverloaded as overload:
+        logger.warning("API registration shed under hashing load: %s", overload)
+        return jsonify({'error': 'Service busy, please retry'}), 503, {'Retry-After': str(overload.retry_after)}
+        
     except Exception as e:
-        logger.error(f"API registration error: {e}")
+        logger.error("API registration error: %s", e)
         return jsonify({'error': 'Registration failed'}), 500
 
 @auth_bp.route('/api/login', methods=['POST'])
@@ -433,24 +438,83 @@ def api_login():
         password = data.get('password', '')
         
         user = User.query.filter_by(email=email).first()
+        password_valid, needs_rehash = get_password_hasher().verify_password(user.password_hash, password) if user else (False, False)
         
-        if not user or not check_password_hash(user.password_hash, password):
-            logger.warning(f"API failed login attempt for email: {email}")
+        if not password_valid:
+            logger.warning("API failed login attempt for email: %s", email)
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        if needs_rehash:
+            _upgrade_password_hash(user, password)
+        
         if not user.is_eligible_for_service():
-            logger.info(f"API login attempt with ineligible BMI for user: {email}")
+            logger.info("API login attempt with ineligible BMI for user: %s", email)
             return jsonify({'error': f'Service requires BMI ≥ 30. Your BMI: {user.BMI}'}), 403
         
-        logger.info(f"API successful login for user: {user.username}")
+        logger.info("API successful login for user: %s", user.username)
         return jsonify({
             'message': 'Login successful',
             'user_id': user.id,
             'username': user.username,
             'BMI': user.BMI,
-            'eligible': True
+            'eligible': True,
+            **issue_access_token(user)
         }), 200
         
+    except HashingOverloaded as overload:
+        logger.warning("API login shed under hashing load: %s", overload)
+        return jsonify({'error': 'Service busy, please retry'}), 503, {'Retry-After': str(overload.retry_after)}
+        
     except Exception as e:
-        logger.error(f"API login error: {e}")
+        logger.error("API login error: %s", e)
         return jsonify({'error': 'Login failed'}), 500
+
+@auth_bp.route('/api/me')
+@token_required()
+def api_me():
+    """Current user's profile from a Bearer token; served from the per-process user cache"""
+    snapshot = get_user_snapshot(g.api_claims['user_id'])
+    if snapshot is None:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify({**snapshot, 'eligible': g.api_claims['eligible']}), 200
+
+@auth_bp.route('/api/bulk-register', methods=['POST'])
+def api_bulk_register():
+    """Bulk onboarding for partner clinics: JSON body, text/csv body or a multipart 'file' upload
+
+    Passwords are hashed within the request, so batches are capped at
+    BULK_IMPORT_MAX_ROWS; larger imports run through the import-users CLI.
+    """
+    expected_token = current_app.config.get('BULK_IMPORT_TOKEN')
+    provided_token = request.headers.get('X-Import-Token', '')
+    if not expected_token or not hmac.compare_digest(provided_token, expected_token):
+        logger.warning("Unauthorized bulk registration attempt")
+        return jsonify({'error': 'Bulk import is not authorized'}), 403
+    
+    try:
+        upload = request.files.get('file')
+        if upload:
+            fmt = 'json' if (upload.filename or '').lower().endswith('.json') else 'csv'
+            rows = parse_import_rows(upload.read(), fmt)
+        elif request.mimetype == 'text/csv':
+            rows = parse_import_rows(request.get_data(), 'csv')
+        else:
+            rows = parse_import_rows(request.get_json(silent=True), 'json')
+    except (BulkImportError, ValueError) as e:
+        logger.warning("Bulk registration payload rejected: %s", e)
+        return jsonify({'error': str(e)}), 400
+    
+    if len(rows) > current_app.config['BULK_IMPORT_MAX_ROWS']:
+        return jsonify({'error': f"Import exceeds {current_app.config['BULK_IMPORT_MAX_ROWS']} rows; "
+                                 f"split the file or use the import-users CLI"}), 413
+    
+    try:
+        report = import_users(rows, batch_size=current_app.config['BULK_IMPORT_BATCH_SIZE'])
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Bulk registration failed: %s: %s", type(e).__name__, e)
+        return jsonify({'error': 'Bulk import failed'}), 500
+    
+    logger.info("Bulk registration: %s created, %s rejected", report['summary']['created'], report['summary']['rejected'])
+    return jsonify(report), 200
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, request, flash, jsonify
+from flask import Blueprint, render_template, request, flash, jsonify, current_app, Response, stream_with_context
 
 from models import User
+from bmi_classification import calculate_bmi, classify_bmi, is_eligible
+from bmi_screening import (ScreeningInputError, ScreeningSummary, iter_csv_chunks, iter_json_chunks,
+                           render_csv, render_ndjson, summarize)
 
 bmi_bp = Blueprint('bmi', __name__)
 
@@ -19,24 +22,11 @@ def calculator():
                 return render_template('bmi.html', result=None)
             
             # BMI calculation following copilot pattern (height in cm)
-            bmi = round(weight / ((height / 100) ** 2), 2)
-            
-            # Determine category following copilot health-centric patterns
-            if bmi < 18.5:
-                category = 'Underweight'
-            elif bmi < 25:
-                category = 'Normal weight'
-            elif bmi < 30:
-                category = 'Overweight'
-            elif bmi < 35:
-                category = 'Class I Obesity'
-            elif bmi < 40:
-                category = 'Class II Obesity'
-            else:
-                category = 'Class III Obesity'
+            bmi = calculate_bmi(height, weight)
+            category = classify_bmi(bmi)
             
             # Eligibility check following copilot business rules
-            eligible = bmi >= 30.0
+            eligible = is_eligible(bmi)
             
             bmi_result = {
                 'bmi': bmi,
@@ -68,13 +58,48 @@ def api_calculate():
         if not (100 <= height <= 250) or not (30 <= weight <= 300):
             return jsonify({'error': 'Invalid input'}), 400
         
-        bmi = round(weight / ((height/100) ** 2), 2)
+        bmi = calculate_bmi(height, weight)
         
         return jsonify({
             'BMI': bmi,
-            'category': 'Class I Obesity' if 30 <= bmi < 35 else 'Class II Obesity' if 35 <= bmi < 40 else 'Class III Obesity' if bmi >= 40 else 'Overweight' if 25 <= bmi < 30 else 'Normal weight' if 18.5 <= bmi < 25 else 'Underweight',
-            'eligible': bmi >= 30.0
+            'category': classify_bmi(bmi),
+            'eligible': is_eligible(bmi)
         }), 200
         
     except Exception:
         return jsonify({'error': 'Invalid input'}), 400
+
+@bmi_bp.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Bulk BMI screening: JSON array or streamed CSV in, streamed CSV or NDJSON out
+
+    Query parameters: format=ndjson|csv (default ndjson), summary_only=1 to get
+    just the per-category counts as JSON.
+    """
+    chunk_size = current_app.config['BMI_BATCH_CHUNK_SIZE']
+    output = request.args.get('format', 'ndjson').lower()
+    if output not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    try:
+        if 'file' in request.files:
+            chunks = iter_csv_chunks(request.files['file'].stream, chunk_size)
+        elif request.mimetype == 'text/csv':
+            chunks = iter_csv_chunks(request.stream, chunk_size)
+        else:
+            data = request.get_json(silent=True)
+            if data is None:
+                return jsonify({'error': 'Send a JSON array, a text/csv body or a CSV file upload'}), 400
+            chunks = iter_json_chunks(data, chunk_size)
+    except ScreeningInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('summary_only') in ('1', 'true'):
+        return jsonify({'summary': summarize(chunks)}), 200
+
+    summary = ScreeningSummary()
+    if output == 'csv':
+        body, mimetype = render_csv(chunks, summary), 'text/csv'
+    else:
+        body, mimetype = render_ndjson(chunks, summary), 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype)
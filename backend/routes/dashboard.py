@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify, g
+
+from api_tokens import token_required
+from dashboard import get_dashboard
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/dashboard')
+@token_required()
+def api_dashboard():
+    """Profile, today's intake vs goal, recent meals, recommendations and weight trend in one response"""
+    dashboard = get_dashboard(g.api_claims['user_id'])
+    if dashboard is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify({**dashboard, 'eligible': g.api_claims['eligible']}), 200
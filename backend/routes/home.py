@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template
-from models import db, User, Meal
+from site_stats import get_site_stats
 
 home_bp = Blueprint('home', __name__)
 
@@ -7,18 +7,12 @@ home_bp = Blueprint('home', __name__)
 def index():
     """Home page following copilot health-centric patterns"""
     try:
-        # Get stats for dashboard following copilot business rules
-        total_users = User.query.count()
-        eligible_users = User.query.filter(User.BMI >= 30.0).count()
-        total_meals = Meal.query.count()
-        
-        stats = {
-            'total_users': total_users,
-            'eligible_users': eligible_users,
-            'total_meals': total_meals,
+        # Denormalized counters: one primary-key read instead of three COUNT queries
+        stats = get_site_stats()
+        stats.update({
             'qa_score': 92,
             'test_coverage': 90
-        }
+        })
         
         return render_template('index.html', stats=stats)
     except Exception as e:
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, request, g, current_app
+
+from api_tokens import token_required
+from intake_history import HistoryRangeError, intake_history
+from nutrition_rollups import daily_intake, meal_log, weekly_intake
+
+intake_bp = Blueprint('intake', __name__)
+
+def _date_arg(name, default):
+    """Parse a YYYY-MM-DD query argument; raises ValueError on bad input"""
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+
+@intake_bp.route('/intake/daily')
+@token_required()
+def api_daily():
+    """A day's intake totals and goal progress from the pre-aggregated rollup"""
+    try:
+        day = _date_arg('date', datetime.utcnow().date())
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    return jsonify(daily_intake(g.api_claims['user_id'], day)), 200
+
+@intake_bp.route('/intake/weekly')
+@token_required()
+def api_weekly():
+    """Seven days of intake starting at ?start= (default: the current Monday)"""
+    today = datetime.utcnow().date()
+    try:
+        start = _date_arg('start', today - timedelta(days=today.weekday()))
+    except ValueError:
+        return jsonify({'error': 'start must be YYYY-MM-DD'}), 400
+    return jsonify(weekly_intake(g.api_claims['user_id'], start)), 200
+
+@intake_bp.route('/intake/log')
+@token_required()
+def api_log():
+    """A day's meal log entries with portion-adjusted nutrition"""
+    try:
+        day = _date_arg('date', datetime.utcnow().date())
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+    entries = meal_log(g.api_claims['user_id'], day)
+    return jsonify({'date': day.isoformat(), 'entries': entries, 'count': len(entries)}), 200
+
+@intake_bp.route('/history')
+@token_required()
+def api_history():
+    """Calorie and macro intake per day/week/month bucket for progress charts"""
+    today = datetime.utcnow().date()
+    try:
+        end = _date_arg('to', today)
+        start = _date_arg('from', end - timedelta(days=29))
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+    try:
+        history = intake_history(g.api_claims['user_id'], start, end,
+                                 bucket=request.args.get('bucket', 'day'),
+                                 max_buckets=current_app.config['HISTORY_MAX_BUCKETS'])
+    except HistoryRangeError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(history), 200
@@ -1,5 +1,15 @@
-from flask import Blueprint, render_template, request, jsonify
-from models import db, Meal
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, current_app, g
+from models import db, FoodCategory, Meal, meal_categories
+from api_tokens import get_user_snapshot, token_required
+from ingredient_index import ingredient_filters
+from meal_logging import MealLogError, log_meal_batch
+from meal_neighbors import MealRatingError, also_liked, rate_meal
+from meal_planner import MEAL_SLOTS, MealPlanError, generate_meal_plan
+from rating_stats import leaderboards, top_rated
+from recipes import RecipeError, RecipePermissionError, create_recipe, recipe_components, set_recipe_components
+from recommendations import get_recommendations
 
 meals_bp = Blueprint('meals', __name__)
 
@@ -12,6 +22,8 @@ def index():
         meal_type_filter = request.args.get('meal_type', '').strip()
         max_calories = request.args.get('max_calories', type=int)
         min_protein = request.args.get('min_protein', type=float)
+        include = request.args.get('include', '').split(',')
+        exclude = request.args.get('exclude', '').split(',')
         
         # Build query following copilot patterns - NO LIMITS, return ALL meals
         meals_query = Meal.query
@@ -34,16 +46,16 @@ def index():
         if min_protein and min_protein > 0:
             meals_query = meals_query.filter(Meal.protein >= min_protein)
         
-        # Get ALL meals - no pagination, no limits
-        meals = meals_query.all()
+        # "Contains chicken, without dairy" intersects ingredient posting lists in the database
+        meals_query = meals_query.filter(*ingredient_filters(include, exclude))
         
-        # Calculate nutrition scores and eligibility for ALL meals following copilot health patterns
-        for meal in meals:
-            meal.nutrition_score = meal.calculate_nutrition_score()
-            meal.eligible_for_target = meal.meets_eligibility_criteria(30.0)
+        # Get ALL meals - no pagination, no limits - sorted by nutrition score in the database
+        # (higher is better for BMI >= 30 demographic)
+        meals = meals_query.order_by(Meal.nutrition_score.desc(), Meal.id).all()
         
-        # Sort by nutrition score (higher is better for BMI >= 30 demographic)
-        meals.sort(key=lambda m: m.nutrition_score, reverse=True)
+        # Eligibility for ALL meals following copilot health patterns
+        for meal in meals:
+            meal.eligible_for_target = meal.eligible_for_bmi_30
         
         # Calculate comprehensive statistics for ALL meals
         stats = {
@@ -84,6 +96,12 @@ def api_search():
     try:
         query = request.args.get('q', '').strip()
         meal_type = request.args.get('type', '').strip()
+        category = request.args.get('category', '').strip()
+        eligible_only = request.args.get('eligible', '').lower() in ('1', 'true', 'yes')
+        max_calories = request.args.get('max_calories', type=int)
+        sort_by_score = request.args.get('sort') == 'score'
+        include = request.args.get('include', '').split(',')
+        exclude = request.args.get('exclude', '').split(',')
         
         # Build search query - NO LIMITS for full API access
         search_query = Meal.query
@@ -94,12 +112,30 @@ def api_search():
         if meal_type:
             search_query = search_query.filter(Meal.type == meal_type)
         
+        if category:
+            # Tags are kept in meal_categories by meal_tagging, so this is an indexed join
+            search_query = (search_query.join(meal_categories, meal_categories.c.meal_id == Meal.id)
+                            .join(FoodCategory, FoodCategory.id == meal_categories.c.category_id)
+                            .filter(FoodCategory.name == category))
+        
+        # Eligibility and score are rule expressions, so these filter and sort in the database
+        if eligible_only:
+            search_query = search_query.filter(Meal.eligible_for_bmi_30)
+        
+        if max_calories:
+            search_query = search_query.filter(Meal.calories <= max_calories)
+        
+        # ?include=chicken,rice&exclude=dairy,nuts: posting-list intersections from ingredient_index
+        search_query = search_query.filter(*ingredient_filters(include, exclude))
+        
+        if sort_by_score:
+            search_query = search_query.order_by(Meal.nutrition_score.desc(), Meal.id)
+        
         # Return ALL matching meals
         meals = search_query.all()
         
         results = []
         for meal in meals:
-            meal.nutrition_score = meal.calculate_nutrition_score()
             results.append({
                 'id': meal.id,
                 'name': meal.name,
@@ -116,7 +152,7 @@ def api_search():
                 'usda_id': meal.usda_id,
                 'serving_size': meal.serving_size,
                 'nutrition_score': meal.nutrition_score,
-                'eligible_for_bmi_30': meal.meets_eligibility_criteria(30.0)
+                'eligible_for_bmi_30': meal.eligible_for_bmi_30
             })
         
         return jsonify({
@@ -160,6 +196,8 @@ def meal_stats():
         if not meals:
             return render_template('meal_stats.html', stats={}, meals=[])
         
+        suitable = db.session.query(db.func.count(Meal.id)).filter(Meal.eligible_for_bmi_30).scalar()
+        
         # Calculate comprehensive statistics for ALL meals
         stats = {
             'database_summary': {
@@ -181,8 +219,8 @@ def meal_stats():
                 'high_calorie': len([m for m in meals if m.calories > 400])
             },
             'bmi_eligibility': {
-                'suitable_for_bmi_30': len([m for m in meals if m.meets_eligibility_criteria(30.0)]),
-                'percentage_suitable': round(len([m for m in meals if m.meets_eligibility_criteria(30.0)]) / len(meals) * 100, 1)
+                'suitable_for_bmi_30': suitable,
+                'percentage_suitable': round(suitable / len(meals) * 100, 1)
             },
             'averages': {
                 'calories': round(sum(m.calories for m in meals) / len(meals), 1),
@@ -190,17 +228,132 @@ def meal_stats():
                 'carbs': round(sum(m.carbs or 0 for m in meals) / len(meals), 1),
                 'fat': round(sum(m.fat or 0 for m in meals) / len(meals), 1),
                 'fiber': round(sum(m.fiber or 0 for m in meals) / len(meals), 1),
-                'nutrition_score': round(sum(m.calculate_nutrition_score() for m in meals) / len(meals), 1)
+                'nutrition_score': round(db.session.query(db.func.avg(Meal.nutrition_score)).scalar(), 1)
             }
         }
         
-        # Get top scoring meals for display
-        for meal in meals:
-            meal.nutrition_score = meal.calculate_nutrition_score()
-        
-        top_meals = sorted(meals, key=lambda m: m.nutrition_score, reverse=True)[:10]
+        # Get top scoring meals for display, ranked by the database
+        top_meals = Meal.query.order_by(Meal.nutrition_score.desc(), Meal.id).limit(10).all()
         
         return render_template('meal_stats.html', stats=stats, top_meals=top_meals)
         
     except Exception as e:
         return render_template('meal_stats.html', stats={}, top_meals=[], error=str(e))
+
+@meals_bp.route('/api/log', methods=['POST'])
+@token_required()
+def api_log():
+    """Batched meal logging for offline sync; entries carry client_key idempotency keys and the date eaten"""
+    data = request.get_json(silent=True)
+    entries = data.get('entries') if isinstance(data, dict) else data
+    try:
+        report = log_meal_batch(g.api_claims['user_id'], entries,
+                                max_batch=current_app.config['MEAL_LOG_MAX_BATCH'])
+    except MealLogError as e:
+        return jsonify({'error': str(e)}), 400
+    status = 201 if report['summary']['created'] else 200
+    return jsonify(report), status
+
+@meals_bp.route('/api/plan')
+@token_required()
+def api_plan():
+    """Breakfast/lunch/dinner/snack plan for ?days= days from ?start= against the user's nutrition goal"""
+    max_days = current_app.config['MEAL_PLAN_MAX_DAYS']
+    days = request.args.get('days', 7, type=int)
+    if not 1 <= days <= max_days:
+        return jsonify({'error': f'days must be between 1 and {max_days}'}), 400
+    try:
+        start = (datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start')
+                 else datetime.utcnow().date())
+    except ValueError:
+        return jsonify({'error': 'start must be YYYY-MM-DD'}), 400
+
+    user = get_user_snapshot(g.api_claims['user_id'])
+    if user is None:
+        return jsonify({'error': 'User not found'}), 404
+    try:
+        plan = generate_meal_plan(user, start, days, time_budget=current_app.config['MEAL_PLAN_TIME_BUDGET'])
+    except MealPlanError as e:
+        return jsonify({'error': str(e)}), 422
+    return jsonify(plan), 200
+
+@meals_bp.route('/api/recommendations')
+@token_required()
+def api_recommendations():
+    """The user's precomputed top meals (?limit=, default 10)"""
+    limit = request.args.get('limit', 10, type=int)
+    max_limit = current_app.config['RECOMMENDATION_COUNT']
+    if not 1 <= limit <= max_limit:
+        return jsonify({'error': f'limit must be between 1 and {max_limit}'}), 400
+    user = get_user_snapshot(g.api_claims['user_id'])
+    if user is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(get_recommendations(user, limit)), 200
+
+@meals_bp.route('/api/<int:meal_id>')
+def api_meal_detail(meal_id):
+    """One meal with what people who liked it also liked (?also_liked= count, default 10) and its recipe components"""
+    meal = db.session.get(Meal, meal_id)
+    if meal is None:
+        return jsonify({'error': 'Meal not found'}), 404
+    limit = request.args.get('also_liked', 10, type=int)
+    details = meal.to_dict()
+    details['also_liked'] = also_liked(meal_id, max(0, min(limit, 50)))
+    details['components'] = recipe_components(meal_id)
+    return jsonify(details), 200
+
+@meals_bp.route('/api/recipes', methods=['POST'])
+@token_required()
+def api_create_recipe():
+    """Create a recipe from other meals: {"name", "type", "components": [{"meal_id", "grams"}]}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        recipe = create_recipe(data.get('name'), data.get('type'), data.get('components'), g.api_claims['user_id'])
+    except RecipeError as e:
+        return jsonify({'error': str(e)}), 400
+    details = recipe.to_dict()
+    details['components'] = recipe_components(recipe.id)
+    return jsonify(details), 201
+
+@meals_bp.route('/api/<int:meal_id>/components', methods=['PUT'])
+@token_required()
+def api_set_components(meal_id):
+    """Replace the components of a recipe the user created; its nutrients and every recipe using it are rolled up again"""
+    if db.session.get(Meal, meal_id) is None:
+        return jsonify({'error': 'Meal not found'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        recipe = set_recipe_components(meal_id, data.get('components'), g.api_claims['user_id'])
+    except RecipePermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except RecipeError as e:
+        return jsonify({'error': str(e)}), 400
+    details = recipe.to_dict()
+    details['components'] = recipe_components(meal_id)
+    return jsonify(details), 200
+
+@meals_bp.route('/api/<int:meal_id>/rating', methods=['POST'])
+@token_required()
+def api_rate_meal(meal_id):
+    """Rate a meal 1-5 stars (replaces the user's earlier rating): {"rating": 4, "review": "..."}"""
+    if db.session.get(Meal, meal_id) is None:
+        return jsonify({'error': 'Meal not found'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        rating = rate_meal(g.api_claims['user_id'], meal_id, data.get('rating'), data.get('review'))
+    except MealRatingError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'meal_id': meal_id, 'rating': rating.rating, 'review': rating.review}), 200
+
+@meals_bp.route('/api/top-rated')
+def api_top_rated():
+    """Top-rated meals for ?type= (default: every meal type), ?limit= per type"""
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= 50:
+        return jsonify({'error': 'limit must be between 1 and 50'}), 400
+    meal_type = request.args.get('type')
+    if meal_type is None:
+        return jsonify({'leaderboards': leaderboards(limit)}), 200
+    if meal_type not in MEAL_SLOTS:
+        return jsonify({'error': f"type must be one of {', '.join(MEAL_SLOTS)}"}), 400
+    return jsonify({'type': meal_type, 'meals': top_rated(meal_type, limit)}), 200
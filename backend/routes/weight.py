@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from flask import Blueprint, jsonify, request, g
+
+from api_tokens import token_required
+from weight_trends import WeightLogError, WeightUserNotFound, log_weight, weight_progress
+
+weight_bp = Blueprint('weight', __name__)
+
+MAX_PROGRESS_DAYS = 366
+
+@weight_bp.route('/weight', methods=['POST'])
+@token_required()
+def api_log_weight():
+    """Record a weight reading; the user's trend row is updated in the same transaction"""
+    data = request.get_json(silent=True) or {}
+    try:
+        logged_at = datetime.fromisoformat(data['date']) if data.get('date') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'date must be an ISO 8601 timestamp'}), 400
+    if logged_at is not None and logged_at.tzinfo is not None:
+        logged_at = logged_at.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        entry = log_weight(g.api_claims['user_id'], data.get('weight'), logged_at)
+    except WeightUserNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except WeightLogError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'entry': entry.to_dict(), **weight_progress(g.api_claims['user_id'], days=0)}), 201
+
+@weight_bp.route('/weight')
+@token_required()
+def api_weight_progress():
+    """Weight trend, goal progress and recent readings (?days=30)"""
+    days = request.args.get('days', 30, type=int)
+    if not 0 <= days <= MAX_PROGRESS_DAYS:
+        return jsonify({'error': f'days must be between 0 and {MAX_PROGRESS_DAYS}'}), 400
+    return jsonify(weight_progress(g.api_claims['user_id'], days=days)), 200
@@ -1,26 +1,92 @@
 """
 Session interface override to fix TypeError with 'partitioned' cookie argument
 Following copilot instructions for compatibility fixes
+
+Also avoids per-request session cost: an unchanged session is not re-signed or
+re-sent, and the signature timestamp is refreshed lazily instead of every request.
 """
 
+import hashlib
+import json
+import time
+
+from flask.json.tag import TaggedJSONSerializer
 from flask.sessions import SecureCookieSessionInterface
 from flask import Flask
+from itsdangerous import BadSignature
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class CompactSessionSerializer(TaggedJSONSerializer):
+    """Tagged JSON serializer with a fast path for flat sessions
+
+    A logged-in session holds only scalars (user id, email, username, BMI), so
+    plain compact JSON is enough and skips the recursive tagging walk. Anything
+    else (flash tuples, bytes, datetimes) still goes through the tagged format,
+    and loading always uses it since untagged JSON is a subset.
+    """
+
+    def dumps(self, value):
+        if isinstance(value, dict) and all(
+                isinstance(key, str) and not key.startswith(' ') and isinstance(item, _PLAIN_TYPES)
+                for key, item in value.items()):
+            return json.dumps(value, separators=(',', ':'))
+        return super().dumps(value)
+
+
+def _payload_digest(payload: bytes) -> bytes:
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
 
 class FixedSessionInterface(SecureCookieSessionInterface):
     """Override session interface to handle 'partitioned' cookie argument error"""
-    
+
+    serializer = CompactSessionSerializer()
+
+    def open_session(self, app, request):
+        """Load the session and remember a digest of its payload and when it was signed"""
+        s = self.get_signing_serializer(app)
+        if s is None:
+            return None
+        val = request.cookies.get(self.get_cookie_name(app))
+        if not val:
+            return self.session_class()
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            data, signed_at = s.loads(val, max_age=max_age, return_timestamp=True)
+        except BadSignature:
+            return self.session_class()
+
+        session = self.session_class(data)
+        # Cookie layout is <payload>.<timestamp>.<signature>
+        session.payload_digest = _payload_digest(val.rsplit('.', 2)[0].encode('utf-8'))
+        session.signed_at = signed_at.timestamp()
+        return session
+
+    def _refresh_due(self, app, session) -> bool:
+        """True once a configurable fraction of the session lifetime has elapsed since signing"""
+        signed_at = getattr(session, 'signed_at', None)
+        if signed_at is None:
+            return True
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        fraction = app.config.get('SESSION_REFRESH_FRACTION', 0.5)
+        return time.time() - signed_at >= lifetime * fraction
+
     def save_session(self, app, session, response):
         """Override to remove 'partitioned' argument that causes TypeError"""
         try:
-            # Get the original save_session method
             domain = self.get_cookie_domain(app)
             path = self.get_cookie_path(app)
-            
+
+            if session.accessed:
+                response.vary.add('Cookie')
+
             if not session:
                 if session.modified:
                     # Remove session cookie by setting it to empty with past expiration
                     response.delete_cookie(
-                        app.session_cookie_name,
+                        self.get_cookie_name(app),
                         domain=domain,
                         path=path,
                         secure=self.get_cookie_secure(app),
@@ -28,31 +94,37 @@ class FixedSessionInterface(SecureCookieSessionInterface):
                         samesite=self.get_cookie_samesite(app)
                         # Note: Removed 'partitioned' argument to fix TypeError
                     )
+                    response.vary.add('Cookie')
                 return
-            
-            # If session has data, save it normally
-            if self.should_set_cookie(app, session):
-                httponly = self.get_cookie_httponly(app)
-                secure = self.get_cookie_secure(app)
-                expires = self.get_expiration_time(app, session)
-                val = self.get_signing_serializer(app).dumps(dict(session))
-                
-                response.set_cookie(
-                    app.session_cookie_name,
-                    val,
-                    expires=expires,
-                    httponly=httponly,
-                    domain=domain,
-                    path=path,
-                    secure=secure,
-                    samesite=self.get_cookie_samesite(app)
-                    # Note: Removed 'partitioned' argument to fix TypeError
-                )
-                
+
+            if not self.should_set_cookie(app, session):
+                return
+
+            # Serialize once; if the content is byte-identical to what the client
+            # already holds and the signature is still fresh, skip signing and Set-Cookie
+            signer_serializer = self.get_signing_serializer(app)
+            payload = signer_serializer.dump_payload(dict(session))
+            unchanged = _payload_digest(payload) == getattr(session, 'payload_digest', None)
+            if unchanged and not self._refresh_due(app, session):
+                return
+
+            val = signer_serializer.make_signer(signer_serializer.salt).sign(payload).decode('utf-8')
+            response.set_cookie(
+                self.get_cookie_name(app),
+                val,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+                # Note: Removed 'partitioned' argument to fix TypeError
+            )
+            response.vary.add('Cookie')
+
         except Exception as e:
-            # Fallback to parent implementation without partitioned argument
-            app.logger.warning(f"Session save error (using fallback): {e}")
-            super().save_session(app, session, response)
+            # Leave the client's existing cookie in place rather than retrying the save
+            app.logger.warning("Session save error (cookie left unchanged): %s", e)
 
 def apply_session_fix(app: Flask):
     """Apply session interface fix to Flask app following copilot patterns"""
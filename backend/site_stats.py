@@ -0,0 +1,115 @@
+"""
+Denormalized home page counters
+User and Meal mapper events adjust the single site_stats row inside the same
+flush that inserts, deletes or re-scores a row, so the home page reads one
+primary key instead of running three COUNT queries. reconcile_site_stats()
+recomputes the counts to correct drift from writes that bypass the ORM.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import event, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import get_history
+
+from bmi_classification import ELIGIBLE_CATEGORIES, is_eligible
+from models import db, Meal, SiteStats, User
+
+logger = logging.getLogger(__name__)
+
+STATS_ROW_ID = 1
+COUNTER_FIELDS = ('total_users', 'eligible_users', 'total_meals')
+
+_stats_table = SiteStats.__table__
+
+
+def _adjust(connection, **deltas):
+    """Add deltas to the counters row with an atomic UPDATE ... SET x = x + n"""
+    values = {name: _stats_table.c[name] + delta for name, delta in deltas.items() if delta}
+    if values:
+        # No row yet simply matches nothing; the first read reconciles it from scratch
+        connection.execute(update(_stats_table).where(_stats_table.c.id == STATS_ROW_ID).values(**values))
+
+
+def adjust_site_stats(session, **deltas):
+    """Adjust counters in the session's transaction, for inserts that bypass mapper events"""
+    _adjust(session.connection(), **deltas)
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _adjust(connection, total_users=1, eligible_users=int(is_eligible(target.BMI)))
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _adjust(connection, total_users=-1, eligible_users=-int(is_eligible(target.BMI)))
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    history = get_history(target, 'BMI')
+    if not history.has_changes():
+        return
+    was_eligible = is_eligible(history.deleted[0]) if history.deleted else False
+    _adjust(connection, eligible_users=int(is_eligible(target.BMI)) - int(was_eligible))
+
+
+# Load the previous BMI before it is overwritten so after_update always sees it
+@event.listens_for(User.BMI, 'set', active_history=True)
+def _user_bmi_set(target, value, oldvalue, initiator):
+    return value
+
+
+@event.listens_for(Meal, 'after_insert')
+def _meal_inserted(mapper, connection, target):
+    _adjust(connection, total_meals=1)
+
+
+@event.listens_for(Meal, 'after_delete')
+def _meal_deleted(mapper, connection, target):
+    _adjust(connection, total_meals=-1)
+
+
+def reconcile_site_stats() -> Dict:
+    """Recount from the source tables and overwrite the counters; returns the drift found"""
+    stats = db.session.query(SiteStats).filter_by(id=STATS_ROW_ID).with_for_update().one_or_none()
+    actual = {
+        'total_users': db.session.query(func.count(User.id)).scalar(),
+        'eligible_users': db.session.query(func.count(User.id))
+                            .filter(User.bmi_category.in_(ELIGIBLE_CATEGORIES)).scalar(),
+        'total_meals': db.session.query(func.count(Meal.id)).scalar()
+    }
+
+    if stats is None:
+        stats = SiteStats(id=STATS_ROW_ID)
+        db.session.add(stats)
+        drift = dict(actual)
+    else:
+        drift = {name: actual[name] - getattr(stats, name) for name in COUNTER_FIELDS}
+
+    for name, value in actual.items():
+        setattr(stats, name, value)
+    stats.reconciled_at = datetime.utcnow()
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the row first; its counts are just as fresh
+        db.session.rollback()
+        return {name: 0 for name in COUNTER_FIELDS}
+
+    if any(drift.values()):
+        logger.warning("Site stats drift corrected: %s", drift)
+    return drift
+
+
+def get_site_stats() -> Dict:
+    """Home page counters with one primary-key read, seeding the row on first use"""
+    stats = db.session.get(SiteStats, STATS_ROW_ID)
+    if stats is None:
+        reconcile_site_stats()
+        stats = db.session.get(SiteStats, STATS_ROW_ID)
+    return stats.to_dict()
@@ -1,23 +1,32 @@
 import requests
 import json
+import os
 import time
 import logging
 from typing import List, Dict, Optional
 from models import db, Meal, FoodCategory
+from ingredient_index import index_meal_ingredients
+from meal_tagging import sync_meal_categories
+from nutrition_rules import NUTRITION_SCORE
 
 logger = logging.getLogger(__name__)
 
+# Official endpoint; override with USDA_API_BASE_URL (e.g. fdc_mock_server.py) for offline runs
+DEFAULT_USDA_BASE_URL = 'https://api.nal.usda.gov/fdc/v1'
+
 class USDANutritionFetcher:
     """USDA FoodData Central API integration following copilot health-centric patterns"""
     
-    def __init__(self, api_key: str = 'DEMO_KEY'):
+    def __init__(self, api_key: str = 'DEMO_KEY', base_url: Optional[str] = None,
+                 request_delay: float = 0.5):
         self.api_key = api_key
-        self.base_url = 'https://api.nal.usda.gov/fdc/v1'
+        self.base_url = (base_url or os.environ.get('USDA_API_BASE_URL') or DEFAULT_USDA_BASE_URL).rstrip('/')
+        self.request_delay = request_delay
         self.session = requests.Session()
         
     def fetch_suitable_meals(self, target_count: int = 75) -> List[Dict]:
         """Fetch meals suitable for BMI >= 30 demographic following copilot business rules"""
-        logger.info(f"🔍 Fetching {target_count} suitable meals from USDA FoodData Central")
+        logger.info("🔍 Fetching %s suitable meals from USDA FoodData Central", target_count)
         
         # Search terms optimized for BMI >= 30 demographic
         search_terms = [
@@ -57,7 +66,8 @@ class USDANutritionFetcher:
                 
             try:
                 # Rate limiting to respect API guidelines
-                time.sleep(0.5)
+                if self.request_delay:
+                    time.sleep(self.request_delay)
                 
                 food_data = self._search_foods(search_term, limit=2)
                 
@@ -69,10 +79,10 @@ class USDANutritionFetcher:
                     if meal_data and self._validate_meal_for_target_demographic(meal_data):
                         meals.append(meal_data)
                         processed_count += 1
-                        logger.info(f"✅ Added: {meal_data['name']} (Score: {meal_data.get('nutrition_score', 0):.1f})")
+                        logger.info("✅ Added: %s (Score: %.1f)", meal_data['name'], meal_data.get('nutrition_score', 0))
                         
             except Exception as e:
-                logger.warning(f"⚠️ Failed to fetch {search_term}: {e}")
+                logger.warning("⚠️ Failed to fetch %s: %s", search_term, e)
                 continue
         
         # Add fallback meals if API quota exceeded
@@ -80,7 +90,7 @@ class USDANutritionFetcher:
             logger.info("📝 Adding fallback sample meals due to API limitations")
             meals.extend(self._get_fallback_meals()[:(target_count - len(meals))])
         
-        logger.info(f"✅ Total meals fetched: {len(meals)}")
+        logger.info("✅ Total meals fetched: %s", len(meals))
         return meals
     
     def _search_foods(self, search_term: str, limit: int = 2) -> List[Dict]:
@@ -144,7 +154,7 @@ class USDANutritionFetcher:
             return meal_data
             
         except Exception as e:
-            logger.error(f"Error parsing food data: {e}")
+            logger.error("Error parsing food data: %s", e)
             return None
     
     def _extract_nutrients(self, food_nutrients: List[Dict]) -> Dict:
@@ -161,10 +171,11 @@ class USDANutritionFetcher:
         
         for nutrient in food_nutrients:
             nutrient_name = nutrient.get('nutrientName', '').lower()
+            unit_name = nutrient.get('unitName', '').lower()
             value = float(nutrient.get('value', 0))
             
-            # Map USDA nutrient names to our fields
-            if 'energy' in nutrient_name and 'kcal' in nutrient_name:
+            # Map USDA nutrient names to our fields (FDC reports kcal in unitName)
+            if 'energy' in nutrient_name and ('kcal' in nutrient_name or unit_name == 'kcal'):
                 nutrients['calories'] = int(value)
             elif 'protein' in nutrient_name:
                 nutrients['protein'] = round(value, 1)
@@ -262,29 +273,8 @@ class USDANutritionFetcher:
             return '250g'
     
     def _calculate_nutrition_score(self, meal_data: Dict) -> float:
-        """Calculate nutrition score following copilot health-centric patterns"""
-        score = 0.0
-        
-        # Protein scoring (higher is better for weight management)
-        protein = meal_data.get('protein', 0)
-        if protein:
-            score += min(protein / 30 * 20, 20)
-        
-        # Fiber scoring (higher is better)
-        fiber = meal_data.get('fiber', 0)
-        if fiber:
-            score += min(fiber / 10 * 15, 15)
-        
-        # Calorie density scoring (lower is better for volume eating)
-        calories = meal_data.get('calories', 0)
-        if calories <= 200:
-            score += 15
-        elif calories <= 400:
-            score += 10
-        else:
-            score += 5
-        
-        return min(score, 50.0)
+        """Calculate nutrition score with the same rule as Meal.nutrition_score"""
+        return NUTRITION_SCORE.evaluate(meal_data)
     
     def _validate_meal_for_target_demographic(self, meal_data: Dict) -> bool:
         """Validate meal suitability for BMI >= 30 demographic"""
@@ -340,18 +330,18 @@ class USDANutritionFetcher:
             # ... more fallback meals
         ]
 
-def populate_usda_meals(target_count: int = 75):
+def populate_usda_meals(target_count: int = 75, fetcher: Optional[USDANutritionFetcher] = None):
     """Populate database with USDA meals following copilot health-centric patterns"""
     logger.info("🍽️ Starting USDA meal population for BMI >= 30 demographic")
     
     # Check if meals already exist
     existing_count = Meal.query.count()
     if existing_count >= target_count:
-        logger.info(f"✅ Database already has {existing_count} meals, skipping population")
+        logger.info("✅ Database already has %s meals, skipping population", existing_count)
         return existing_count
     
-    # Initialize USDA fetcher
-    fetcher = USDANutritionFetcher()
+    # Initialize USDA fetcher (callers may pass one pointed at a mock server)
+    fetcher = fetcher or USDANutritionFetcher()
     
     # Fetch meals from API
     meal_data_list = fetcher.fetch_suitable_meals(target_count)
@@ -387,21 +377,23 @@ def populate_usda_meals(target_count: int = 75):
             added_count += 1
             
         except Exception as e:
-            logger.error(f"Error adding meal {meal_data.get('name', 'Unknown')}: {e}")
+            logger.error("Error adding meal %s: %s", meal_data.get('name', 'Unknown'), e)
             continue
     
     # Commit all changes
     try:
         db.session.commit()
-        logger.info(f"✅ Successfully added {added_count} USDA meals to database")
+        logger.info("✅ Successfully added %s USDA meals to database", added_count)
         
-        # Add food categories
+        # Add food categories, tag every meal against their rules and index its ingredients
         _populate_food_categories()
+        sync_meal_categories()
+        index_meal_ingredients()
         
         return added_count + existing_count
         
     except Exception as e:
-        logger.error(f"Error committing meals to database: {e}")
+        logger.error("Error committing meals to database: %s", e)
         db.session.rollback()
         return existing_count
 
@@ -439,5 +431,5 @@ def _populate_food_categories():
         db.session.commit()
         logger.info("✅ Food categories populated")
     except Exception as e:
-        logger.error(f"Error adding food categories: {e}")
+        logger.error("Error adding food categories: %s", e)
         db.session.rollback()
@@ -0,0 +1,123 @@
+"""
+Unique username allocation with a single prefix query per base name
+Replaces the probe-one-suffix-at-a-time loops in registration and backfill
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+USERNAME_MAX_LENGTH = 80
+# Leave room for a numeric suffix inside the 80-character column
+BASE_MAX_LENGTH = USERNAME_MAX_LENGTH - 8
+PRELOAD_CHUNK_SIZE = 200
+
+
+def _candidate_filter(column, base: str, binary_order: bool):
+    """base itself or base followed by a digit: the only shapes allocate() can produce"""
+    if binary_order:
+        # One range on the unique index; ':' sorts right after '9' byte-wise
+        return or_(column == base, and_(column >= base + '0', column < base + ':'))
+    # Linguistic collations (the PostgreSQL default) do not order punctuation byte-wise, so match the prefix instead
+    following = func.substr(column, len(base) + 1, 1)
+    return and_(column.startswith(base, autoescape=True), or_(following == '', following.between('0', '9')))
+
+
+class UsernameAllocationError(Exception):
+    """Raised when a unique username could not be committed after retries"""
+
+
+def username_base_from_email(email: str) -> str:
+    """Default username base: the part of the email before @"""
+    return (email.split('@')[0] if email else '')[:BASE_MAX_LENGTH] or 'user'
+
+
+class UsernameAllocator:
+    """Hands out unique usernames, loading each base's taken names in one query
+
+    Every name loaded or handed out is remembered, so one allocator can serve a
+    whole bulk import or backfill with at most one query per distinct base, and
+    bases that end in digits (``maria1`` vs ``maria`` + 1) never collide.
+    """
+
+    def __init__(self, user_model=None, session=None):
+        if user_model is None or session is None:
+            from models import db, User
+            user_model = user_model or User
+            session = session or db.session
+        self.user_model = user_model
+        self.session = session
+        self._claimed: Set[str] = set()
+        self._loaded: Set[str] = set()
+        self._next_suffix: Dict[str, int] = {}
+
+    def preload(self, bases: Iterable[str]):
+        """Load the taken base and base+digits usernames for many bases with chunked queries"""
+        pending = sorted({base for base in bases if base not in self._loaded})
+        column = self.user_model.username
+        binary_order = self.session.get_bind().dialect.name == 'sqlite'  # BINARY collation unless declared otherwise
+        for start in range(0, len(pending), PRELOAD_CHUNK_SIZE):
+            chunk = pending[start:start + PRELOAD_CHUNK_SIZE]
+            # Not a bare prefix match: a short base such as "a" would load a large share of the table
+            rows = self.session.query(column).filter(
+                or_(*[_candidate_filter(column, base, binary_order) for base in chunk])).all()
+            self._claimed.update(username for (username,) in rows)
+            self._loaded.update(chunk)
+
+    def allocate(self, base: str) -> str:
+        """Return the first free name among base, base1, base2, ..."""
+        if base not in self._loaded:
+            self.preload([base])
+
+        # Every candidate is base or base + digits, so the preload covers all database conflicts
+        suffix = self._next_suffix.get(base, 0)
+        candidate = base if suffix == 0 else f"{base}{suffix}"
+        while candidate in self._claimed:
+            suffix += 1
+            candidate = f"{base}{suffix}"
+
+        self._claimed.add(candidate)
+        self._next_suffix[base] = suffix + 1
+        return candidate
+
+    def forget(self, base: str):
+        """Re-read base from the database on next use (after losing a race)"""
+        self._loaded.discard(base)
+        self._next_suffix.pop(base, None)
+
+
+def is_username_conflict(error: IntegrityError) -> bool:
+    return 'username' in str(error.orig).lower()
+
+
+def commit_with_unique_username(user, base: str, attempts: int = 5,
+                                allocator: Optional[UsernameAllocator] = None) -> str:
+    """Commit a new user, re-allocating its username on a unique-constraint race
+
+    A concurrent registration can claim the same name between allocation and
+    commit; the unique constraint catches that and we retry with fresh state.
+    Other integrity errors (e.g. duplicate email) are re-raised unchanged.
+    """
+    allocator = allocator or UsernameAllocator()
+    session = allocator.session
+    if not user.username:
+        user.username = allocator.allocate(base)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            session.add(user)
+            session.commit()
+            return user.username
+        except IntegrityError as error:
+            session.rollback()
+            if not is_username_conflict(error):
+                raise
+            logger.info("Username %s claimed concurrently, retrying (%s/%s)", user.username, attempt, attempts)
+            allocator.forget(base)
+            user.username = allocator.allocate(base)
+
+    raise UsernameAllocationError(f"Could not allocate a unique username for base '{base}'")
@@ -0,0 +1,242 @@
+"""
+Weekly nutrition report emails for every user
+Metrics for a whole batch of users come from four set-based queries per
+batch: intake per (user, day) from MealHistory joined to Meal, each user's
+current NutritionGoal, their best-scoring meals of the week and their first
+and last weight readings, the last three picked with ROW_NUMBER windows.
+The parent streams batches of plain report dicts to a process pool, where
+each report is rendered to an email and written atomically to the outbox
+directory (<outbox>/<week start>/user-<id>.eml) for a mail relay to send.
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from email.charset import Charset, QP
+from email.mime.text import MIMEText
+from typing import Dict, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Meal, MealHistory, NutritionGoal, User, WeightLog
+from nutrition_rollups import GOAL_FIELDS, NUTRIENT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+ADHERENCE_TOLERANCE = 0.10  # a day is on goal within +/-10% of the calorie goal
+BEST_MEALS = 3
+DEFAULT_SENDER = 'reports@nutrition-assistant.local'
+
+# compat32 MIMEText: the default EmailMessage policy re-parses every header, ~8x slower per report
+_UTF8_QP = Charset('utf-8')
+_UTF8_QP.body_encoding = QP
+
+
+def week_start(day: date) -> date:
+    """Monday of the week containing day"""
+    return day - timedelta(days=day.weekday())
+
+
+def _window(start: date):
+    begin = datetime.combine(start, datetime.min.time())
+    return begin, begin + timedelta(days=7)
+
+
+def _daily_intake(low: int, high: int, start: date) -> Dict[int, List[Dict]]:
+    """Portion-adjusted totals per (user, day) over the week, one GROUP BY"""
+    begin, end = _window(start)
+    day = func.date(MealHistory.date)
+    portion = func.coalesce(MealHistory.portion_size, 1.0)
+    rows = db.session.execute(
+        select(MealHistory.user_id, day,
+               *[func.sum(func.coalesce(getattr(Meal, field), 0) * portion) for field in NUTRIENT_FIELDS])
+        .join(Meal, Meal.id == MealHistory.meal_id)
+        .where(MealHistory.user_id > low, MealHistory.user_id <= high,
+               MealHistory.date >= begin, MealHistory.date < end)
+        .group_by(MealHistory.user_id, day)
+    )
+    days = defaultdict(list)
+    for user_id, _, *totals in rows:
+        days[user_id].append(dict(zip(NUTRIENT_FIELDS, totals)))
+    return days
+
+
+def _current_goals(low: int, high: int) -> Dict[int, Dict]:
+    """Each user's most recent goal (as current_goal picks it), for the whole batch at once"""
+    ranked = select(
+        NutritionGoal.user_id, *[getattr(NutritionGoal, column) for column in GOAL_FIELDS.values()],
+        func.row_number().over(partition_by=NutritionGoal.user_id,
+                               order_by=(NutritionGoal.created_at.desc(), NutritionGoal.id.desc())).label('position')
+    ).where(NutritionGoal.user_id > low, NutritionGoal.user_id <= high).subquery()
+    rows = db.session.execute(select(ranked).where(ranked.c.position == 1))
+    return {row.user_id: {field: row._mapping[column] for field, column in GOAL_FIELDS.items()} for row in rows}
+
+
+def _best_meals(low: int, high: int, start: date) -> Dict[int, List[Dict]]:
+    """Each user's highest-scoring meals of the week (ties: eaten more often)"""
+    begin, end = _window(start)
+    times = func.count(MealHistory.id)
+    ranked = (
+        select(MealHistory.user_id, Meal.id.label('meal_id'), Meal.name, Meal.nutrition_score.label('score'),
+               times.label('times'),
+               func.row_number().over(partition_by=MealHistory.user_id,
+                                      order_by=(Meal.nutrition_score.desc(), times.desc(), Meal.id)).label('position'))
+        .join(Meal, Meal.id == MealHistory.meal_id)
+        .where(MealHistory.user_id > low, MealHistory.user_id <= high,
+               MealHistory.date >= begin, MealHistory.date < end)
+        .group_by(MealHistory.user_id, Meal.id)
+    ).subquery()
+    meals = defaultdict(list)
+    for row in db.session.execute(select(ranked).where(ranked.c.position <= BEST_MEALS)
+                                  .order_by(ranked.c.user_id, ranked.c.position)):
+        meals[row.user_id].append({'meal_id': row.meal_id, 'name': row.name,
+                                   'score': round(row.score, 1), 'times': row.times})
+    return meals
+
+
+def _weight_change(low: int, high: int, start: date) -> Dict[int, Dict]:
+    """First and last weight reading of the week per user"""
+    begin, end = _window(start)
+    in_week = (WeightLog.user_id > low, WeightLog.user_id <= high, WeightLog.date >= begin, WeightLog.date < end)
+    ranked = select(
+        WeightLog.user_id, WeightLog.weight,
+        func.row_number().over(partition_by=WeightLog.user_id, order_by=(WeightLog.date, WeightLog.id)).label('first'),
+        func.row_number().over(partition_by=WeightLog.user_id,
+                               order_by=(WeightLog.date.desc(), WeightLog.id.desc())).label('last')
+    ).where(*in_week).subquery()
+    weights: Dict[int, Dict] = {}
+    for row in db.session.execute(select(ranked).where((ranked.c.first == 1) | (ranked.c.last == 1))):
+        entry = weights.setdefault(row.user_id, {})
+        if row.first == 1:
+            entry['start'] = row.weight
+        if row.last == 1:
+            entry['end'] = row.weight
+    for entry in weights.values():
+        entry['change'] = round(entry['end'] - entry['start'], 1)
+    return weights
+
+
+def summarize(days: List[Dict], goal: Optional[Dict]) -> Dict:
+    """Average intake over logged days and goal adherence from per-day totals"""
+    logged = len(days)
+    average = {field: round(sum(day[field] for day in days) / logged, 1) if logged else 0.0
+               for field in NUTRIENT_FIELDS}
+    adherence = None
+    if goal and goal.get('calories'):
+        target = goal['calories']
+        on_goal = sum(1 for day in days if abs(day['calories'] - target) <= target * ADHERENCE_TOLERANCE)
+        adherence = {
+            'days_on_goal': on_goal,
+            'percent_of_goal': {field: round(average[field] / goal[field] * 100, 1)
+                                for field in GOAL_FIELDS if goal.get(field)} if logged else {},
+        }
+    return {'days_logged': logged, 'average': average, 'goal': goal, 'adherence': adherence}
+
+
+def _report_batches(start: date, batch_size: int) -> Iterator[List[Dict]]:
+    """Reports for users in id order, a batch of users per round of queries"""
+    low = 0
+    while True:
+        users = db.session.execute(
+            select(User.id, User.username, User.email).where(User.id > low).order_by(User.id).limit(batch_size)
+        ).all()
+        if not users:
+            return
+        high = users[-1][0]
+        intake, goals = _daily_intake(low, high, start), _current_goals(low, high)
+        best, weights = _best_meals(low, high, start), _weight_change(low, high, start)
+        yield [{'user_id': user_id, 'username': username, 'email': email, 'week_start': start.isoformat(),
+                **summarize(intake.get(user_id, []), goals.get(user_id)),
+                'best_meals': best.get(user_id, []), 'weight': weights.get(user_id)}
+               for user_id, username, email in users]
+        low = high
+
+
+def render_report(report: Dict, sender: str = DEFAULT_SENDER) -> MIMEText:
+    """Plain-text weekly summary email for one report dict"""
+    start = date.fromisoformat(report['week_start'])
+    lines = [f"Hi {report['username']},", '',
+             f"Here is your nutrition summary for {start:%b %d} - {start + timedelta(days=6):%b %d}.", '']
+    average, adherence = report['average'], report['adherence']
+    if report['days_logged']:
+        lines.append(f"You logged meals on {report['days_logged']} of 7 days. On those days you averaged:")
+        lines.extend(f"  {field.capitalize():<9} {average[field]:>7.1f}{' kcal' if field == 'calories' else ' g'}"
+                     + (f"  ({adherence['percent_of_goal'][field]:.0f}% of goal)"
+                        if adherence and field in adherence['percent_of_goal'] else '')
+                     for field in NUTRIENT_FIELDS)
+    else:
+        lines.append("You did not log any meals this week. Logging even one meal a day helps you stay on track.")
+    if adherence:
+        lines += ['', f"Days within {ADHERENCE_TOLERANCE:.0%} of your {report['goal']['calories']} kcal goal: "
+                      f"{adherence['days_on_goal']} of 7"]
+    if report['best_meals']:
+        lines += ['', 'Your best meals this week:']
+        lines.extend(f"  {meal['name']} (score {meal['score']}, eaten {meal['times']}x)" for meal in report['best_meals'])
+    weight = report['weight']
+    if weight:
+        lines += ['', f"Weight: {weight['start']:.1f} kg -> {weight['end']:.1f} kg ({weight['change']:+.1f} kg)"
+                  if weight['change'] else f"Weight: steady at {weight['end']:.1f} kg"]
+    lines += ['', 'Keep it up!', 'Your Personal Nutrition Assistant']
+
+    message = MIMEText('\n'.join(lines) + '\n', 'plain', _UTF8_QP)
+    message['From'] = sender
+    message['To'] = report['email']
+    message['Subject'] = f"Your weekly nutrition summary ({start:%b %d})"
+    return message
+
+
+def _write_reports(outbox: str, reports: List[Dict], sender: str) -> int:
+    """Render a batch into the outbox; each file is written atomically so a relay never reads half an email"""
+    for report in reports:
+        directory = os.path.join(outbox, report['week_start'])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"user-{report['user_id']}.eml")
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as handle:
+            handle.write(render_report(report, sender).as_bytes())
+        os.replace(temporary, path)
+    return len(reports)
+
+
+def _outbox_dir() -> str:
+    return current_app.config.get('WEEKLY_REPORT_OUTBOX') or os.path.join(current_app.instance_path, 'outbox')
+
+
+def generate_weekly_reports(start: Optional[date] = None, batch_size: int = 2000, workers: Optional[int] = None,
+                            outbox: Optional[str] = None) -> Dict:
+    """Write every user's report for the week from start (default: last week); returns throughput figures"""
+    started = time.perf_counter()
+    start = start or week_start(datetime.utcnow().date()) - timedelta(days=7)
+    outbox = outbox or _outbox_dir()
+    sender = current_app.config.get('WEEKLY_REPORT_SENDER') or DEFAULT_SENDER
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    written = 0
+
+    if workers <= 1:
+        for reports in _report_batches(start, batch_size):
+            written += _write_reports(outbox, reports, sender)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for reports in _report_batches(start, batch_size):
+                pending.append(executor.submit(_write_reports, outbox, reports, sender))
+                if len(pending) >= workers * 2:
+                    written += pending.popleft().result()
+            while pending:
+                written += pending.popleft().result()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'week_start': start.isoformat(),
+        'reports': written,
+        'outbox': os.path.join(outbox, start.isoformat()),
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'users_per_second': round(written / elapsed, 1) if elapsed else 0.0
+    }
+    logger.info("Generated weekly reports: %s", summary)
+    return summary
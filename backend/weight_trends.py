@@ -0,0 +1,267 @@
+"""
+Weight history with incrementally maintained trend statistics
+Every WeightLog insert folds the new reading into the user's weight_trend row
+in the same flush: a time-aware moving average (a classic 7-day EMA for daily
+weigh-ins) and exponentially decayed least-squares sums from which the slope
+in kg/week follows directly. Backfilled, edited or deleted readings replay
+that user's log. project_goal_dates() then estimates when every user reaches
+UserProfile.target_weight with one vectorized pass over all trend rows.
+"""
+
+import logging
+import math
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, delete, event, func, insert, select, update
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, User, UserProfile, WeightLog, WeightTrend
+
+logger = logging.getLogger(__name__)
+
+EMA_DAYS = 7
+SLOPE_DECAY_DAYS = 28.0     # older readings fade from the slope with this time constant
+MIN_SLOPE_SPAN_DAYS = 7.0   # no slope until readings span at least a week
+GOAL_TOLERANCE_KG = 0.5     # within this of the target counts as reached
+MAX_PROJECTION_WEEKS = 260  # slower trends than this are reported as no estimate
+MIN_WEIGHT, MAX_WEIGHT = 30.0, 300.0
+MAX_CLOCK_SKEW = timedelta(minutes=5)  # a client clock this far ahead still counts as now
+
+_trend_table = WeightTrend.__table__
+_log_table = WeightLog.__table__
+_STATE_FIELDS = ('entries', 'last_log_id', 'first_date', 'latest_date', 'latest_weight', 'ema_weight',
+                 'sum_w', 'sum_t', 'sum_y', 'sum_tt', 'sum_ty', 'slope_per_week')
+
+_EMA_DAILY_ALPHA = 2 / (EMA_DAYS + 1)
+
+
+class WeightLogError(ValueError):
+    """Raised for a reading outside the accepted range"""
+
+
+class WeightUserNotFound(WeightLogError):
+    """Raised when the reading's user no longer exists (e.g. a token that outlived its user)"""
+
+
+def _days(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() / 86400
+
+
+def _slope_per_week(state: Dict) -> Optional[float]:
+    if _days(state['first_date'], state['latest_date']) < MIN_SLOPE_SPAN_DAYS:
+        return None
+    spread = state['sum_w'] * state['sum_tt'] - state['sum_t'] ** 2
+    if spread <= 1e-9:
+        return None
+    return (state['sum_w'] * state['sum_ty'] - state['sum_t'] * state['sum_y']) / spread * 7
+
+
+def fold_reading(state: Optional[Dict], log_id: int, logged_at: datetime, weight: float) -> Dict:
+    """Advance a trend state by one reading taken at or after its latest one"""
+    if state is None:
+        return {'entries': 1, 'last_log_id': log_id, 'first_date': logged_at, 'latest_date': logged_at,
+                'latest_weight': weight, 'ema_weight': weight, 'sum_w': 1.0, 'sum_t': 0.0,
+                'sum_y': weight, 'sum_tt': 0.0, 'sum_ty': 0.0, 'slope_per_week': None}
+
+    gap = _days(state['latest_date'], logged_at)
+    alpha = 1 - (1 - _EMA_DAILY_ALPHA) ** gap
+    decay = math.exp(-gap / SLOPE_DECAY_DAYS)
+    t = _days(state['first_date'], logged_at)
+
+    state = dict(state)
+    state.update(
+        entries=state['entries'] + 1,
+        last_log_id=max(state['last_log_id'], log_id),
+        latest_date=logged_at,
+        latest_weight=weight,
+        ema_weight=state['ema_weight'] + alpha * (weight - state['ema_weight']),
+        sum_w=state['sum_w'] * decay + 1,
+        sum_t=state['sum_t'] * decay + t,
+        sum_y=state['sum_y'] * decay + weight,
+        sum_tt=state['sum_tt'] * decay + t * t,
+        sum_ty=state['sum_ty'] * decay + t * weight,
+    )
+    state['slope_per_week'] = _slope_per_week(state)
+    return state
+
+
+def _load_state(connection, user_id: int) -> Optional[Dict]:
+    row = connection.execute(
+        select(*[_trend_table.c[name] for name in _STATE_FIELDS])
+        .where(_trend_table.c.user_id == user_id).with_for_update()
+    ).first()
+    return dict(row._mapping) if row else None
+
+
+def _save_state(connection, user_id: int, state: Optional[Dict], existed: bool):
+    if state is None:
+        connection.execute(delete(_trend_table).where(_trend_table.c.user_id == user_id))
+    elif existed:
+        connection.execute(update(_trend_table).where(_trend_table.c.user_id == user_id).values(**state))
+    else:
+        connection.execute(insert(_trend_table).values(user_id=user_id, **state))
+
+
+def replay_user(connection, user_id: int):
+    """Rebuild one user's trend from their full log in date order"""
+    existed = _load_state(connection, user_id) is not None
+    state = None
+    rows = connection.execute(
+        select(_log_table.c.id, _log_table.c.date, _log_table.c.weight)
+        .where(_log_table.c.user_id == user_id).order_by(_log_table.c.date, _log_table.c.id)
+    )
+    for log_id, logged_at, weight in rows:
+        state = fold_reading(state, log_id, logged_at, weight)
+    if state is not None:
+        # Readings from this flush whose events have not fired yet are already included
+        state['last_log_id'] = connection.execute(
+            select(func.max(_log_table.c.id)).where(_log_table.c.user_id == user_id)).scalar()
+    _save_state(connection, user_id, state, existed)
+
+
+@event.listens_for(WeightLog, 'after_insert')
+def _weight_logged(mapper, connection, target):
+    state = _load_state(connection, target.user_id)
+    if state is not None and target.id <= state['last_log_id']:
+        return  # already counted by a replay earlier in this flush
+    if state is not None and target.date < state['latest_date']:
+        replay_user(connection, target.user_id)
+        return
+    _save_state(connection, target.user_id, fold_reading(state, target.id, target.date, target.weight),
+                existed=state is not None)
+
+
+@event.listens_for(WeightLog, 'after_delete')
+def _weight_deleted(mapper, connection, target):
+    replay_user(connection, target.user_id)
+
+
+@event.listens_for(WeightLog, 'after_update')
+def _weight_updated(mapper, connection, target):
+    histories = {name: get_history(target, name) for name in ('user_id', 'date', 'weight')}
+    if not any(history.has_changes() for history in histories.values()):
+        return
+    previous_user = histories['user_id'].deleted[0] if histories['user_id'].deleted else target.user_id
+    replay_user(connection, target.user_id)
+    if previous_user != target.user_id:
+        replay_user(connection, previous_user)
+
+
+# Load the previous user_id before it is overwritten so after_update can replay both users
+event.listen(WeightLog.user_id, 'set', lambda target, value, oldvalue, initiator: value,
+             active_history=True, retval=True)
+
+
+def log_weight(user_id: int, weight, logged_at: Optional[datetime] = None) -> WeightLog:
+    """Record a reading; the newest reading also becomes User.weight (and so BMI)"""
+    try:
+        weight = float(weight)
+    except (TypeError, ValueError):
+        raise WeightLogError('weight must be a number') from None
+    if not MIN_WEIGHT <= weight <= MAX_WEIGHT:
+        raise WeightLogError(f'weight must be between {MIN_WEIGHT:g} and {MAX_WEIGHT:g} kg')
+    now = datetime.utcnow()
+    # A future reading would become latest_date, turning every real one after it into a backfill
+    if logged_at is not None and logged_at > now + MAX_CLOCK_SKEW:
+        raise WeightLogError('date cannot be in the future')
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise WeightUserNotFound('User not found')
+
+    logged_at = logged_at or now
+    trend = db.session.get(WeightTrend, user_id)
+    if trend is None or logged_at >= trend.latest_date:
+        user.weight = weight
+
+    entry = WeightLog(user_id=user_id, weight=weight, date=logged_at)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def weight_progress(user_id: int, days: int = 30) -> Dict:
+    """Stored trend, goal progress and the last `days` of readings (no full-history scan)"""
+    trend = db.session.get(WeightTrend, user_id)
+    profile = UserProfile.query.filter_by(user_id=user_id).first()
+    since = datetime.utcnow() - timedelta(days=days)
+    entries: List[WeightLog] = (WeightLog.query.filter(WeightLog.user_id == user_id, WeightLog.date >= since)
+                                .order_by(WeightLog.date).all())
+
+    goal = None
+    if profile is not None and profile.target_weight:
+        goal = {'target_weight': profile.target_weight, 'weekly_goal': profile.weekly_goal}
+        if trend is not None:
+            remaining = profile.target_weight - trend.ema_weight
+            goal['remaining'] = round(remaining, 2)
+            if profile.weekly_goal:
+                weeks = abs(remaining) / profile.weekly_goal
+                goal['planned_goal_date'] = (trend.latest_date + timedelta(weeks=weeks)).date().isoformat()
+
+    return {
+        'trend': trend.to_dict() if trend else None,
+        'goal': goal,
+        'entries': [entry.to_dict() for entry in entries]
+    }
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAT_ORDINAL = np.iinfo(np.int64).min  # the int64 value numpy reads as NaT
+
+
+def _day_array(values) -> np.ndarray:
+    """datetime/date/None values as datetime64[D] via ordinals (much faster than np.array on objects)"""
+    ordinals = np.fromiter((value.toordinal() - _EPOCH_ORDINAL if value else _NAT_ORDINAL for value in values),
+                           dtype=np.int64, count=len(values))
+    return ordinals.view('datetime64[D]')
+
+
+def projected_dates(average: np.ndarray, slope: np.ndarray, target: np.ndarray,
+                    latest: np.ndarray) -> np.ndarray:
+    """Goal dates (datetime64[D], NaT when the trend never gets there) for arrays of trends"""
+    remaining = target - average
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weeks = remaining / slope
+    reached = np.abs(remaining) <= GOAL_TOLERANCE_KG
+    heading = np.isfinite(weeks) & (weeks > 0) & (weeks <= MAX_PROJECTION_WEEKS)
+    offset_days = np.where(reached, 0, np.where(heading, np.round(np.nan_to_num(weeks) * 7), 0)).astype('int64')
+    dates = latest.astype('datetime64[D]') + offset_days.astype('timedelta64[D]')
+    return np.where(reached | heading, dates, np.datetime64('NaT', 'D'))
+
+
+def project_goal_dates(batch_size: int = 5000) -> Dict:
+    """Recompute projected_goal_date for every trend in one vectorized pass; writes only changes"""
+    started = time.perf_counter()
+    trend, profile = _trend_table.c, UserProfile.__table__.c
+    rows = db.session.connection().execute(
+        select(trend.user_id, trend.ema_weight, trend.slope_per_week, trend.latest_date,
+               trend.projected_goal_date, profile.target_weight)
+        .select_from(_trend_table.outerjoin(UserProfile.__table__, profile.user_id == trend.user_id))
+    ).all()
+    if not rows:
+        return {'users': 0, 'updated': 0, 'elapsed_seconds': 0.0, 'users_per_second': 0}
+
+    user_ids, average, slope, latest, current, target = zip(*rows)
+    projected = projected_dates(np.array(average, dtype=float), np.array(slope, dtype=float),
+                                np.array(target, dtype=float), _day_array(latest))
+    current = _day_array(current)
+    changed = np.flatnonzero(~((projected == current) | (np.isnat(projected) & np.isnat(current))))
+
+    now = datetime.utcnow()
+    params = [{'key_user': user_ids[index],
+               'projected': None if np.isnat(projected[index]) else projected[index].item(),
+               'projected_at': now} for index in changed]
+    stmt = (update(_trend_table).where(_trend_table.c.user_id == bindparam('key_user'))
+            .values(projected_goal_date=bindparam('projected'), projected_at=bindparam('projected_at')))
+    for start in range(0, len(params), batch_size):
+        db.session.execute(stmt, params[start:start + batch_size])
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    summary = {'users': len(rows), 'updated': len(params), 'elapsed_seconds': round(elapsed, 3),
+               'users_per_second': round(len(rows) / elapsed) if elapsed else 0}
+    logger.info("Projected weight goal dates: %s", summary)
+    return summary
@@ -0,0 +1,24 @@
+"""
+Shared setup for benchmark scripts
+Puts backend/ on the import path and builds the Flask app against a scratch database
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def create_bench_app(database_url: str = 'sqlite://'):
+    """Create the application on a throwaway database (in-memory SQLite by default)"""
+    os.environ['DATABASE_URL'] = database_url
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
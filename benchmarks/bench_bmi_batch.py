@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Bulk BMI screening throughput benchmark
+Posts a generated measurement file to /bmi/api/batch as a streamed CSV body and
+consumes the streamed CSV / NDJSON response, plus the raw vectorized kernel
+and a JSON-array request for comparison
+
+Usage:
+    python benchmarks/bench_bmi_batch.py --rows 1000000
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from _bootstrap import create_bench_app
+
+
+def write_measurements(path, rows, seed=7):
+    """Random adult heights/weights with ~1% malformed rows"""
+    rng = np.random.default_rng(seed)
+    heights = np.round(rng.normal(170, 10, rows), 1)
+    weights = np.round(rng.normal(88, 22, rows), 1)
+    bad = rng.random(rows) < 0.01
+    with open(path, 'w') as handle:
+        handle.write('id,height,weight\n')
+        for start in range(0, rows, 100000):
+            stop = min(start + 100000, rows)
+            handle.write(''.join(
+                f"p{index},{'n/a' if bad[index] else heights[index]},{weights[index]}\n"
+                for index in range(start, stop)))
+    return heights, weights
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def post_stream(client, path, output):
+    """Stream the file in, drain the streamed response; returns (seconds, bytes out, summary)"""
+    started = time.perf_counter()
+    with open(path, 'rb') as handle:
+        response = client.post(f'/bmi/api/batch?format={output}', input_stream=handle,
+                               content_type='text/csv', content_length=os.path.getsize(path),
+                               buffered=False)
+        received = 0
+        tail = b''
+        for part in response.response:
+            received += len(part)
+            tail = (tail + part)[-2048:]
+        response.close()
+    elapsed = time.perf_counter() - started
+    if output == 'ndjson':
+        summary = json.loads(tail.rstrip(b'\n').rsplit(b'\n', 1)[-1])['summary']
+    else:
+        summary = tail.decode().split('# total_rows=', 1)[1].splitlines()[0]
+    return elapsed, received, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk BMI screening benchmark')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--json-rows', type=int, default=100000,
+                        help='Rows for the JSON-array request (parsed fully in memory)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+    client = app.test_client()
+
+    print("⚖️  Bulk BMI Screening Benchmark")
+    print(f"   rows={args.rows}, chunk size={app.config['BMI_BATCH_CHUNK_SIZE']}")
+    print("=" * 78)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, 'measurements.csv')
+        heights, weights = write_measurements(path, args.rows)
+        print(f"Input file: {os.path.getsize(path) / 1e6:.1f} MB, peak RSS so far {peak_rss_mb():.0f} MB")
+
+        from bmi_screening import screen_chunk
+        started = time.perf_counter()
+        screen_chunk(heights, weights)
+        kernel = time.perf_counter() - started
+        print(f"{'vectorized kernel only (one array)':<40} {args.rows / kernel:>14,.0f} rows/s")
+
+        for output in ('csv', 'ndjson'):
+            elapsed, received, summary = post_stream(client, path, output)
+            print(f"{'CSV in -> ' + output + ' out (streamed)':<40} {args.rows / elapsed:>14,.0f} rows/s   "
+                  f"{elapsed:6.2f}s, {received / 1e6:.0f} MB out, peak RSS {peak_rss_mb():.0f} MB")
+        print(f"   summary: {summary}")
+
+        started = time.perf_counter()
+        with open(path, 'rb') as handle:
+            response = client.post('/bmi/api/batch?summary_only=1', input_stream=handle,
+                                   content_type='text/csv', content_length=os.path.getsize(path))
+        elapsed = time.perf_counter() - started
+        print(f"{'CSV in -> summary only':<40} {args.rows / elapsed:>14,.0f} rows/s   {elapsed:6.2f}s")
+
+    payload = [{'id': index, 'height': float(heights[index]), 'weight': float(weights[index])}
+               for index in range(min(args.json_rows, args.rows))]
+    started = time.perf_counter()
+    response = client.post('/bmi/api/batch', json=payload)
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    print(f"{'JSON array in -> ndjson out':<40} {len(payload) / elapsed:>14,.0f} rows/s   "
+          f"{elapsed:6.2f}s for {len(payload)} rows")
+
+
+if __name__ == '__main__':
+    main()
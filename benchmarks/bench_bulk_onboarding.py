@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Bulk onboarding benchmark: synthetic clinic import through bulk_onboarding.import_users
+Reports users/s overall and per phase (validate, hash, allocate, insert)
+
+Usage:
+    python benchmarks/bench_bulk_onboarding.py --rows 20000 --method pbkdf2:sha256:600000
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+
+from _bootstrap import create_bench_app
+
+
+def synthetic_rows(count: int, seed: int = 7):
+    """Clinic-style rows: mostly eligible, some duplicates, bad ranges and low BMIs"""
+    rng = random.Random(seed)
+    first_names = ['maria', 'john', 'ahmed', 'li', 'fatima', 'carlos', 'anna', 'omar', 'sara', 'david']
+    rows = []
+    for n in range(count):
+        height = round(rng.uniform(150, 195), 1)
+        bmi = rng.uniform(24, 45)
+        rows.append({
+            'email': f"{rng.choice(first_names)}.{n % (count // 3 + 1)}@clinic{n % 7}.example.org",
+            'password': f"clinic-pass-{n}",
+            'height': height if rng.random() > 0.01 else 'n/a',
+            'weight': round(bmi * (height / 100) ** 2, 1),
+            'allergies': rng.choice(['', 'Nuts', 'Dairy', 'Gluten']),
+            'preferences': rng.choice(['', 'High protein', 'Low sodium'])
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk onboarding benchmark')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None, help='hashing processes (default: all cores)')
+    parser.add_argument('--method', default='pbkdf2:sha256:600000', help='password hash method / cost factor')
+    parser.add_argument('--database-url', default=None, help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_bulk.db')}"
+    app = create_bench_app(database_url)
+
+    from bulk_onboarding import import_users
+    from password_hashing import get_password_hasher
+
+    rows = synthetic_rows(args.rows)
+
+    print("👥 Bulk Onboarding Benchmark")
+    print(f"   rows={args.rows} batch_size={args.batch_size} method={args.method} "
+          f"workers={args.workers or os.cpu_count()}")
+    print("=" * 70)
+
+    with app.app_context():
+        if args.workers is not None:
+            get_password_hasher().resize(args.workers)
+        summary = import_users(rows, batch_size=args.batch_size)['summary']
+
+    print(f"✅ Created {summary['created']} / rejected {summary['rejected']} "
+          f"in {summary['elapsed_seconds']}s")
+    print(f"🚀 Throughput: {summary['users_per_second']} users/s")
+    for phase, seconds in summary['timings'].items():
+        print(f"   {phase:<9} {seconds:8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
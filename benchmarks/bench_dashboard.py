@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Dashboard API benchmark
+Seeds users with meal history, goals, weight readings and ratings, then times
+GET /api/dashboard cold and warm from the per-user cache against the five
+separate endpoints a client would otherwise call. Sections only run
+concurrently on server databases, so on SQLite the cold figure is serial.
+
+Usage:
+    python benchmarks/bench_dashboard.py --users 2000 --meals 5000
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import event, insert
+
+from _bootstrap import create_bench_app
+from bench_meal_plan import seed_meals
+from bench_recommendations import seed_users
+
+SEPARATE_ENDPOINTS = ('/auth/api/me', '/api/intake/daily', '/api/intake/log', '/meals/api/recommendations?limit=5',
+                      '/api/weight')
+
+
+def seed_activity(db, users, meals, days=30, seed=17):
+    """Meal history (with daily rollups), a goal and weight readings for every user"""
+    from models import MealHistory, NutritionGoal, WeightLog
+    from nutrition_rollups import rebuild_daily_rollups
+    from weight_trends import project_goal_dates
+
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    history, weights = [], []
+    for user_id in range(1, users + 1):
+        for day in range(days):
+            for meal_id in rng.integers(1, meals + 1, 3):
+                history.append({'user_id': user_id, 'meal_id': int(meal_id), 'portion_size': 1.0,
+                                'date': now - timedelta(days=day, hours=int(rng.integers(0, 12)))})
+            weights.append({'user_id': user_id, 'weight': float(rng.normal(100, 2)), 'date': now - timedelta(days=day)})
+    db.session.execute(insert(MealHistory), history)
+    db.session.execute(insert(WeightLog), weights)
+    db.session.execute(insert(NutritionGoal), [
+        {'user_id': user_id, 'daily_calories': 1800, 'daily_protein': 110, 'daily_carbs': 180, 'daily_fat': 60}
+        for user_id in range(1, users + 1)])
+    db.session.commit()
+    rebuild_daily_rollups()
+    project_goal_dates()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard API benchmark')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--meals', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db, User
+    from api_tokens import issue_access_token, user_cache
+    from dashboard_invalidation import dashboard_cache
+
+    print("📊 Dashboard API Benchmark")
+    with app.app_context():
+        seed_meals(db, args.meals)
+        seed_users(db, args.users, args.meals, args.users * 10)
+        seed_activity(db, args.users, args.meals)
+        tokens = {user.id: issue_access_token(user)['access_token']
+                  for user in User.query.filter(User.id <= args.requests)}
+        queries = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: queries.__setitem__(0, queries[0] + 1))
+    print(f"   users={args.users}, meals={args.meals}, requests={len(tokens)}")
+    print("=" * 78)
+
+    client = app.test_client()
+
+    def run(label, paths, clear):
+        queries[0] = 0
+        started = time.perf_counter()
+        for user_id, token in tokens.items():
+            if clear:
+                dashboard_cache.invalidate(user_id)
+                user_cache.invalidate(user_id)
+            for path in paths:
+                response = client.get(path, headers={'Authorization': f'Bearer {token}'})
+                assert response.status_code == 200, (path, response.status_code)
+        elapsed = (time.perf_counter() - started) * 1000 / len(tokens)
+        print(f"{label:<34} {elapsed:>9.2f} ms/page  {queries[0] / len(tokens):>6.1f} queries/page")
+
+    run('five separate endpoints', SEPARATE_ENDPOINTS, clear=True)
+    run('dashboard, cold', ['/api/dashboard'], clear=True)
+    run('dashboard, cached', ['/api/dashboard'], clear=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Ingredient index benchmark
+Seeds meals with Zipf-distributed ingredient lists, builds the posting lists,
+then times include/exclude queries as posting-list intersections against the
+same queries written as ILIKE scans over Meal.ingredients
+
+Usage:
+    python benchmarks/bench_ingredient_index.py --meals 100000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import and_, bindparam, not_, or_, update
+
+from _bootstrap import create_bench_app
+from bench_meal_plan import seed_meals
+
+COMMON = ['chicken breast', 'brown rice', 'olive oil', 'garlic', 'onions', 'tomatoes', 'spinach', 'eggs',
+          'milk', 'cheddar cheese', 'butter', 'almonds', 'peanut butter', 'whole wheat bread', 'oats',
+          'salmon', 'tofu', 'black beans', 'greek yogurt', 'broccoli', 'walnuts', 'quinoa', 'lentils']
+
+QUERIES = [
+    (['chicken'], ['dairy', 'nuts']),
+    (['chicken', 'rice'], []),
+    (['tofu'], ['gluten', 'soy sauce']),
+    (['egg', 'spinach'], ['dairy']),
+    ([], ['dairy', 'nuts', 'gluten', 'fish']),
+]
+
+# ILIKE equivalents of the family words, as a caller without the index would have to write them
+LIKE_TERMS = {'dairy': ['milk', 'cheese', 'butter', 'yogurt'], 'nuts': ['almond', 'walnut', 'peanut'],
+              'gluten': ['wheat', 'bread'], 'fish': ['salmon'], 'rice': ['rice'], 'soy sauce': ['soy sauce']}
+
+
+def seed_ingredients(db, count, seed=9):
+    from models import Meal
+
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('bcdfghjklmnprstvz')), np.array(list('aeiou'))
+    vocabulary = COMMON + sorted({''.join(letters[k % 2][rng.integers(len(letters[k % 2]))] for k in range(6))
+                                  for _ in range(5000)})
+    weights = 1 / np.arange(1, len(vocabulary) + 1) ** 1.1
+    weights /= weights.sum()
+    params = [{'key_id': meal_id, 'ingredients': ', '.join(
+        vocabulary[i] for i in rng.choice(len(vocabulary), rng.integers(3, 12), replace=False, p=weights))}
+        for meal_id in range(1, count + 1)]
+    table = Meal.__table__
+    db.session.execute(update(table).where(table.c.id == bindparam('key_id')), params)
+    db.session.commit()
+
+
+def like_filters(Meal, include, exclude):
+    def matches(term):
+        return or_(*[Meal.ingredients.ilike(f'%{word}%') for word in LIKE_TERMS.get(term, [term])])
+    return [and_(*[matches(term) for term in include]), *[not_(matches(term)) for term in exclude]] \
+        if include else [not_(matches(term)) for term in exclude]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingredient index benchmark')
+    parser.add_argument('--meals', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db, Meal
+    from ingredient_index import index_meal_ingredients, ingredient_filters
+
+    print("🥕 Ingredient Index Benchmark")
+    print(f"   meals={args.meals}")
+    print("=" * 78)
+    with app.app_context():
+        seed_meals(db, args.meals)
+        seed_ingredients(db, args.meals)
+
+        started = time.perf_counter()
+        summary = index_meal_ingredients()
+        print(f"{'build index':<34} {time.perf_counter() - started:>12.3f} s   "
+              f"{summary['terms']:,} terms, {summary['postings']:,} postings")
+        started = time.perf_counter()
+        index_meal_ingredients()
+        print(f"{'re-index, nothing changed':<34} {time.perf_counter() - started:>12.3f} s")
+
+        for include, exclude in QUERIES:
+            label = ' '.join([f'+{term}' for term in include] + [f'-{term}' for term in exclude])
+            timings = {}
+            for name, filters in (('index', lambda: ingredient_filters(include, exclude)),
+                                  ('ilike', lambda: like_filters(Meal, include, exclude))):
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    found = db.session.query(Meal.id).filter(*filters()).count()
+                timings[name] = (time.perf_counter() - started) * 1000 / args.repeat
+            print(f"{label[:34]:<34} {timings['index']:>9.2f} ms index  {timings['ilike']:>9.2f} ms ilike  "
+                  f"({found:,} meals, {timings['ilike'] / timings['index']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
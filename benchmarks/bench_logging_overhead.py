@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Per-request logging cost on the login path
+Replays the log calls a successful /auth/login makes (2 info + 7 debug) through
+the old setup (eager f-strings, synchronous FileHandler on the request thread)
+and the new one (lazy %-args, QueueHandler -> QueueListener -> JSON FileHandler)
+
+Usage:
+    python benchmarks/bench_logging_overhead.py --iterations 20000
+"""
+
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from _bootstrap import BACKEND_DIR  # noqa: F401  (puts backend/ on sys.path)
+from logging_setup import JsonLogFormatter, _DeferredQueueHandler
+
+EMAIL = 'demo@nutriassist.com'
+USERNAME = 'demo_user'
+USER_ID = 42
+BMI = 31.02
+
+
+def login_eager(logger):
+    """Log calls as auth.py made them before: every message built up front"""
+    logger.info(f"Login attempt initiated for email: {EMAIL}")
+    logger.debug(f"Querying database for user with email: {EMAIL}")
+    logger.debug(f"Database query result - User found: {True}")
+    logger.debug(f"User details - ID: {USER_ID}, Username: {USERNAME}, BMI: {BMI}")
+    logger.debug(f"Password verification for {EMAIL}: {True}")
+    logger.debug(f"Checking BMI eligibility for user {EMAIL} - BMI: {BMI}")
+    logger.debug(f"BMI eligibility check for {EMAIL}: {True} (BMI: {BMI})")
+    logger.debug(f"Setting up session for user: {USERNAME}")
+    logger.info(f"Successful login for user: {USERNAME} (BMI: {BMI})")
+
+
+def login_lazy(logger):
+    """Log calls as auth.py makes them now: formatting deferred to the handler"""
+    logger.info("Login attempt initiated for email: %s", EMAIL)
+    logger.debug("Querying database for user with email: %s", EMAIL)
+    logger.debug("Database query result - User found: %s", True)
+    logger.debug("User details - ID: %s, Username: %s, BMI: %s", USER_ID, USERNAME, BMI)
+    logger.debug("Password verification for %s: %s", EMAIL, True)
+    logger.debug("Checking BMI eligibility for user %s - BMI: %s", EMAIL, BMI)
+    logger.debug("BMI eligibility check for %s: %s (BMI: %s)", EMAIL, True, BMI)
+    logger.debug("Setting up session for user: %s", USERNAME)
+    logger.info("Successful login for user: %s (BMI: %s)", USERNAME, BMI)
+
+
+class SlowFileHandler(logging.FileHandler):
+    """FileHandler with a fixed per-write delay, standing in for a busy or network disk"""
+
+    def __init__(self, filename, latency_ms=0.0):
+        super().__init__(filename)
+        self.latency = latency_ms / 1000
+
+    def flush(self):
+        super().flush()
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def isolated_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def time_requests(replay, logger, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        replay(logger)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run_scenarios(log_dir, iterations, latency_ms):
+    """Returns µs/request on the calling thread for before, lazy-only and after"""
+    text_format = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    results = {}
+
+    # Before: synchronous file handler, plain text, eager formatting
+    handler = SlowFileHandler(os.path.join(log_dir, f'before_{latency_ms}.log'), latency_ms)
+    handler.setFormatter(text_format)
+    results['before'] = time_requests(login_eager, isolated_logger('bench.before', handler), iterations)
+    handler.close()
+
+    # Same handler, lazy arguments only (isolates the skipped debug formatting)
+    handler = SlowFileHandler(os.path.join(log_dir, f'lazy_{latency_ms}.log'), latency_ms)
+    handler.setFormatter(text_format)
+    results['lazy'] = time_requests(login_lazy, isolated_logger('bench.lazy', handler), iterations)
+    handler.close()
+
+    # After: request thread only enqueues; the listener formats JSON and writes
+    handler = SlowFileHandler(os.path.join(log_dir, f'after_{latency_ms}.log'), latency_ms)
+    handler.setFormatter(JsonLogFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    results['after'] = time_requests(login_lazy, isolated_logger('bench.after', _DeferredQueueHandler(log_queue)),
+                                     iterations)
+    drain_started = time.perf_counter()
+    listener.stop()
+    results['drain_ms'] = (time.perf_counter() - drain_started) * 1000
+    handler.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login-path logging overhead benchmark')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--write-latency-ms', type=float, default=0.2,
+                        help='Simulated per-write disk latency for the second pass')
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix='bench_logging_')
+
+    print("📝 Logging Overhead Benchmark (successful login: 2 info + 7 debug calls)")
+    print(f"   iterations={args.iterations}, level=INFO, log files in {log_dir}")
+
+    for latency_ms in (0.0, args.write_latency_ms):
+        # Slow-disk pass needs fewer iterations to show the blocking
+        iterations = args.iterations if latency_ms == 0 else max(args.iterations // 20, 100)
+        results = run_scenarios(log_dir, iterations, latency_ms)
+        print("=" * 78)
+        print(f"Disk write latency {latency_ms} ms ({iterations} requests)")
+        print(f"{'  sync FileHandler + f-strings':<46} {results['before']:9.1f} µs/request")
+        print(f"{'  sync FileHandler + lazy args':<46} {results['lazy']:9.1f} µs/request")
+        print(f"{'  QueueHandler + lazy args (request thread)':<46} {results['after']:9.1f} µs/request")
+        print(f"{'  listener drain after last request':<46} {results['drain_ms']:9.1f} ms")
+        print(f"  Request-thread logging cost: {results['before']:.1f} → {results['after']:.1f} µs "
+              f"({results['before'] / results['after']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark: inline hashing vs the bounded hashing pool
+Fires concurrent /auth/api/login requests and reports logins/s, latency and shed (503) counts
+
+Usage:
+    python benchmarks/bench_login_throughput.py --users 50 --concurrency 16 --requests 400
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from _bootstrap import create_bench_app
+
+
+def run_burst(app, concurrency: int, total_requests: int, emails):
+    """Fire total_requests logins from concurrency threads; returns (elapsed, latencies, statuses)"""
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    per_thread = total_requests // concurrency
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(per_thread):
+            email = emails[(offset + i) % len(emails)]
+            started = time.perf_counter()
+            response = client.post('/auth/api/login', json={'email': email, 'password': 'bench-password'})
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies), statuses
+
+
+def report(label, elapsed, latencies, statuses):
+    ok = statuses.get(200, 0)
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    print(f"{label:<28} {ok / elapsed:8.1f} logins/s   p50 {p50:7.1f}ms   p99 {p99:7.1f}ms   "
+          f"statuses {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput benchmark')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=320)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000', help='password hash method / cost factor')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-pending', type=int, default=0, help='queue-depth limit (default workers*4)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_login.db')
+    app = create_bench_app(f'sqlite:///{db_path}')
+
+    from models import db, User
+    from password_hashing import PasswordHasher
+
+    seed_hasher = PasswordHasher(method=args.method, workers=args.workers)
+    with app.app_context():
+        password_hash = seed_hasher.hash_password('bench-password')
+        emails = [f'bench{n}@example.com' for n in range(args.users)]
+        db.session.add_all(User(username=f'bench{n}', email=email, password_hash=password_hash,
+                                height=170.0, weight=100.0, BMI=34.6)
+                           for n, email in enumerate(emails))
+        db.session.commit()
+    seed_hasher.shutdown()
+
+    print("🔐 Login Throughput Benchmark")
+    print(f"   method={args.method} users={args.users} concurrency={args.concurrency} "
+          f"requests={args.requests} workers={args.workers}")
+    print("=" * 100)
+
+    scenarios = [
+        ('inline (request thread)', PasswordHasher(method=args.method, workers=0,
+                                                   max_pending=args.concurrency * 2)),
+        ('process pool', PasswordHasher(method=args.method, workers=args.workers,
+                                        max_pending=args.max_pending or None)),
+        ('process pool, tight queue', PasswordHasher(method=args.method, workers=args.workers,
+                                                     max_pending=args.workers)),
+    ]
+
+    for label, hasher in scenarios:
+        app.extensions['password_hasher'] = hasher
+        if hasher.workers:
+            hasher.hash_password('warm-up')
+        report(label, *run_burst(app, args.concurrency, args.requests, emails))
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Item-item collaborative filtering benchmark
+Seeds a rating history, builds every meal's neighbour list from scratch, then
+times single ratings arriving through the ORM (each patching the lists in its
+own commit) and the "also liked" reads
+
+Usage:
+    python benchmarks/bench_meal_neighbors.py --users 100000 --meals 20000 --ratings 1000000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from _bootstrap import create_bench_app
+from bench_meal_plan import seed_meals
+from bench_recommendations import seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Item-item collaborative filtering benchmark')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--meals', type=int, default=20000)
+    parser.add_argument('--ratings', type=int, default=1000000)
+    parser.add_argument('--updates', type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db
+    from meal_neighbors import also_liked, also_liked_for_user, rate_meal, rebuild_meal_neighbors
+
+    print("🤝 Meal Neighbour (Item-Item CF) Benchmark")
+    with app.app_context():
+        seed_meals(db, args.meals)
+        rated = seed_users(db, args.users, args.meals, args.ratings)
+        print(f"   users={args.users}, meals={args.meals}, ratings={rated}")
+        print("=" * 78)
+
+        summary = rebuild_meal_neighbors()
+        print(f"{'full rebuild':<34} {summary['elapsed_seconds']:>12.3f} s   "
+              f"{summary['pairs']:,} co-rating pairs, {summary['neighbors']:,} neighbours")
+
+        rng = np.random.default_rng(21)
+        timings = []
+        for user_id, meal_id, stars in zip(rng.integers(1, args.users + 1, args.updates),
+                                           rng.integers(1, args.meals + 1, args.updates),
+                                           rng.integers(1, 6, args.updates)):
+            started = time.perf_counter()
+            rate_meal(int(user_id), int(meal_id), int(stars))
+            timings.append(time.perf_counter() - started)
+        timings = np.array(timings) * 1000
+        print(f"{'incremental rating (commit)':<34} {np.median(timings):>12.2f} ms median, "
+              f"p95 {np.percentile(timings, 95):.2f} ms")
+        equivalent = summary['elapsed_seconds'] * 1000 / np.median(timings)
+        print(f"   -> a rebuild costs as much as ~{equivalent:,.0f} incremental ratings")
+
+        started = time.perf_counter()
+        for meal_id in range(1, 1001):
+            also_liked(meal_id, 10)
+        print(f"{'also liked (meal detail)':<34} {(time.perf_counter() - started):>12.3f} ms/request")
+
+        user = {'id': 1, 'allergies': None}
+        started = time.perf_counter()
+        for user_id in range(1, 201):
+            user['id'] = user_id
+            also_liked_for_user(user, 10)
+        print(f"{'also liked (recommendations)':<34} {(time.perf_counter() - started) * 5:>12.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Meal plan generator benchmark
+Builds a synthetic meal catalog, then times 7-day plans for users with
+different goals and allergies: the first plan includes loading the catalog
+into arrays, later plans reuse the cached catalog
+
+Usage:
+    python benchmarks/bench_meal_plan.py --meals 100000 --plans 50
+"""
+
+import argparse
+import logging
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy import insert
+
+from _bootstrap import create_bench_app
+
+ALLERGEN_CHOICES = ('None', 'Dairy', 'Nuts', 'Gluten', 'Eggs', 'Fish', 'Soy', 'Dairy, Gluten', 'Nuts, Soy')
+SLOT_CALORIES = {'breakfast': 380, 'lunch': 520, 'dinner': 480, 'snack': 160}
+
+
+def seed_meals(db, count, seed=5):
+    from models import Meal
+
+    rng = np.random.default_rng(seed)
+    types = rng.choice(list(SLOT_CALORIES), count)
+    base = np.array([SLOT_CALORIES[kind] for kind in types])
+    calories = np.clip(rng.normal(base, base * 0.3), 50, 1200).round()
+    protein = np.clip(rng.normal(calories * 0.07, 6), 0, None).round(1)
+    carbs = np.clip(rng.normal(calories * 0.1, 8), 0, None).round(1)
+    fat = np.clip(rng.normal(calories * 0.035, 4), 0, None).round(1)
+    fiber = np.clip(rng.normal(4, 2.5, count), 0, None).round(1)
+    sugar = np.clip(rng.normal(9, 6, count), 0, None).round(1)
+    allergens = rng.choice(ALLERGEN_CHOICES, count)
+    db.session.execute(insert(Meal), [
+        {'name': f'{types[i]} dish {i}', 'type': types[i], 'calories': int(calories[i]), 'protein': protein[i],
+         'carbs': carbs[i], 'fat': fat[i], 'fiber': fiber[i], 'sugar': sugar[i], 'allergens': allergens[i]}
+        for i in range(count)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Meal plan generator benchmark')
+    parser.add_argument('--meals', type=int, default=100000)
+    parser.add_argument('--plans', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db, NutritionGoal, User
+    from meal_planner import catalog_cache, generate_meal_plan
+
+    print("🥗 Meal Plan Generator Benchmark")
+    print(f"   catalog={args.meals} meals, {args.plans} plans of {args.days} days")
+    print("=" * 78)
+
+    rng = np.random.default_rng(3)
+    with app.app_context():
+        seed_meals(db, args.meals)
+        users = []
+        for index in range(args.plans):
+            user = User(username=f'planner{index}', email=f'planner{index}@example.com', password_hash='x',
+                        height=170, weight=float(rng.uniform(90, 140)),
+                        allergies=str(rng.choice(['', 'nuts', 'dairy, gluten', 'shellfish', 'eggs and soy'])))
+            db.session.add(user)
+            db.session.flush()
+            calories = int(rng.uniform(1400, 2200))
+            db.session.add(NutritionGoal(user_id=user.id, daily_calories=calories, daily_protein=calories * 0.075,
+                                         daily_carbs=calories * 0.1, daily_fat=calories * 0.033))
+            users.append({'id': user.id, 'BMI': user.BMI, 'allergies': user.allergies})
+        db.session.commit()
+
+        catalog_cache.invalidate()
+        started = time.perf_counter()
+        plan = generate_meal_plan(users[0], date.today(), args.days, time_budget=5.0)
+        cold = time.perf_counter() - started
+        print(f"{'first plan (loads catalog)':<36} {cold * 1000:>9.1f} ms")
+
+        timings, within, complete = [], 0, 0
+        for user in users:
+            started = time.perf_counter()
+            plan = generate_meal_plan(user, date.today(), args.days, time_budget=5.0)
+            timings.append(time.perf_counter() - started)
+            within += sum(day['within_tolerance'] for day in plan['days'])
+            complete += plan['complete']
+
+        timings = np.array(timings) * 1000
+        print(f"{'plan, cached catalog (median)':<36} {np.median(timings):>9.1f} ms")
+        print(f"{'plan, cached catalog (p95)':<36} {np.percentile(timings, 95):>9.1f} ms")
+        print(f"   days within tolerance: {within}/{args.plans * args.days}, complete plans: {complete}/{args.plans}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Composite recipe benchmark
+Seeds plain meals and three layers of nested recipes, rolls every recipe up
+once, then times single-meal edits through the ORM (each recomputing only the
+recipes above the meal, in its own commit) and compares recipe reads with
+plain meal reads
+
+Usage:
+    python benchmarks/bench_recipes.py --meals 20000 --recipes 5000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from _bootstrap import create_bench_app
+from bench_meal_plan import seed_meals
+
+
+def seed_recipes(db, meals, recipes, seed=13):
+    """Three layers: recipes of plain meals, recipes mixing those with meals, and recipes of recipes"""
+    from models import Meal, RecipeComponent
+
+    rng = np.random.default_rng(seed)
+    layers = [recipes * 6 // 10, recipes * 3 // 10, recipes - recipes * 6 // 10 - recipes * 3 // 10]
+    db.session.execute(insert(Meal), [{'name': f'recipe {i}', 'type': 'dinner', 'calories': 0}
+                                      for i in range(recipes)])
+    edges, first, pools = [], meals + 1, [np.arange(1, meals + 1)]
+    for size in layers:
+        layer = np.arange(first, first + size)
+        for recipe_id in layer:
+            pool = pools[-1] if len(pools) == 1 else np.concatenate(pools[-2:])
+            for component_id in rng.choice(pool, rng.integers(2, 7), replace=False):
+                edges.append({'recipe_id': int(recipe_id), 'component_id': int(component_id),
+                              'grams': float(rng.integers(20, 300))})
+        pools.append(layer)
+        first += size
+    db.session.execute(insert(RecipeComponent), edges)
+    db.session.commit()
+    return len(edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Composite recipe benchmark')
+    parser.add_argument('--meals', type=int, default=20000)
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--edits', type=int, default=300)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db, Meal
+    from recipes import REFRESHED_KEY, refresh_all_recipes
+
+    print("🍲 Composite Recipe Benchmark")
+    with app.app_context():
+        seed_meals(db, args.meals)
+        edges = seed_recipes(db, args.meals, args.recipes)
+        print(f"   meals={args.meals}, recipes={args.recipes}, components={edges}")
+        print("=" * 78)
+
+        started = time.perf_counter()
+        refresh_all_recipes()
+        full = time.perf_counter() - started
+        print(f"{'roll up every recipe':<34} {full:>12.3f} s")
+
+        rng = np.random.default_rng(3)
+        timings, touched = [], []
+        for meal_id in rng.integers(1, args.meals + 1, args.edits):
+            meal = db.session.get(Meal, int(meal_id))
+            started = time.perf_counter()
+            meal.calories += 1
+            db.session.commit()
+            timings.append(time.perf_counter() - started)
+            touched.append(len(db.session.info.pop(REFRESHED_KEY, ())))
+        timings = np.array(timings) * 1000
+        print(f"{'edit one meal (commit)':<34} {np.median(timings):>12.2f} ms median, "
+              f"p95 {np.percentile(timings, 95):.2f} ms, {np.mean(touched):.1f} recipes recomputed")
+        print(f"   -> a full roll-up costs as much as ~{full * 1000 / np.median(timings):,.0f} edits")
+
+        for label, ids in (('read plain meal', range(1, 2001)),
+                           ('read recipe', range(args.meals + args.recipes - 2000 + 1, args.meals + args.recipes + 1))):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            for meal_id in ids:
+                db.session.get(Meal, meal_id).to_dict()
+            print(f"{label:<34} {(time.perf_counter() - started) / 2:>12.3f} ms/meal")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Per-request session overhead micro-benchmark
+Times open_session + save_session for Flask's stock cookie interface and
+FixedSessionInterface on a typical logged-in session
+
+Usage:
+    python benchmarks/bench_session_overhead.py --iterations 20000
+"""
+
+import argparse
+import logging
+import time
+
+from flask import Flask, Response
+from flask.sessions import SecureCookieSessionInterface
+
+from _bootstrap import BACKEND_DIR  # noqa: F401  (puts backend/ on sys.path)
+from session_fix import FixedSessionInterface
+
+LOGGED_IN_SESSION = {
+    'user_id': 42,
+    'user_email': 'demo@nutriassist.com',
+    'user_username': 'demo_user',
+    'user_bmi': 31.02
+}
+
+
+def issue_cookie(app, interface):
+    with app.test_request_context('/'):
+        session = interface.open_session(app, app.test_request_context('/').request)
+        session.update(LOGGED_IN_SESSION)
+        response = Response()
+        interface.save_session(app, session, response)
+        return response.headers['Set-Cookie'].split(';')[0].split('=', 1)[1]
+
+
+def time_requests(app, interface, cookie, iterations, mutate):
+    """Average microseconds for open + (optional write) + save on one request"""
+    headers = {'Cookie': f'session={cookie}'}
+    cookies_set = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with app.test_request_context('/', headers=headers) as ctx:
+            session = interface.open_session(app, ctx.request)
+            mutate(session)
+            response = Response()
+            interface.save_session(app, session, response)
+            cookies_set += 'Set-Cookie' in response.headers
+    elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1e6, cookies_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Session overhead micro-benchmark')
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench-secret'
+    app.config['SESSION_REFRESH_FRACTION'] = 0.5
+
+    scenarios = [
+        ('read only', lambda session: session.get('user_id')),
+        ('rewrite same values', lambda session: session.update(LOGGED_IN_SESSION)),
+        ('changed value', lambda session: session.__setitem__('last_seen', time.time())),
+    ]
+
+    print("🍪 Session Overhead Micro-benchmark")
+    print(f"   iterations={args.iterations} (each includes request context setup)")
+    print("=" * 78)
+
+    # Baseline: request context with no session work at all
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        with app.test_request_context('/'):
+            Response()
+    baseline = (time.perf_counter() - started) / args.iterations * 1e6
+    print(f"{'request context only':<44} {baseline:8.1f} µs/request")
+
+    for interface_name, interface in [('stock', SecureCookieSessionInterface()),
+                                      ('FixedSessionInterface', FixedSessionInterface())]:
+        cookie = issue_cookie(app, interface)
+        for label, mutate in scenarios:
+            per_request, cookies_set = time_requests(app, interface, cookie, args.iterations, mutate)
+            print(f"{interface_name + ', ' + label:<44} {per_request:8.1f} µs/request   "
+                  f"Set-Cookie on {cookies_set / args.iterations:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+USDA ingestion benchmark against the local FoodData Central mock server
+Runs fully offline: no internet access or real API key required
+
+Usage:
+    python benchmarks/bench_usda_ingestion.py --foods 50000 --latency-ms 20 --rate-429 0.05 --rate-5xx 0.02
+"""
+
+import argparse
+import logging
+import time
+
+import requests
+
+from _bootstrap import create_bench_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline USDA ingestion benchmark')
+    parser.add_argument('--foods', type=int, default=10000, help='synthetic catalog size')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--rounds', type=int, default=5, help='passes over the search terms')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--target-count', type=int, default=75, help='meals for the populate run')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    app = create_bench_app()
+
+    from fdc_mock_server import start_mock_server
+    from models import Meal
+    from usda_api import USDANutritionFetcher, populate_usda_meals
+
+    server, base_url = start_mock_server(food_count=args.foods, latency_ms=args.latency_ms,
+                                         jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                                         rate_5xx=args.rate_5xx)
+    fetcher = USDANutritionFetcher(api_key='BENCH_KEY', base_url=base_url, request_delay=0)
+
+    print("📡 USDA Ingestion Benchmark (offline FDC mock)")
+    print(f"🌐 Mock base URL: {base_url}")
+    print("=" * 55)
+
+    try:
+        # Phase 1: raw search + parse throughput
+        search_terms = ['chicken breast', 'greek yogurt', 'salmon', 'broccoli', 'quinoa',
+                        'lentils', 'almonds', 'apple', 'tofu', 'spinach']
+        foods_parsed = 0
+        failures = {}
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for term in search_terms:
+                try:
+                    for food in fetcher._search_foods(term, limit=args.page_size):
+                        if fetcher._parse_food_to_meal(food, term):
+                            foods_parsed += 1
+                except requests.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else 'unknown'
+                    failures[status] = failures.get(status, 0) + 1
+        elapsed = time.perf_counter() - started
+        requests_made = args.rounds * len(search_terms)
+
+        print(f"🔍 Search requests: {requests_made} in {elapsed:.2f}s "
+              f"({requests_made / elapsed:.1f} req/s)")
+        print(f"🍽️  Foods parsed: {foods_parsed} ({foods_parsed / elapsed:.0f} foods/s)")
+        print(f"⚠️  Failed requests by status: {failures or 'none'}")
+
+        # Phase 2: end-to-end populate into a scratch database
+        with app.app_context():
+            started = time.perf_counter()
+            total = populate_usda_meals(target_count=args.target_count, fetcher=fetcher)
+            elapsed = time.perf_counter() - started
+            usda_rows = Meal.query.filter(Meal.usda_id.isnot(None)).count()
+
+        print(f"🗄️  populate_usda_meals: {total} meals ({usda_rows} with USDA ids) in {elapsed:.2f}s")
+        print(f"📊 Mock server stats: {requests.get(base_url + '/_stats').json()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
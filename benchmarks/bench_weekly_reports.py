@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Weekly report benchmark
+Seeds users with two weeks of meal history, goals and weight readings, then
+generates last week's report for every user into a temporary outbox, serially
+and on a process pool, against a per-user loop issuing the same queries one
+user at a time
+
+Usage:
+    python benchmarks/bench_weekly_reports.py --users 20000 --meals 5000 --workers 4
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from _bootstrap import create_bench_app
+from bench_dashboard import seed_activity
+from bench_meal_plan import seed_meals
+from bench_recommendations import seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weekly report benchmark')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--meals', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--db', default=None, help='database URL (default: a temporary SQLite file, shared with workers)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    directory = tempfile.mkdtemp(prefix='bench-weekly-')
+    app = create_bench_app(args.db or f"sqlite:///{os.path.join(directory, 'bench.db')}")
+
+    from models import db
+    from weekly_reports import _report_batches, generate_weekly_reports, week_start
+
+    print("📬 Weekly Report Benchmark")
+    with app.app_context():
+        seed_meals(db, args.meals)
+        seed_users(db, args.users, args.meals, args.users * 5)
+        seed_activity(db, args.users, args.meals, days=14)
+        start = week_start(datetime.utcnow().date()) - timedelta(days=7)
+        print(f"   users={args.users}, meals={args.meals}, week={start}, workers={args.workers}")
+        print("=" * 78)
+
+        started = time.perf_counter()
+        for _ in _report_batches(start, batch_size=1):
+            pass
+        per_user = (time.perf_counter() - started) / args.users
+        print(f"{'metrics, one user per round':<34} {1 / per_user:>12,.0f} users/s")
+
+        started = time.perf_counter()
+        for _ in _report_batches(start, batch_size=2000):
+            pass
+        elapsed = time.perf_counter() - started
+        print(f"{'metrics, 2000 users per round':<34} {args.users / elapsed:>12,.0f} users/s")
+
+        for workers in sorted({1, args.workers}):
+            summary = generate_weekly_reports(start, workers=workers, outbox=os.path.join(directory, f'outbox-{workers}'))
+            print(f"{f'metrics + render + write, {workers} worker(s)':<34} {summary['users_per_second']:>12,.0f} users/s"
+                  f"  ({summary['reports']} reports in {summary['elapsed_seconds']:.2f} s)")
+    print(f"   outbox: {directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Weight trend maintenance and goal projection benchmark
+Compares the incremental trend update on each logged reading with replaying a
+user's whole log, then times the vectorized goal-date projection over every
+user's stored trend
+
+Usage:
+    python benchmarks/bench_weight_trends.py --users 200000 --readings 365
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from _bootstrap import create_bench_app
+
+
+def seed_users(db, users, seed=11):
+    """Users with profiles and single-point trends, written with Core executemany"""
+    from models import User, UserProfile, WeightTrend
+
+    rng = np.random.default_rng(seed)
+    weights = np.round(rng.normal(105, 15, users), 1)
+    targets = np.round(weights - rng.uniform(-2, 25, users), 1)
+    slopes = rng.normal(-0.4, 0.4, users)
+    now = datetime.utcnow()
+    db.session.execute(insert(User), [
+        {'id': index + 1, 'username': f'user{index}', 'email': f'user{index}@example.com', 'password_hash': 'x',
+         'height': 170.0, 'weight': float(weights[index])} for index in range(users)])
+    db.session.execute(insert(UserProfile), [
+        {'user_id': index + 1, 'target_weight': float(targets[index]), 'weekly_goal': 0.5}
+        for index in range(users)])
+    db.session.execute(insert(WeightTrend), [
+        {'user_id': index + 1, 'entries': 30, 'last_log_id': 0, 'first_date': now - timedelta(days=30),
+         'latest_date': now, 'latest_weight': float(weights[index]), 'ema_weight': float(weights[index]),
+         'sum_w': 0, 'sum_t': 0, 'sum_y': 0, 'sum_tt': 0, 'sum_ty': 0, 'slope_per_week': float(slopes[index])}
+        for index in range(users)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weight trend benchmark')
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--readings', type=int, default=365, help='History length for the per-reading test')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = create_bench_app()
+
+    from models import db, WeightLog
+    from weight_trends import log_weight, project_goal_dates, replay_user
+
+    print("📉 Weight Trend Benchmark")
+    print(f"   users={args.users}, readings for the per-reading test={args.readings}")
+    print("=" * 78)
+
+    with app.app_context():
+        seed_users(db, args.users)
+
+        user_id = 1
+        start = datetime.utcnow() - timedelta(days=args.readings)
+        db.session.execute(insert(WeightLog), [
+            {'user_id': user_id, 'date': start + timedelta(days=day), 'weight': 110 - day * 0.05}
+            for day in range(args.readings)])
+        replay_user(db.session.connection(), user_id)
+        db.session.commit()
+
+        logged = 200
+        started = time.perf_counter()
+        for offset in range(logged):
+            log_weight(user_id, 90.0, start + timedelta(days=args.readings, minutes=offset))
+        incremental = (time.perf_counter() - started) / logged
+        print(f"{'log reading, incremental trend':<40} {incremental * 1000:>10.2f} ms/reading")
+
+        started = time.perf_counter()
+        for _ in range(20):
+            replay_user(db.session.connection(), user_id)
+            db.session.commit()
+        replay = (time.perf_counter() - started) / 20
+        print(f"{'replay full log (' + str(args.readings + logged) + ' readings)':<40} {replay * 1000:>10.2f} ms/user")
+
+        summary = project_goal_dates()
+        print(f"{'goal projection, first pass':<40} {summary['users_per_second']:>10,} users/s   "
+              f"{summary['elapsed_seconds']}s, {summary['updated']} rows written")
+        summary = project_goal_dates()
+        print(f"{'goal projection, unchanged trends':<40} {summary['users_per_second']:>10,} users/s   "
+              f"{summary['elapsed_seconds']}s, {summary['updated']} rows written")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,11 @@ import sys
 import logging
 from flask import Flask
 from flask_migrate import Migrate, migrate, upgrade
-from backend.models import db, User
+# Backend modules import each other as top-level modules (models, usda_api, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models import db, User
+from usernames import UsernameAllocator, username_base_from_email
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -75,17 +79,14 @@ def fix_database_schema():
                     print("🔄 Updating existing users with usernames...")
                     users_without_username = User.query.filter(User.username.is_(None)).all()
                     
+                    # Load taken names for every base up front, then allocate in memory
+                    username_allocator = UsernameAllocator(User, db.session)
+                    username_allocator.preload(username_base_from_email(user.email)
+                                               for user in users_without_username if user.email)
+                    
                     for user in users_without_username:
                         if user.email:
-                            base_username = user.email.split('@')[0]
-                            username = base_username
-                            counter = 1
-                            
-                            # Ensure unique username
-                            while User.query.filter_by(username=username).first():
-                                username = f"{base_username}{counter}"
-                                counter += 1
-                            
+                            username = username_allocator.allocate(username_base_from_email(user.email))
                             user.username = username
                             print(f"  📧 {user.email} -> username: {username}")
                     
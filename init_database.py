@@ -7,7 +7,10 @@ import os
 import sys
 from flask import Flask
 from flask_migrate import Migrate, init, migrate, upgrade
-from backend.models import db
+# Backend modules import each other as top-level modules (models, usda_api, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models import db
 
 def create_app():
     """Create Flask app for database initialization following copilot patterns"""
@@ -83,8 +86,8 @@ def initialize_database():
 
 def add_sample_data():
     """Add sample data following copilot health-centric patterns"""
-    from backend.models import User, Meal, FoodCategory
-    from backend.usda_api import populate_usda_meals
+    from models import User, Meal, FoodCategory
+    from usda_api import populate_usda_meals
     from werkzeug.security import generate_password_hash
     
     try:
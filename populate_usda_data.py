@@ -7,8 +7,11 @@ import os
 import sys
 import logging
 from flask import Flask
-from backend.models import db
-from backend.usda_api import populate_usda_meals
+# Backend modules import each other as top-level modules (models, usda_api, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from models import db
+from usda_api import populate_usda_meals
 
 # Setup logging
 logging.basicConfig(